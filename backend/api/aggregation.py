@@ -0,0 +1,44 @@
+"""Streaming aggregation of uploaded equipment CSV files.
+
+The upload is read in fixed-size byte chunks straight from Django's
+``UploadedFile.chunks()`` (or a record batch at a time for Parquet and
+Arrow files) and parsed a bounded number of rows at a time
+(see ``api.parsing``), so peak memory depends on ``CHUNK_ROWS`` and not on
+the size of the file. Each chunk is validated (see ``api.validation``) and
+folded into a ``SummaryAccumulator`` from ``api.summary``; the summary
+carries the quarantine report as ``quarantine``.
+"""
+from .metrics import stage, timed_iter
+from .parsing import iter_upload
+from .summary import SummaryAccumulator
+from .validation import Validator
+
+# Rows parsed per chunk
+CHUNK_ROWS = 50_000
+
+
+def aggregate_upload(file, chunk_rows=CHUNK_ROWS, progress=None, writer=None, engine=None, validator=None):
+    """Compute the upload summary without loading the whole file.
+
+    ``progress``, if given, is called with the number of rows read so far
+    after every chunk. ``writer`` (a ``columnar.ColumnWriter``) receives
+    every parsed block so the rows can be stored in the same pass.
+    ``engine`` picks the CSV parser ('pyarrow' or 'c'; default: best available).
+    ``validator`` (an ``api.validation.Validator``) sets the range checks.
+    Time spent parsing, aggregating and storing is recorded as upload stages
+    of the current request (see ``api.metrics``).
+    """
+    accumulator = SummaryAccumulator()
+    validator = validator if validator is not None else Validator()
+    with stage('parse'):
+        blocks = iter_upload(file, chunk_rows, engine, validator)
+    for block, codes, categories in timed_iter(blocks, 'parse'):
+        with stage('aggregate'):
+            accumulator.update(block, codes, categories)
+        if writer is not None:
+            with stage('store'):
+                writer.append(block, codes, categories)
+        if progress is not None:
+            progress(accumulator.rows)
+    with stage('aggregate'):
+        return {**accumulator.summary(), 'quarantine': validator.report.as_dict()}
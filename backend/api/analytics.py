@@ -0,0 +1,98 @@
+"""Trend queries answered from rollup rows, never from the files.
+
+Per-upload trends read ``TypeRollup``; weekly trends read ``WeeklyRollup``,
+one row per week and type, so they cost the same however many uploads a
+week had.
+"""
+import math
+from datetime import timedelta
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import TypeRollup, WeeklyRollup, week_start
+from .serializers import TIME_FORMAT
+
+
+def _check_metric(metric):
+    if metric not in TypeRollup.METRICS:
+        raise ValueError(f"metric must be one of {', '.join(TypeRollup.METRICS)}")
+
+
+def _stats(count, total, sumsq):
+    if not count:
+        return {'count': 0, 'mean': None, 'std': None}
+    std = None
+    if count > 1:
+        std = math.sqrt(max(sumsq - total * total / count, 0.0) / (count - 1))
+    return {'count': count, 'mean': total / count, 'std': std}
+
+
+def _totals(metric):
+    return {
+        'n': Sum(f'{metric}_count'),
+        'total': Sum(f'{metric}_sum'),
+        'sumsq': Sum(f'{metric}_sumsq'),
+    }
+
+
+def type_trends(metric, last, equipment_type=None):
+    """Per-type statistics of ``metric`` over the last ``last`` uploads."""
+    _check_metric(metric)
+    upload_ids = list(
+        TypeRollup.objects.order_by('-upload_id').values_list('upload_id', flat=True).distinct()[:last]
+    )
+    rows = TypeRollup.objects.filter(upload_id__in=upload_ids)
+    if equipment_type:
+        rows = rows.filter(equipment_type=equipment_type)
+
+    per_type = rows.values('equipment_type').annotate(**_totals(metric)).order_by('equipment_type')
+    series = rows.order_by('upload_id', 'equipment_type').values(
+        'upload_id', 'upload_time', 'equipment_type', f'{metric}_count', f'{metric}_sum'
+    )
+    return {
+        'metric': metric,
+        'uploads': len(upload_ids),
+        'types': {
+            row['equipment_type']: _stats(row['n'], row['total'], row['sumsq'])
+            for row in per_type
+        },
+        'series': [
+            {
+                'upload_id': row['upload_id'],
+                'upload_time': row['upload_time'].strftime(TIME_FORMAT),
+                'type': row['equipment_type'],
+                'mean': row[f'{metric}_sum'] / row[f'{metric}_count'] if row[f'{metric}_count'] else None,
+            }
+            for row in series
+        ],
+    }
+
+
+def weekly_trend(metric, weeks, equipment_type=None):
+    """Weekly mean of ``metric``, with the change against the calendar week before.
+
+    Only weeks with uploads are listed; ``change_pct`` is None when the
+    week before had none.
+    """
+    _check_metric(metric)
+    first = week_start(timezone.now()) - timedelta(weeks=weeks - 1)
+    # The week before the first too, for its change
+    rows = WeeklyRollup.objects.filter(week__gte=first - timedelta(weeks=1))
+    if equipment_type:
+        rows = rows.filter(equipment_type=equipment_type)
+    per_week = rows.values('week').annotate(**_totals(metric)).order_by('week')
+
+    result = []
+    means = {}
+    for row in per_week:
+        stats = _stats(row['n'], row['total'], row['sumsq'])
+        means[row['week']] = stats['mean']
+        if row['week'] < first:
+            continue
+        previous = means.get(row['week'] - timedelta(weeks=1))
+        change = None
+        if previous and stats['mean'] is not None:
+            change = (stats['mean'] - previous) / abs(previous) * 100
+        result.append({'week': row['week'].isoformat(), **stats, 'change_pct': change})
+    return {'metric': metric, 'weeks': result}
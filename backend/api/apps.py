@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        from .metrics import install_query_counter
+        from .sqlite import install_sqlite_pragmas
+
+        install_query_counter()
+        install_sqlite_pragmas()
@@ -0,0 +1,79 @@
+"""Native async versions of the upload, batch and history endpoints.
+
+Served on the regular ``api/`` routes when ``EQUIPMENT_ASYNC_VIEWS`` is on,
+which ``backend/asgi.py`` does by default. Multipart parsing, the summary
+and ORM calls run in worker threads, so the event loop keeps serving other
+requests while a large file is processed.
+"""
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from .batch import record_batch, summarize_request
+from .cache import upload_digest
+from .history import history_response
+from .jobs import submit_upload
+from .metrics import observe_upload, stage
+from .models import EquipmentUpload
+from .pipeline import summarize_upload
+from .serializers import history_params, job_accepted, upload_error, upload_summary
+
+
+@csrf_exempt
+@require_POST
+async def upload_equipment_data(request):
+    # Reading request.FILES parses the multipart body, which blocks
+    with stage('receive'):
+        files = await sync_to_async(lambda: request.FILES)()
+    file = files.get('file')
+    if not file:
+        return JsonResponse({'error': 'No file uploaded'}, status=400)
+
+    digest = upload_digest(request)
+    if request.GET.get('mode') == 'async':
+        job = await sync_to_async(submit_upload)(file, digest)
+        return JsonResponse(job_accepted(job), status=202)
+
+    try:
+        # CPU-heavy parsing runs in the executor, off the event loop
+        result = await sync_to_async(summarize_upload, thread_sensitive=False)(file, digest)
+        observe_upload(result.summary['total_equipment'], file.size)
+        upload = await sync_to_async(EquipmentUpload.objects.record_summary)(
+            file.name, result.summary, result.data_path
+        )
+        response = JsonResponse({**upload_summary(result.summary), 'upload_id': upload.id})
+        response['X-Summary-Cache'] = result.cache_status
+        return response
+
+    except ValueError as e:
+        # The file itself is unusable (missing columns, not a CSV, no valid rows, ...)
+        return JsonResponse(upload_error(e), status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@csrf_exempt
+@require_POST
+async def upload_batch(request):
+    with stage('receive'):
+        files = await sync_to_async(lambda: request.FILES)()
+    if not files.getlist('files'):
+        return JsonResponse({'error': 'No files uploaded'}, status=400)
+
+    try:
+        with stage('parse'):
+            results = await sync_to_async(summarize_request, thread_sensitive=False)(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    body = await sync_to_async(record_batch)(results)
+    return JsonResponse(body, status=200 if body['uploaded'] else 400)
+
+
+@require_GET
+async def get_upload_history(request):
+    try:
+        limit, cursor = history_params(request.GET)
+        return await sync_to_async(history_response)(request, limit, cursor)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
@@ -0,0 +1,132 @@
+"""Batch uploads: many files in one request to ``api/equipment/batch/``.
+
+Files are sent as repeated ``files`` fields of a multipart body; a zip
+archive in one of them stands for its members. They are summarized
+concurrently by a thread pool, each as a single upload would be (content
+cache, row storage, parallel aggregation of large files), and then recorded
+together with ``EquipmentUpload.objects.record_summaries``: one INSERT for
+the uploads, one for their type rollups and a single prune, in one
+transaction. A file that fails is reported in its entry; the others are
+still recorded.
+"""
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from functools import partial
+
+from django.conf import settings
+
+from .cache import upload_digest
+from .metrics import observe_upload
+from .models import EquipmentUpload
+from .pipeline import summarize_upload
+from .serializers import upload_error, upload_summary
+from .summary import SummaryAccumulator
+from .validation import combine_reports
+
+FIELD_NAME = 'files'
+ZIP_MAGIC = b'PK\x03\x04'
+
+# ``open`` returns a binary file for the item; ``digest`` is its content hash, if known
+BatchFile = namedtuple('BatchFile', ['name', 'open', 'digest', 'size'])
+# ``error`` is the body ``serializers.upload_error`` gives a failed file, else None
+BatchResult = namedtuple('BatchResult', ['file', 'result', 'error'])
+
+
+def _is_zip(file):
+    head = file.read(len(ZIP_MAGIC))
+    file.seek(0)
+    return head == ZIP_MAGIC
+
+
+@contextmanager
+def open_batch(request):
+    """The files of a batch request as ``BatchFile``s, with zip archives expanded.
+
+    Archives stay open until the block exits. Raises ValueError for an
+    unreadable archive or more than ``EQUIPMENT_BATCH['MAX_FILES']`` files.
+    """
+    limit = settings.EQUIPMENT_BATCH['MAX_FILES']
+    with ExitStack() as stack:
+        items = []
+        for index, file in enumerate(request.FILES.getlist(FIELD_NAME)):
+            if not _is_zip(file):
+                items.append(BatchFile(file.name, lambda file=file: file,
+                                       upload_digest(request, FIELD_NAME, index), file.size))
+            else:
+                try:
+                    archive = stack.enter_context(zipfile.ZipFile(file))
+                except zipfile.BadZipFile as e:
+                    raise ValueError(f'{file.name}: {e}') from None
+                items.extend(
+                    BatchFile(info.filename, partial(archive.open, info), None, info.file_size)
+                    for info in archive.infolist() if not info.is_dir()
+                )
+            if len(items) > limit:
+                raise ValueError(f'A batch may contain at most {limit} files')
+        yield items
+
+
+def _summarize(item):
+    try:
+        with item.open() as f:
+            return BatchResult(item, summarize_upload(f, item.digest), None)
+    except Exception as e:
+        return BatchResult(item, None, upload_error(e))
+
+
+def summarize_batch(items):
+    """Summarize ``items`` concurrently; ``BatchResult``s in the same order.
+
+    The pool threads do not share the request's metrics context, so their
+    stages are not timed one by one; callers time the batch as a whole.
+    """
+    if not items:
+        return []
+    workers = min(settings.EQUIPMENT_BATCH['WORKERS'], len(items))
+    # Parsing and aggregation run in pyarrow and NumPy, mostly without the GIL
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        return list(pool.map(_summarize, items))
+
+
+def summarize_request(request):
+    """Summarize every file of a batch request; no database access.
+
+    Raises ValueError as ``open_batch`` does.
+    """
+    with open_batch(request) as items:
+        return summarize_batch(items)
+
+
+def combine(summaries):
+    """One summary of all ``summaries``; percentiles are None (see ``from_summary``)
+    and the quarantine report has totals only."""
+    summaries = list(summaries)
+    combined = SummaryAccumulator()
+    for summary in summaries:
+        combined.merge(SummaryAccumulator.from_summary(summary))
+    return {**combined.summary(), 'quarantine': combine_reports([s['quarantine'] for s in summaries])}
+
+
+def record_batch(results):
+    """Record the successful results together and build the response body."""
+    done = [r for r in results if r.error is None]
+    observe_upload(sum(r.result.summary['total_equipment'] for r in done),
+                   sum(r.file.size for r in results))
+    uploads = iter(EquipmentUpload.objects.record_summaries(
+        [(r.file.name, r.result.summary, r.result.data_path) for r in done]
+    ) if done else [])
+    files = []
+    for r in results:
+        if r.error is None:
+            files.append({'filename': r.file.name, 'upload_id': next(uploads).id,
+                          'cache': r.result.cache_status, **upload_summary(r.result.summary)})
+        else:
+            files.append({'filename': r.file.name, **r.error})
+    return {
+        'uploaded': len(done),
+        'failed': len(results) - len(done),
+        'files': files,
+        'combined': upload_summary(combine(r.result.summary for r in done)) if done else None,
+    }
@@ -0,0 +1,115 @@
+"""Content-hash cache for upload summaries.
+
+Summaries are keyed on the SHA-256 of the uploaded bytes, which
+``HashingUploadHandler`` computes while Django receives the upload, plus a
+fingerprint of the settings the summary depends on (``pipeline.result_key``).
+Entries live in an in-process LRU bounded by serialized size, optionally
+backed by a Django cache (locmem, file, ...) configured in ``EQUIPMENT_SUMMARY_CACHE``.
+"""
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Bump when the summary format changes so stale entries are ignored
+SUMMARY_VERSION = 5
+
+
+def upload_digest(request, field_name='file', index=0):
+    """SHA-256 of an uploaded file, or None if it was not hashed on receipt."""
+    digests = getattr(request, 'upload_digests', {}).get(field_name, [])
+    return digests[index] if index < len(digests) else None
+
+
+class SummaryCache:
+    def __init__(self, max_bytes, backend=None, timeout=None):
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        options = settings.EQUIPMENT_SUMMARY_CACHE
+        alias = options.get('BACKEND')
+        return cls(
+            max_bytes=options.get('MAX_BYTES', 16 * 1024 * 1024),
+            backend=caches[alias] if alias else None,
+            timeout=options.get('TIMEOUT'),
+        )
+
+    @staticmethod
+    def _key(digest):
+        return f'equipment-summary:{SUMMARY_VERSION}:{digest}'
+
+    def _remember(self, key, payload):
+        # Caller holds the lock
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+        if len(payload) > self.max_bytes:
+            return
+        self._entries[key] = payload
+        self._size += len(payload)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def get(self, digest):
+        key = self._key(digest)
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+        if payload is None and self.backend is not None:
+            payload = self.backend.get(key)
+            if payload is not None:
+                with self._lock:
+                    self._remember(key, payload)
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(payload)
+
+    def set(self, digest, summary):
+        key = self._key(digest)
+        payload = json.dumps(summary)
+        with self._lock:
+            self._remember(key, payload)
+        if self.backend is not None:
+            self.backend.set(key, payload, self.timeout)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._size,
+            }
+
+
+_summary_cache = None
+_summary_cache_lock = threading.Lock()
+
+
+def get_summary_cache():
+    global _summary_cache
+    with _summary_cache_lock:
+        if _summary_cache is None:
+            _summary_cache = SummaryCache.from_settings()
+        return _summary_cache
+
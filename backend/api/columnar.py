@@ -0,0 +1,208 @@
+"""Columnar per-upload storage of the parsed rows.
+
+Each upload's rows are written, during the same streaming pass that builds
+the summary, as one raw little-endian file per column plus ``type.codes``
+(int32 indexes into ``meta.json['types']``). Reading maps the files with
+``np.memmap``, so slicing, filtering by type and re-aggregating an upload
+never re-parses its CSV.
+
+Directories are named after the upload's content hash when known, so
+identical uploads share one copy.
+"""
+import json
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .summary import COLUMNS, SummaryAccumulator
+
+# Stored as float32: half the size of the float64 values the parser yields
+VALUE_DTYPE = np.dtype('<f4')
+CODE_DTYPE = np.dtype('<i4')
+
+# Rows per block when re-aggregating from the mapped columns
+AGGREGATE_BLOCK_ROWS = 1 << 20
+COPY_BYTES = 4 * 1024 * 1024
+
+# Directories younger than this are never swept: their upload row may not be
+# committed yet. In-progress writes (tmp-*) are only swept once abandoned.
+SWEEP_GRACE_SECONDS = 60
+ABANDONED_TMP_SECONDS = 24 * 60 * 60
+
+
+class ColumnWriter:
+    def __init__(self, root, name):
+        self.root = Path(root)
+        self.name = name
+        self.tmp_dir = self.root / f'tmp-{uuid.uuid4().hex}'
+        self.tmp_dir.mkdir(parents=True)
+        self._files = {col: open(self.tmp_dir / f'{col}.bin', 'wb') for col in COLUMNS}
+        self._codes = open(self.tmp_dir / 'type.codes', 'wb')
+        self.types = []
+        self._type_index = {}
+        self.rows = 0
+
+    def _mapping(self, categories):
+        for name in categories:
+            if name not in self._type_index:
+                self._type_index[name] = len(self.types)
+                self.types.append(name)
+        # Missing types (-1) pick the trailing -1
+        return np.array([self._type_index[name] for name in categories] + [-1], dtype=CODE_DTYPE)
+
+    def append(self, block, codes, categories):
+        for i, col in enumerate(COLUMNS):
+            np.ascontiguousarray(block[:, i], dtype=VALUE_DTYPE).tofile(self._files[col])
+        self._mapping(categories)[codes].astype(CODE_DTYPE).tofile(self._codes)
+        self.rows += len(block)
+
+    def append_stored(self, directory):
+        """Append the rows of another committed writer's directory, then delete it.
+
+        Used to join the parts written by parallel aggregation; values are
+        copied as is and type codes renumbered into this writer's types.
+        """
+        part = UploadColumns(directory)
+        for col in COLUMNS:
+            with open(Path(directory) / f'{col}.bin', 'rb') as src:
+                shutil.copyfileobj(src, self._files[col], COPY_BYTES)
+        mapping = self._mapping(part.types)
+        for start in range(0, part.rows, AGGREGATE_BLOCK_ROWS):
+            mapping[part.codes[start:start + AGGREGATE_BLOCK_ROWS]].tofile(self._codes)
+        self.rows += part.rows
+        del part
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def _close(self):
+        for f in self._files.values():
+            f.close()
+        self._codes.close()
+
+    def commit(self):
+        """Move the finished columns into place; returns the stored name."""
+        self._close()
+        meta = {'rows': self.rows, 'columns': list(COLUMNS), 'types': self.types, 'dtype': VALUE_DTYPE.str}
+        (self.tmp_dir / 'meta.json').write_text(json.dumps(meta))
+        try:
+            self.tmp_dir.rename(self.root / self.name)
+        except OSError:
+            # Same content stored concurrently; keep the existing copy
+            shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        return self.name
+
+    def abort(self):
+        self._close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+class UploadColumns:
+    """Memory-mapped columns of one stored upload."""
+
+    def __init__(self, directory):
+        directory = Path(directory)
+        meta = json.loads((directory / 'meta.json').read_text())
+        self.rows = meta['rows']
+        self.types = meta['types']
+        value_dtype = np.dtype(meta.get('dtype', VALUE_DTYPE))
+        self.columns = {col: self._map(directory / f'{col}.bin', value_dtype) for col in meta['columns']}
+        self.codes = self._map(directory / 'type.codes', CODE_DTYPE)
+
+    def _map(self, path, dtype):
+        if not self.rows:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(self.rows,))
+
+    def row_indices(self, equipment_type=None):
+        """Indices of rows of ``equipment_type``; None means every row."""
+        if equipment_type is None:
+            return None
+        if equipment_type not in self.types:
+            return np.empty(0, dtype=np.intp)
+        return np.flatnonzero(self.codes == self.types.index(equipment_type))
+
+    def slice(self, offset=0, limit=100, equipment_type=None):
+        """``(matching_rows, rows)`` for one page of rows, optionally of one type."""
+        indices = self.row_indices(equipment_type)
+        if indices is None:
+            total = self.rows
+            selection = slice(offset, offset + limit)
+        else:
+            total = len(indices)
+            selection = indices[offset:offset + limit]
+        codes = self.codes[selection]
+        values = {col: self.columns[col][selection] for col in COLUMNS}
+        rows = [
+            {
+                'type': self.types[code] if code >= 0 else None,
+                **{col: _json_float(values[col][i]) for col in COLUMNS},
+            }
+            for i, code in enumerate(codes.tolist())
+        ]
+        return total, rows
+
+    def summary(self, equipment_type=None):
+        """Summary of the stored rows, computed from the mapped columns."""
+        indices = self.row_indices(equipment_type)
+        total = self.rows if indices is None else len(indices)
+        accumulator = SummaryAccumulator()
+        for start in range(0, total, AGGREGATE_BLOCK_ROWS):
+            if indices is None:
+                selection = slice(start, start + AGGREGATE_BLOCK_ROWS)
+            else:
+                selection = indices[start:start + AGGREGATE_BLOCK_ROWS]
+            block = np.stack([self.columns[col][selection] for col in COLUMNS]).T
+            accumulator.update(block, self.codes[selection], self.types)
+        return accumulator.summary()
+
+
+def _json_float(value):
+    if not np.isfinite(value):
+        return None
+    # Shortest repr, so float32 0.1 is sent as 0.1 rather than 0.10000000149
+    return float(str(value))
+
+
+class ColumnStore:
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def exists(self, name):
+        return bool(name) and (self.root / name / 'meta.json').exists()
+
+    def writer(self, digest=None):
+        return ColumnWriter(self.root, digest or uuid.uuid4().hex)
+
+    def open(self, name):
+        return UploadColumns(self.root / name)
+
+    def sweep(self, keep):
+        """Delete stored uploads whose names are not in ``keep``."""
+        if not self.root.exists():
+            return
+        now = time.time()
+        for path in self.root.iterdir():
+            grace = ABANDONED_TMP_SECONDS if path.name.startswith('tmp-') else SWEEP_GRACE_SECONDS
+            if path.name in keep or path.stat().st_mtime > now - grace:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+
+
+_column_store = None
+_column_store_lock = threading.Lock()
+
+
+def get_column_store():
+    """The configured store, or None when row storage is disabled."""
+    global _column_store
+    options = settings.EQUIPMENT_COLUMN_STORE
+    if not options.get('ENABLED'):
+        return None
+    with _column_store_lock:
+        if _column_store is None or _column_store.root != Path(options['ROOT']):
+            _column_store = ColumnStore(options['ROOT'])
+        return _column_store
@@ -0,0 +1,123 @@
+"""Conditional and cached responses for ``api/history/``.
+
+Both frontends poll the history. Every response carries an ETag and a
+Last-Modified date taken from ``HistoryVersion``, which uploads bump, so an
+unchanged history is answered with ``304 Not Modified`` after reading one
+row. Serialized pages are kept per process, keyed on the version, so a
+changed history is read and serialized once per page and not per request;
+an upload invalidates them simply by moving the version on.
+"""
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.utils.timezone import now
+
+from .models import EquipmentUpload, HistoryVersion
+from .serializers import history_entry
+
+
+class HistoryPageCache:
+    """LRU of serialized history pages, ``key -> (payload, next_cursor)``."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            page = self._entries.get(key)
+            if page is not None:
+                self._entries.move_to_end(key)
+            return page
+
+    def set(self, key, page):
+        with self._lock:
+            self._entries[key] = page
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+
+def get_history_cache():
+    """The process's page cache, or None when ``EQUIPMENT_HISTORY_CACHE`` is off."""
+    global _page_cache
+    options = settings.EQUIPMENT_HISTORY_CACHE
+    if not options.get('ENABLED', True):
+        return None
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = HistoryPageCache(options.get('MAX_ENTRIES', 64))
+        return _page_cache
+
+
+def history_etag(version, updated_at):
+    # The timestamp keeps ETags from repeating if the database is replaced
+    stamp = f'{updated_at.timestamp():.6f}' if updated_at else '0'
+    return f'"history-{version}-{stamp}"'
+
+
+def history_last_modified(updated_at):
+    """Last-Modified of the history as a timestamp, or None while it would be ambiguous.
+
+    HTTP dates have whole seconds, so a date given out during the second of
+    the last change would also match a later change in that second. It is
+    only given out, and If-Modified-Since only honoured, once that second
+    has passed.
+    """
+    if updated_at is None:
+        return None
+    second = int(updated_at.timestamp())
+    return second if now().timestamp() >= second + 1 else None
+
+
+def _render_page(limit, cursor):
+    rows, next_cursor = EquipmentUpload.objects.history_page(limit, cursor)
+    return json.dumps([history_entry(row) for row in rows]).encode(), next_cursor
+
+
+def history_response(request, limit, cursor):
+    """The history page for ``limit``/``cursor``, or a 304 if the client's copy is current.
+
+    Raises ValueError for a malformed cursor.
+    """
+    # One snapshot, so the page is never older than the version it is cached under
+    with transaction.atomic():
+        version, updated_at = HistoryVersion.objects.current()
+        etag = history_etag(version, updated_at)
+        last_modified = history_last_modified(updated_at)
+        # As RFC 9110 asks, If-Modified-Since is ignored when If-None-Match is sent
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            cache = get_history_cache()
+            key = (etag, limit, cursor)
+            page = cache.get(key) if cache is not None else None
+            if page is None:
+                page = _render_page(limit, cursor)
+                if cache is not None:
+                    cache.set(key, page)
+            payload, next_cursor = page
+            response = HttpResponse(payload, content_type='application/json')
+            if next_cursor:
+                response['X-Next-Cursor'] = next_cursor
+
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Pollers must revalidate; Last-Modified alone would let browsers reuse stale copies
+    patch_cache_control(response, no_cache=True)
+    return response
@@ -0,0 +1,150 @@
+"""Background processing of uploads.
+
+An async upload is spooled to ``EQUIPMENT_JOBS['SPOOL_DIR']`` and an
+``UploadJob`` row is returned straight away; a local process pool then
+computes the summary, reporting progress in ``rows_processed``. With
+``WORKERS`` set to 0 jobs run inline, which is what the tests use.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import worker
+from .models import EquipmentUpload, UploadJob
+from .pipeline import cached_result, summarize_upload
+from .serializers import upload_summary
+from .validation import NoValidRows
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.EQUIPMENT_JOBS['WORKERS'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=worker.init_worker,
+            )
+        return _executor
+
+
+def spool_file(job_id):
+    # Spooled as uploaded (CSV, compressed or columnar); the format is
+    # detected from the content, so the name does not claim one
+    return Path(settings.EQUIPMENT_JOBS['SPOOL_DIR']) / f'{job_id}.upload'
+
+
+def spool_upload(file, job_id):
+    path = spool_file(job_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'wb') as out:
+        for chunk in file.chunks():
+            out.write(chunk)
+    return path
+
+
+def submit_upload(file, digest=None):
+    """Create a job for ``file`` and hand it to the worker pool."""
+    job = UploadJob(filename=file.name, digest=digest or '')
+
+    # Known content completes without touching the pool
+    result = cached_result(digest)
+    if result is not None:
+        job.status = UploadJob.DONE
+        job.rows_processed = result.summary['total_equipment']
+        job.result = upload_summary(result.summary)
+        job.finished_at = timezone.now()
+        with transaction.atomic():
+            job.upload = EquipmentUpload.objects.record_summary(job.filename, result.summary, result.data_path)
+            job.save()
+        return job
+
+    job.spool_path = str(spool_upload(file, job.id))
+    job.save()
+    if settings.EQUIPMENT_JOBS['WORKERS'] > 0:
+        future = get_executor().submit(worker.run_job, job.id)
+        future.add_done_callback(partial(job_finished, job.id))
+    else:
+        run_job(job.id)
+        job.refresh_from_db()
+    return job
+
+
+def fail_job(job_id, error, result=None):
+    """Mark a job that has not finished as FAILED with ``error``."""
+    UploadJob.objects.filter(pk=job_id, status__in=[UploadJob.PENDING, UploadJob.RUNNING]).update(
+        status=UploadJob.FAILED, error=str(error) or type(error).__name__, result=result,
+        finished_at=timezone.now(),
+    )
+
+
+def remove_spool(job_id):
+    try:
+        os.remove(spool_file(job_id))
+    except OSError:
+        pass
+
+
+def job_finished(job_id, future):
+    """Done callback of a pooled job: report what ``run_job`` could not.
+
+    That is an error before or while the job recorded its own failure, or
+    the worker process dying, which would otherwise leave the job pending.
+    """
+    try:
+        future.result()
+    except Exception as e:
+        logger.error('Upload job %s failed in the worker pool', job_id, exc_info=e)
+        remove_spool(job_id)
+        try:
+            fail_job(job_id, e)
+        except Exception:
+            logger.exception('Could not mark upload job %s as failed', job_id)
+
+
+def run_job(job_id, parallel=True):
+    """Compute the summary for a spooled job.
+
+    In a pool worker ``parallel`` is false: a large file is then aggregated
+    in the worker itself rather than on a second pool nested inside it.
+    """
+    def progress(rows):
+        UploadJob.objects.filter(pk=job_id).update(rows_processed=rows)
+
+    try:
+        job = UploadJob.objects.get(pk=job_id)
+        UploadJob.objects.filter(pk=job_id).update(status=UploadJob.RUNNING)
+        with open(job.spool_path, 'rb') as f:
+            result = summarize_upload(f, job.digest or None, progress=progress, parallel=parallel)
+        # The upload and the finished job are written together
+        with transaction.atomic():
+            upload = EquipmentUpload.objects.record_summary(job.filename, result.summary, result.data_path)
+            UploadJob.objects.filter(pk=job_id).update(
+                status=UploadJob.DONE,
+                rows_processed=result.summary['total_equipment'],
+                result=upload_summary(result.summary),
+                upload=upload,
+                finished_at=timezone.now(),
+            )
+    except Exception as e:
+        # A ValueError is a problem with the file; anything else is ours
+        if not isinstance(e, ValueError):
+            logger.exception('Upload job %s failed', job_id)
+        # The report of a file whose rows were all quarantined
+        fail_job(job_id, e, {'quarantine': e.quarantine} if isinstance(e, NoValidRows) else None)
+    finally:
+        # Found from the id, as the job row may not have been read
+        remove_spool(job_id)
@@ -0,0 +1,207 @@
+"""Request metrics in the Prometheus text format.
+
+``MetricsMiddleware`` (``api/middleware.py``) opens a ``RequestMetrics`` for
+every request and keeps it in a context variable, so code deep in the
+upload path can time its stages with ``stage('parse')`` without being handed
+the request; ``sync_to_async`` copies the context into worker threads.
+Stage times are exclusive: time spent in a nested stage (prune inside the
+DB write) counts only towards the inner one. Database queries are counted
+by a wrapper installed on every new connection.
+
+When the request ends its numbers go into process-wide histograms, which
+``api/metrics/`` renders. Each server process keeps its own histograms, so
+with several workers every scrape reports the worker that answered it.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+ROWS_BUCKETS = (10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(13))  # 1 KiB .. 16 GiB
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        # label values -> [bucket counts..., sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        for key, values in series:
+            labels = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+            bounds = [_number(bound) for bound in self.buckets] + ['+Inf']
+            for bound, count in zip(bounds, values[:-2] + [values[-1]]):
+                le = 'le="%s"' % bound
+                lines.append(f'{self.name}_bucket{_labels(labels + [le])} {count}')
+            lines.append(f'{self.name}_sum{_labels(labels)} {_number(values[-2])}')
+            lines.append(f'{self.name}_count{_labels(labels)} {values[-1]}')
+        return '\n'.join(lines)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels):
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+
+def _number(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+REQUEST_SECONDS = Histogram(
+    'equipment_request_duration_seconds', 'Time to answer a request.',
+    SECONDS_BUCKETS, ('view', 'method', 'status'),
+)
+REQUEST_QUERIES = Histogram(
+    'equipment_request_queries', 'Database queries per request.', QUERY_BUCKETS, ('view',),
+)
+STAGE_SECONDS = Histogram(
+    'equipment_upload_stage_seconds', 'Time per upload stage, excluding nested stages.',
+    SECONDS_BUCKETS, ('stage',),
+)
+UPLOAD_ROWS = Histogram('equipment_upload_rows', 'Rows per processed upload.', ROWS_BUCKETS)
+UPLOAD_BYTES = Histogram('equipment_upload_bytes', 'Size of each uploaded file.', BYTES_BUCKETS)
+
+REGISTRY = (REQUEST_SECONDS, REQUEST_QUERIES, STAGE_SECONDS, UPLOAD_ROWS, UPLOAD_BYTES)
+
+
+def render_metrics():
+    return '\n'.join(metric.render() for metric in REGISTRY) + '\n'
+
+
+class RequestMetrics:
+    """Stage timings and counts for one request."""
+
+    def __init__(self):
+        self.stages = {}
+        self.queries = 0
+        self.rows = None
+        self.bytes = None
+        self._open = []  # [name, start, nested seconds] of running stages
+
+    def begin(self, name):
+        self._open.append([name, time.perf_counter(), 0.0])
+
+    def end(self):
+        name, start, nested = self._open.pop()
+        elapsed = time.perf_counter() - start
+        self.stages[name] = self.stages.get(name, 0.0) + elapsed - nested
+        if self._open:
+            self._open[-1][2] += elapsed
+
+    def observe(self, view, method, status, seconds):
+        REQUEST_SECONDS.observe(seconds, view=view, method=method, status=status)
+        REQUEST_QUERIES.observe(self.queries, view=view)
+        for name, stage_seconds in self.stages.items():
+            STAGE_SECONDS.observe(stage_seconds, stage=name)
+        if self.rows is not None:
+            UPLOAD_ROWS.observe(self.rows)
+        if self.bytes is not None:
+            UPLOAD_BYTES.observe(self.bytes)
+
+    def server_timing(self):
+        """The stages as a ``Server-Timing`` header value (milliseconds)."""
+        return ', '.join(f'{name};dur={seconds * 1000:.1f}' for name, seconds in self.stages.items())
+
+
+_current = contextvars.ContextVar('equipment_request_metrics', default=None)
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def current_request():
+    """The ``RequestMetrics`` of the request being handled, or None."""
+    return _current.get()
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as upload stage ``name`` of the current request."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    metrics.begin(name)
+    try:
+        yield
+    finally:
+        metrics.end()
+
+
+_done = object()
+
+
+def timed_iter(iterable, name):
+    """Yield from ``iterable``, timing each step as stage ``name``."""
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            item = next(iterator, _done)
+        if item is _done:
+            return
+        yield item
+
+
+def observe_upload(rows, size):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.rows = rows
+        metrics.bytes = size
+
+
+def _count_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.queries += 1
+    return execute(sql, params, many, context)
+
+
+def _install_query_counter(sender, connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def install_query_counter():
+    """Count queries on every connection opened from now on; see ``ApiConfig.ready``."""
+    # Imported here: stage() is used by the parsing kernel the desktop app
+    # imports without Django
+    from django.db.backends.signals import connection_created
+
+    connection_created.connect(_install_query_counter, dispatch_uid='equipment_metrics_query_counter')
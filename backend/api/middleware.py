@@ -0,0 +1,113 @@
+import os
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import finish_request, start_request
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILERS = ('cprofile', 'pyinstrument')
+
+
+class MetricsMiddleware:
+    """Record every request in the metrics served at ``api/metrics/``.
+
+    Adds a ``Server-Timing`` header with the stage timings. When
+    ``EQUIPMENT_METRICS['PROFILING']`` is on, a request with an
+    ``X-Profile: cprofile`` or ``X-Profile: pyinstrument`` header is also
+    profiled; the profile is written to ``PROFILE_DIR`` and its file name
+    returned in the ``X-Profile`` response header. Under ASGI, cProfile only
+    sees the event loop thread; pyinstrument follows the async view.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        metrics, token = start_request()
+        start = time.perf_counter()
+        profiler = None
+        try:
+            profiler = _start_profiler(request)
+            response = self.get_response(request)
+        finally:
+            # Also when the view raises, or the profiler stays on for the thread
+            finish_request(token)
+            profile = _stop_profiler(profiler, request)
+        if profile:
+            response['X-Profile'] = profile
+        return _finish(request, response, metrics, time.perf_counter() - start)
+
+    async def _acall(self, request):
+        metrics, token = start_request()
+        start = time.perf_counter()
+        profiler = None
+        try:
+            profiler = _start_profiler(request, async_mode=True)
+            response = await self.get_response(request)
+        finally:
+            # Also when the view raises, or the profiler stays on for the thread
+            finish_request(token)
+            profile = _stop_profiler(profiler, request)
+        if profile:
+            response['X-Profile'] = profile
+        return _finish(request, response, metrics, time.perf_counter() - start)
+
+
+def _finish(request, response, metrics, seconds):
+    match = request.resolver_match
+    view = match.url_name if match and match.url_name else 'unmatched'
+    metrics.observe(view, request.method, response.status_code, seconds)
+    if metrics.stages:
+        response['Server-Timing'] = metrics.server_timing()
+    return response
+
+
+def _start_profiler(request, async_mode=False):
+    kind = request.META.get(PROFILE_HEADER, '').lower()
+    if kind not in PROFILERS or not settings.EQUIPMENT_METRICS.get('PROFILING'):
+        return None
+    if kind == 'cprofile':
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return kind, profiler
+    try:
+        from pyinstrument import Profiler
+    except ImportError:  # optional dependency
+        return None
+    profiler = Profiler(async_mode='enabled' if async_mode else 'disabled')
+    profiler.start()
+    return kind, profiler
+
+
+def _stop_profiler(profiler, request):
+    """Stop and save the profile; returns its file name, or None."""
+    if profiler is None:
+        return None
+    kind, profiler = profiler
+    directory = settings.EQUIPMENT_METRICS['PROFILE_DIR']
+    os.makedirs(directory, exist_ok=True)
+    view = request.path.strip('/').replace('/', '_')
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}-{view}"
+    if kind == 'cprofile':
+        profiler.disable()
+        name += '.prof'
+        profiler.dump_stats(os.path.join(directory, name))
+    else:
+        profiler.stop()
+        name += '.html'
+        with open(os.path.join(directory, name), 'w') as f:
+            f.write(profiler.output_html())
+    return name
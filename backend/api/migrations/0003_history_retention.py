@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_upload_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='uploadjob',
+            name='upload',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='api.equipmentupload'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentupload',
+            index=models.Index(fields=['upload_time', 'id'], name='upload_time_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_history_retention'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipmentupload',
+            name='data_path',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
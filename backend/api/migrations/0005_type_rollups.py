@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_upload_data_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TypeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upload_id', models.BigIntegerField()),
+                ('upload_time', models.DateTimeField()),
+                ('equipment_type', models.CharField(max_length=255)),
+                ('count', models.BigIntegerField()),
+                ('flowrate_count', models.BigIntegerField()),
+                ('flowrate_sum', models.FloatField()),
+                ('flowrate_sumsq', models.FloatField()),
+                ('pressure_count', models.BigIntegerField()),
+                ('pressure_sum', models.FloatField()),
+                ('pressure_sumsq', models.FloatField()),
+                ('temperature_count', models.BigIntegerField()),
+                ('temperature_sum', models.FloatField()),
+                ('temperature_sumsq', models.FloatField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['upload_id'], name='rollup_upload_idx'), models.Index(fields=['upload_time'], name='rollup_time_idx')],
+            },
+        ),
+    ]
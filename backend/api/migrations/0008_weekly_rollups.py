@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:53
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils.timezone import localtime
+
+TOTALS = ['count'] + [f'{metric}_{part}' for metric in ('flowrate', 'pressure', 'temperature')
+                      for part in ('count', 'sum', 'sumsq')]
+
+
+def fill_weekly_rollups(apps, schema_editor):
+    """Sum the per-upload rollups recorded so far into their weeks."""
+    TypeRollup = apps.get_model('api', 'TypeRollup')
+    WeeklyRollup = apps.get_model('api', 'WeeklyRollup')
+    weeks = {}
+    for row in TypeRollup.objects.values('upload_time', 'equipment_type', *TOTALS).iterator():
+        day = localtime(row['upload_time']).date()
+        week = day - timedelta(days=day.weekday())
+        totals = weeks.setdefault((week, row['equipment_type']), dict.fromkeys(TOTALS, 0))
+        for name in TOTALS:
+            totals[name] += row[name]
+    WeeklyRollup.objects.bulk_create([
+        WeeklyRollup(week=week, equipment_type=equipment_type, **totals)
+        for (week, equipment_type), totals in weeks.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_upload_distribution'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('equipment_type', models.CharField(max_length=255)),
+                ('count', models.BigIntegerField()),
+                ('flowrate_count', models.BigIntegerField()),
+                ('flowrate_sum', models.FloatField()),
+                ('flowrate_sumsq', models.FloatField()),
+                ('pressure_count', models.BigIntegerField()),
+                ('pressure_sum', models.FloatField()),
+                ('pressure_sumsq', models.FloatField()),
+                ('temperature_count', models.BigIntegerField()),
+                ('temperature_sum', models.FloatField()),
+                ('temperature_sumsq', models.FloatField()),
+                ('week', models.DateField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('week', 'equipment_type'), name='weekly_rollup_unique')],
+            },
+        ),
+        migrations.RunPython(fill_weekly_rollups, migrations.RunPython.noop),
+    ]
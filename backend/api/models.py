@@ -1,4 +1,90 @@
-from django.db import models
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.utils.timezone import localtime, now
+
+from .metrics import stage
+
+HISTORY_FIELDS = (
+    'id', 'filename', 'upload_time', 'total_equipment',
+    'average_flowrate', 'average_pressure', 'average_temperature',
+)
+CURSOR_FORMAT = '%Y%m%dT%H%M%S.%fZ'
+
+
+def encode_cursor(row):
+    return f"{row['upload_time'].astimezone(timezone.utc):{CURSOR_FORMAT}}_{row['id']}"
+
+
+def decode_cursor(cursor):
+    """Return ``(upload_time, id)`` for a history cursor; ValueError if malformed."""
+    stamp, _, pk = cursor.partition('_')
+    return datetime.strptime(stamp, CURSOR_FORMAT).replace(tzinfo=timezone.utc), int(pk)
+
+
+class EquipmentUploadManager(models.Manager):
+    def record_summary(self, filename, summary, data_path=''):
+        return self.record_summaries([(filename, summary, data_path)])[0]
+
+    def record_summaries(self, items):
+        """Record ``(filename, summary, data_path)`` uploads in one transaction.
+
+        One INSERT for the uploads and one for all their type rollups,
+        followed by a single prune. Returns the uploads, in order.
+        """
+        with stage('db_write'), transaction.atomic():
+            uploads = self.bulk_create([
+                self.model(
+                    filename=filename,
+                    total_equipment=summary['total_equipment'],
+                    average_flowrate=summary['average_flowrate'],
+                    average_pressure=summary['average_pressure'],
+                    average_temperature=summary['average_temperature'],
+                    data_path=data_path,
+                    distribution=summary.get('distribution', {}),
+                )
+                for filename, summary, data_path in items
+            ])
+            rollups = [(upload, summary.get('type_rollups', {})) for upload, (_, summary, _) in zip(uploads, items)]
+            TypeRollup.objects.record_many(rollups)
+            WeeklyRollup.objects.add_many((upload.upload_time, totals) for upload, totals in rollups)
+            with stage('prune'):
+                pruned = self.prune()
+            if pruned:
+                transaction.on_commit(self.sweep_column_store)
+            HistoryVersion.objects.bump()
+        return uploads
+
+    def sweep_column_store(self):
+        """Remove stored rows no remaining upload refers to."""
+        from .columnar import get_column_store
+
+        store = get_column_store()
+        if store is not None:
+            store.sweep(set(self.exclude(data_path='').values_list('data_path', flat=True)))
+
+    def prune(self, keep=None):
+        """Delete everything but the newest ``keep`` uploads in one DELETE."""
+        keep = settings.EQUIPMENT_HISTORY_LIMIT if keep is None else keep
+        newest = self.order_by('-upload_time', '-id').values('id')[:keep]
+        return self.exclude(id__in=newest).delete()[0]
+
+    def history_page(self, limit, cursor=None):
+        """Newest-first history rows after ``cursor``, plus the next cursor.
+
+        Keyset pagination on ``(upload_time, id)``, served by the index.
+        """
+        rows = self.order_by('-upload_time', '-id').values(*HISTORY_FIELDS)
+        if cursor:
+            upload_time, pk = decode_cursor(cursor)
+            rows = rows.filter(Q(upload_time__lt=upload_time) | Q(upload_time=upload_time, id__lt=pk))
+        rows = list(rows[:limit + 1])
+        next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
 
 class EquipmentUpload(models.Model):
     filename = models.CharField(max_length=255)
@@ -7,6 +93,187 @@ class EquipmentUpload(models.Model):
     average_flowrate = models.FloatField()
     average_pressure = models.FloatField()
     average_temperature = models.FloatField()
+    # Directory of the stored rows in the column store (see api/columnar.py)
+    data_path = models.CharField(max_length=255, blank=True)
+    # Value histograms from the summary (SummaryAccumulator.distribution)
+    distribution = models.JSONField(default=dict, blank=True)
+
+    objects = EquipmentUploadManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['upload_time', 'id'], name='upload_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.upload_time})"
+
+
+class HistoryVersionManager(models.Manager):
+    def bump(self):
+        """Mark the upload history as changed; call inside the write's transaction."""
+        updated_at = now()
+        if not self.filter(pk=1).update(version=F('version') + 1, updated_at=updated_at):
+            self.create(pk=1, version=1, updated_at=updated_at)
+
+    def current(self):
+        """``(version, updated_at)`` of the history; ``(0, None)`` before any upload."""
+        return self.filter(pk=1).values_list('version', 'updated_at').first() or (0, None)
+
+
+class HistoryVersion(models.Model):
+    """Single-row change counter for the upload history.
+
+    Bumped by every write to the history, so ``api/history/`` can answer
+    conditional requests and reuse serialized pages without reading the
+    uploads table (see ``api/history.py``).
+    """
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(null=True)
+
+    objects = HistoryVersionManager()
+
+    def __str__(self):
+        return f"history v{self.version}"
+
+
+class UploadJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    spool_path = models.CharField(max_length=500, blank=True)
+    digest = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    rows_processed = models.BigIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    # No cascade so history pruning stays a single DELETE; the job keeps its
+    # own copy of the result if the upload is pruned
+    upload = models.ForeignKey(
+        EquipmentUpload, null=True, blank=True, on_delete=models.DO_NOTHING, db_constraint=False
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.filename} [{self.status}]"
+
+
+def week_start(moment):
+    """The Monday (in the current time zone) of the week ``moment`` falls in."""
+    day = localtime(moment).date()
+    return day - timedelta(days=day.weekday())
+
+
+def rollup_fields(totals):
+    """Model fields for one type's totals from ``summary['type_rollups']``."""
+    fields = {'count': totals['count']}
+    for metric in RollupTotals.METRICS:
+        fields[f'{metric}_count'] = totals[metric]['count']
+        fields[f'{metric}_sum'] = totals[metric]['sum']
+        fields[f'{metric}_sumsq'] = totals[metric]['sumsq']
+    return fields
+
+
+class RollupTotals(models.Model):
+    """Row count, and count/sum/sum of squares per metric, of some rows of one type."""
+    METRICS = ('flowrate', 'pressure', 'temperature')
+
+    equipment_type = models.CharField(max_length=255)
+    count = models.BigIntegerField()
+    flowrate_count = models.BigIntegerField()
+    flowrate_sum = models.FloatField()
+    flowrate_sumsq = models.FloatField()
+    pressure_count = models.BigIntegerField()
+    pressure_sum = models.FloatField()
+    pressure_sumsq = models.FloatField()
+    temperature_count = models.BigIntegerField()
+    temperature_sum = models.FloatField()
+    temperature_sumsq = models.FloatField()
+
+    class Meta:
+        abstract = True
+
+
+class TypeRollupManager(models.Manager):
+    def record_many(self, uploads):
+        """Store the per-type totals (``summary['type_rollups']``) of several
+        ``(upload, rollups)`` pairs in one INSERT."""
+        return self.bulk_create([
+            TypeRollup(upload_id=upload.id, upload_time=upload.upload_time, equipment_type=equipment_type,
+                       **rollup_fields(totals))
+            for upload, rollups in uploads
+            for equipment_type, totals in rollups.items()
+        ])
+
+
+class TypeRollup(RollupTotals):
+    """Per-type totals of one upload, for trend queries without rescans.
+
+    Kept independently of the upload history, so ``upload_id`` may refer to
+    an upload that has since been pruned.
+    """
+    upload_id = models.BigIntegerField()
+    upload_time = models.DateTimeField()
+
+    objects = TypeRollupManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['upload_id'], name='rollup_upload_idx'),
+            models.Index(fields=['upload_time'], name='rollup_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.equipment_type} @ upload {self.upload_id}"
+
+
+class WeeklyRollupManager(models.Manager):
+    def add_many(self, uploads):
+        """Add the per-type totals of ``(upload_time, rollups)`` pairs to their weeks.
+
+        One UPDATE per week and type (an INSERT for the first upload of
+        either); call inside the upload's transaction.
+        """
+        additions = {}
+        for upload_time, rollups in uploads:
+            week = week_start(upload_time)
+            for equipment_type, totals in rollups.items():
+                fields = additions.setdefault((week, equipment_type), {})
+                for name, value in rollup_fields(totals).items():
+                    fields[name] = fields.get(name, 0) + value
+        for (week, equipment_type), fields in additions.items():
+            added = {name: F(name) + value for name, value in fields.items()}
+            if not self.filter(week=week, equipment_type=equipment_type).update(**added):
+                self.create(week=week, equipment_type=equipment_type, **fields)
+
+
+class WeeklyRollup(RollupTotals):
+    """Per-type totals of every upload in a week, for weekly trends.
+
+    Updated as uploads are recorded, so a weekly trend reads one row per
+    week and type however many uploads there were. Like ``TypeRollup`` it
+    outlives history pruning.
+    """
+    # Monday of the week, see ``week_start``
+    week = models.DateField()
+
+    objects = WeeklyRollupManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['week', 'equipment_type'], name='weekly_rollup_unique'),
+        ]
 
     def __str__(self):
-        return f"{self.filename} ({self.upload_time})"
\ No newline at end of file
+        return f"{self.equipment_type} in week of {self.week}"
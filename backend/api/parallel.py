@@ -0,0 +1,168 @@
+"""Parallel aggregation of large CSV uploads.
+
+A plain CSV that is already on disk (Django's temporary upload file, or a
+job's spool file) and at least ``EQUIPMENT_PARALLEL['THRESHOLD_BYTES']``
+long is split into newline-aligned byte ranges. Each range is parsed in a
+pool process straight from a memory map of the file, with the header line
+put in front, into its own ``SummaryAccumulator`` and column store part.
+The partial accumulators are merged in file order, so counts, sums, extremes
+and the type histogram (including its tie order) match a serial pass;
+means and deviations agree to rounding. Percentiles are exact up to
+``summary.SAMPLE_SIZE`` rows and otherwise estimated from a sample, drawn
+per range with the range index as its seed.
+
+Each range is validated on its own and the quarantine reports are merged
+in file order, so quarantined rows keep their file row numbers.
+
+Ranges are cut at newlines, so quoted fields containing line breaks are not
+supported in this mode; equipment files never have them.
+"""
+import io
+import itertools
+import mmap
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from pathlib import Path
+
+from django.conf import settings
+
+from .columnar import ColumnWriter
+from .metrics import stage
+from .parsing import READ_CHUNK_BYTES, SNIFF_BYTES, UploadStream, detect_format, iter_blocks
+from .summary import SummaryAccumulator
+from .validation import Validator
+
+# Ranges smaller than this are not worth a process
+MIN_RANGE_BYTES = 16 * 1024 * 1024
+
+_executor = None
+_executor_workers = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(workers):
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            # Spawned, not forked: the server may be running threads
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _executor_workers = workers
+        return _executor
+
+
+def local_path(file):
+    """Path of the file behind ``file`` on disk, or None."""
+    if hasattr(file, 'temporary_file_path'):
+        return file.temporary_file_path()
+    # A file opened by path (a job's spool file); an UploadedFile's name is
+    # the client's, and a zip member's is relative to its archive
+    name = getattr(file, 'name', None)
+    if isinstance(file, io.IOBase) and isinstance(name, str) and os.path.isabs(name) and os.path.isfile(name):
+        return name
+    return None
+
+
+def parallel_path(file):
+    """The path to aggregate ``file`` from in parallel, or None to stay serial."""
+    options = settings.EQUIPMENT_PARALLEL
+    if options.get('WORKERS', 0) < 2:
+        return None
+    path = local_path(file)
+    if path is None or os.path.getsize(path) < options['THRESHOLD_BYTES']:
+        return None
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+    if detect_format(head, getattr(file, 'content_type', None)) != 'csv':
+        return None
+    return path
+
+
+def split_ranges(data, start, parts):
+    """``(start, end)`` byte ranges of ``data[start:]``, each ending after a newline."""
+    bounds = [start]
+    for i in range(1, parts):
+        target = max(start + (len(data) - start) * i // parts, bounds[-1])
+        newline = data.find(b'\n', target)
+        if newline < 0:
+            break
+        bounds.append(newline + 1)
+    bounds.append(len(data))
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def aggregate_range(path, header, start, end, index, chunk_rows, engine=None, part_root=None, validator=None):
+    """Aggregate one range of ``path``; runs in a pool process.
+
+    Returns the range's accumulator, its quarantine report and the name of
+    its column store part under ``part_root`` (None without one).
+    """
+    writer = ColumnWriter(part_root, f'part-{index}') if part_root else None
+    validator = validator if validator is not None else Validator()
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            def open_range():
+                chunks = (data[offset:min(offset + READ_CHUNK_BYTES, end)]
+                          for offset in range(start, end, READ_CHUNK_BYTES))
+                return io.BufferedReader(UploadStream(itertools.chain([header], chunks)), READ_CHUNK_BYTES)
+
+            accumulator = SummaryAccumulator(seed=index)
+            for block, codes, categories in iter_blocks(open_range(), chunk_rows, engine, validator, open_range):
+                accumulator.update(block, codes, categories)
+                if writer is not None:
+                    writer.append(block, codes, categories)
+    except Exception:
+        if writer is not None:
+            writer.abort()
+        raise
+    return accumulator, validator.report, writer.commit() if writer is not None else None
+
+
+def aggregate_parallel(path, workers, chunk_rows, progress=None, writer=None, engine=None,
+                       validator=None, min_range_bytes=MIN_RANGE_BYTES):
+    """Summary of the CSV at ``path`` using up to ``workers`` processes.
+
+    Takes the same ``progress``, ``writer`` and ``validator`` as
+    ``aggregate_upload``; progress is reported as each range is merged.
+    Every range is checked by a copy of ``validator``.
+    """
+    validator = validator if validator is not None else Validator()
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        # Without a newline the whole file is the header
+        header_end = data.find(b'\n') + 1 or len(data)
+        header = data[:header_end]
+        parts = max(1, min(workers, (len(data) - header_end) // min_range_bytes))
+        # A header-only file still goes through the parser, which reports it
+        ranges = split_ranges(data, header_end, parts) or [(header_end, header_end)]
+
+    part_root = str(writer.tmp_dir) if writer is not None else None
+    executor = get_executor(workers)
+    futures = [
+        executor.submit(aggregate_range, path, header, start, end, index, chunk_rows, engine, part_root, validator)
+        for index, (start, end) in enumerate(ranges)
+    ]
+    accumulator = SummaryAccumulator()
+    try:
+        # Merged in file order, so types keep their first-seen order
+        for future in futures:
+            # Workers parse and aggregate their range together
+            with stage('parse'):
+                part, report, part_name = future.result()
+            accumulator.merge(part)
+            validator.report.merge(report)
+            if writer is not None:
+                with stage('store'):
+                    writer.append_stored(Path(part_root) / part_name)
+            if progress is not None:
+                progress(accumulator.rows)
+    except BaseException:
+        # Let running ranges finish before the caller removes their parts
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        raise
+    with stage('aggregate'):
+        return {**accumulator.summary(), 'quarantine': validator.report.as_dict()}
@@ -0,0 +1,335 @@
+"""Streaming, schema-driven CSV parsing.
+
+Yields ``(block, codes, categories)`` tuples ready for
+``SummaryAccumulator.update``: a column-major float64 block in
+``summary.COLUMNS`` order and integer-coded equipment types. Only the schema
+columns are read, with pinned dtypes, using pyarrow's streaming CSV reader
+when it is installed and pandas' C parser otherwise.
+
+``iter_upload`` also accepts gzip- or zstd-compressed CSV, decompressed
+while streaming, and Parquet or Arrow IPC files, read a record batch at a
+time. The format is recognised by its magic bytes, or by the upload's
+content type when those are inconclusive; every format yields the same
+blocks. Zstd and the columnar formats need pyarrow.
+
+Every block passes through an ``api.validation.Validator`` before it is
+yielded. Numbers are parsed straight into float64; only when a numeric
+cell turns out not to be a number is the CSV read again (skipping the rows
+already yielded) with the numeric columns as text, coerced in bulk, so that
+the bad cells can be reported and their rows quarantined. Clean files never
+take that path.
+"""
+import csv
+import gzip
+import io
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from .metrics import stage
+from .schema import CATEGORY_COLUMN, NUMERIC_COLUMNS, resolve_columns
+from .summary import COLUMNS
+from .validation import Validator
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+DEFAULT_ENGINE = 'pyarrow' if pa is not None else 'c'
+
+# Bytes pulled from the upload per read
+READ_CHUNK_BYTES = 1024 * 1024
+
+# pyarrow parses in byte blocks; this approximates the rows-per-chunk setting
+APPROX_ROW_BYTES = 32
+MIN_ARROW_BLOCK_BYTES = 64 * 1024
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Leading bytes -> upload format. Arrow IPC streams start with the
+# continuation marker; IPC files with "ARROW1".
+FORMAT_MAGIC = (
+    (GZIP_MAGIC, 'gzip'),
+    (ZSTD_MAGIC, 'zstd'),
+    (b'PAR1', 'parquet'),
+    (b'ARROW1', 'arrow'),
+    (b'\xff\xff\xff\xff', 'arrow-stream'),
+)
+CONTENT_TYPES = {
+    'application/gzip': 'gzip',
+    'application/x-gzip': 'gzip',
+    'application/zstd': 'zstd',
+    'application/vnd.apache.parquet': 'parquet',
+    'application/x-parquet': 'parquet',
+    'application/vnd.apache.arrow.file': 'arrow',
+    'application/vnd.apache.arrow.stream': 'arrow-stream',
+}
+SNIFF_BYTES = 8
+
+# Text the float parsers accept; matched against trimmed cells in checking mode
+NUMBER_PATTERN = r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$|^[+-]?(?i:inf|infinity)$'
+
+
+class UploadStream(io.RawIOBase):
+    """Read-only binary stream over an iterator of byte chunks."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            try:
+                self._pending = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def detect_format(head, content_type=None):
+    """The upload format ('csv', 'gzip', 'zstd', 'parquet', 'arrow' or
+    'arrow-stream') from its leading bytes, else from its content type."""
+    for magic, fmt in FORMAT_MAGIC:
+        if head.startswith(magic):
+            return fmt
+    if content_type:
+        return CONTENT_TYPES.get(content_type.split(';')[0].strip().lower(), 'csv')
+    return 'csv'
+
+
+def _require_pyarrow(fmt):
+    if pa is None:
+        raise ValueError(f'{fmt} uploads need pyarrow installed')
+
+
+def open_upload(file, chunk_size=READ_CHUNK_BYTES, content_type=None):
+    """Wrap an ``UploadedFile`` (or any binary file) as a buffered binary stream.
+
+    Gzip- and zstd-compressed content is decompressed on the fly.
+    """
+    if hasattr(file, 'chunks'):
+        raw = UploadStream(file.chunks(chunk_size))
+    else:
+        raw = UploadStream(iter(lambda: file.read(chunk_size), b''))
+    stream = io.BufferedReader(raw, chunk_size)
+    fmt = detect_format(stream.peek(SNIFF_BYTES)[:SNIFF_BYTES], content_type)
+    if fmt == 'gzip':
+        return io.BufferedReader(gzip.GzipFile(fileobj=stream, mode='rb'), chunk_size)
+    if fmt == 'zstd':
+        _require_pyarrow(fmt)
+        decompressed = pa.CompressedInputStream(pa.PythonFile(stream, mode='r'), 'zstd')
+        return io.BufferedReader(UploadStream(iter(lambda: decompressed.read(chunk_size), b'')), chunk_size)
+    return stream
+
+
+def _read_header(stream):
+    line = stream.readline()
+    if not line.strip():
+        raise ValueError('Empty file')
+    header = next(csv.reader([line.decode('utf-8-sig')]))
+    # Hand the parser the header again, followed by the rest of the stream
+    rest = iter(lambda: stream.read(READ_CHUNK_BYTES), b'')
+    return header, io.BufferedReader(UploadStream(itertools.chain([line], rest)), READ_CHUNK_BYTES)
+
+
+def _pandas_blocks(stream, columns, chunk_rows, text=False, skip_rows=0):
+    numeric_dtype = object if text else None
+    dtype = {columns[col]: numeric_dtype or dt for col, dt in NUMERIC_COLUMNS.items()}
+    dtype[columns[CATEGORY_COLUMN]] = 'category'
+    with pd.read_csv(stream, usecols=list(columns.values()), dtype=dtype, chunksize=chunk_rows,
+                     skiprows=range(1, skip_rows + 1) if skip_rows else None) as reader:
+        for chunk in reader:
+            types = chunk[columns[CATEGORY_COLUMN]]
+            codes, categories = types.cat.codes.to_numpy(), list(types.cat.categories)
+            if not text:
+                block = np.stack([chunk[columns[col]].to_numpy() for col in COLUMNS]).T
+                yield block, codes, categories, None, None
+                continue
+            numeric, invalid, raw = [], np.zeros((len(chunk), len(COLUMNS)), dtype=bool), {}
+            for i, col in enumerate(COLUMNS):
+                cells = chunk[columns[col]]
+                values = pd.to_numeric(cells, errors='coerce')
+                invalid[:, i] = (values.isna() & cells.notna() & (cells.astype(str).str.strip() != '')).to_numpy()
+                numeric.append(values.to_numpy(dtype=np.float64, na_value=np.nan))
+                raw[i] = cells.to_numpy()
+            yield np.stack(numeric).T, codes, categories, invalid, raw
+
+
+def _arrow_blocks(stream, columns, chunk_rows, text=False, skip_rows=0):
+    numeric_type = pa.string() if text else pa.float64()
+    column_types = {columns[col]: numeric_type for col in NUMERIC_COLUMNS}
+    column_types[columns[CATEGORY_COLUMN]] = pa.dictionary(pa.int32(), pa.string())
+    reader = pa_csv.open_csv(
+        stream,
+        read_options=pa_csv.ReadOptions(
+            block_size=max(chunk_rows * APPROX_ROW_BYTES, MIN_ARROW_BLOCK_BYTES),
+            skip_rows_after_names=skip_rows,
+        ),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=list(columns.values()), column_types=column_types,
+            # Empty type cells are missing, as with pandas
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        yield _batch_block(batch, columns)
+
+
+def _arrow_float64(values):
+    """``values`` as float64, and a mask of cells whose text is not a number (or None)."""
+    if values.type == pa.float64():
+        return values.to_numpy(zero_copy_only=False), None
+    try:
+        return pc.cast(values, pa.float64()).to_numpy(zero_copy_only=False), None
+    except pa.ArrowInvalid:
+        if not (pa.types.is_string(values.type) or pa.types.is_large_string(values.type)):
+            raise
+    # Coerce in bulk: trim, keep what looks like a number, cast that
+    text = pc.utf8_trim_whitespace(values)
+    number = pc.match_substring_regex(text, NUMBER_PATTERN).fill_null(True)
+    invalid = pc.and_(pc.invert(number), pc.not_equal(text, '').fill_null(False))
+    numbers = pc.cast(pc.if_else(number, text, pa.scalar(None, text.type)), pa.float64())
+    return numbers.to_numpy(zero_copy_only=False), invalid.to_numpy(zero_copy_only=False)
+
+
+def _batch_block(batch, columns):
+    """``(block, codes, categories, invalid, raw)`` for an Arrow record batch.
+
+    CSV batches already have the pinned types, or text in checking mode;
+    columnar files may store other numeric widths or plain strings, which
+    are converted here. ``invalid`` (None when every cell is a number) marks
+    the text cells that are not, and ``raw`` holds those columns' text.
+    """
+    numeric, invalid, raw = [], None, {}
+    for i, col in enumerate(COLUMNS):
+        values = batch.column(columns[col])
+        numbers, bad = _arrow_float64(values)
+        numeric.append(numbers)
+        if bad is not None and bad.any():
+            if invalid is None:
+                invalid = np.zeros((batch.num_rows, len(COLUMNS)), dtype=bool)
+            invalid[:, i] = bad
+            raw[i] = values.to_numpy(zero_copy_only=False)
+    types = batch.column(columns[CATEGORY_COLUMN])
+    if not pa.types.is_dictionary(types.type):
+        if not pa.types.is_string(types.type):
+            types = pc.cast(types, pa.string())
+        types = pc.dictionary_encode(types)
+    codes = types.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+    return np.stack(numeric).T, codes, types.dictionary.to_pylist(), invalid, raw
+
+
+def _columnar_blocks(batches, columns, chunk_rows):
+    # Record batches are as large as the writer made them; slice them
+    # (zero-copy) so no more than chunk_rows rows are converted at once
+    for batch in batches:
+        for offset in range(0, batch.num_rows, chunk_rows):
+            yield _batch_block(batch.slice(offset, chunk_rows), columns)
+
+
+def _parquet_blocks(file, chunk_rows):
+    parquet = pq.ParquetFile(file)
+    columns = resolve_columns(parquet.schema_arrow.names)
+    batches = parquet.iter_batches(batch_size=chunk_rows, columns=list(columns.values()))
+    return _columnar_blocks(batches, columns, chunk_rows)
+
+
+def _arrow_file_blocks(file, chunk_rows):
+    reader = pa_ipc.open_file(file)
+    columns = resolve_columns(reader.schema.names)
+    batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    return _columnar_blocks(batches, columns, chunk_rows)
+
+
+def _arrow_stream_blocks(stream, chunk_rows):
+    reader = pa_ipc.open_stream(stream)
+    columns = resolve_columns(reader.schema.names)
+    return _columnar_blocks(reader, columns, chunk_rows)
+
+
+def _validated(blocks, validator):
+    for block, codes, categories, invalid, raw in blocks:
+        with stage('validate'):
+            block, codes = validator.check(block, codes, categories, invalid, raw)
+        if len(block):
+            yield block, codes, categories
+
+
+def _csv_blocks(stream, chunk_rows, engine, reopen):
+    header, stream = _read_header(stream)
+    columns = resolve_columns(header)
+    parse = _arrow_blocks if engine == 'pyarrow' else _pandas_blocks
+    done = 0
+    if reopen is not None:
+        try:
+            for block in parse(stream, columns, chunk_rows):
+                done += len(block[0])
+                yield block
+            return
+        except ValueError:  # includes pyarrow.ArrowInvalid
+            # A numeric cell that is not a number: read the rest again as text
+            _, stream = _read_header(reopen())
+    yield from parse(stream, columns, chunk_rows, text=True, skip_rows=done)
+
+
+def iter_blocks(stream, chunk_rows, engine=None, validator=None, reopen=None):
+    """Parse a binary CSV stream into validated ``(block, codes, categories)`` chunks.
+
+    ``reopen`` returns the stream again from its start, for the checking
+    pass when a numeric cell is not a number; without it the numeric
+    columns are read as text from the start. Rows failing validation are
+    dropped and recorded in ``validator.report`` (a default ``Validator``
+    if none is given).
+    """
+    engine = engine or DEFAULT_ENGINE
+    validator = validator if validator is not None else Validator()
+    return _validated(_csv_blocks(stream, chunk_rows, engine, reopen), validator)
+
+
+def _reopen(file, content_type):
+    """A callable giving ``file``'s content again from the start, or None if it cannot seek."""
+    seekable = getattr(file, 'seekable', None)
+    if seekable is None or not seekable():
+        return None
+
+    def reopen():
+        file.seek(0)
+        return open_upload(file, content_type=content_type)
+    return reopen
+
+
+def iter_upload(file, chunk_rows, engine=None, validator=None):
+    """Parse an upload in any supported format into validated ``(block, codes, categories)``.
+
+    Parquet and Arrow IPC files are read from ``file`` directly, which must
+    be seekable (Django's uploaded files are); everything else is streamed.
+    ``engine`` only applies to CSV. See ``iter_blocks`` for ``validator``.
+    """
+    validator = validator if validator is not None else Validator()
+    content_type = getattr(file, 'content_type', None)
+    head = file.read(SNIFF_BYTES)
+    file.seek(0)
+    fmt = detect_format(head, content_type)
+    if fmt in ('parquet', 'arrow'):
+        _require_pyarrow(fmt)
+        if fmt == 'parquet':
+            return _validated(_parquet_blocks(file, chunk_rows), validator)
+        return _validated(_arrow_file_blocks(file, chunk_rows), validator)
+    stream = open_upload(file, content_type=content_type)
+    if fmt == 'arrow-stream':
+        _require_pyarrow(fmt)
+        return _validated(_arrow_stream_blocks(stream, chunk_rows), validator)
+    return iter_blocks(stream, chunk_rows, engine, validator, _reopen(file, content_type))
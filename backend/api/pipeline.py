@@ -0,0 +1,104 @@
+"""Upload processing shared by the sync, async and background paths."""
+import hashlib
+import json
+from collections import namedtuple
+
+from django.conf import settings
+
+from .aggregation import CHUNK_ROWS, aggregate_upload
+from .cache import get_summary_cache
+from .columnar import get_column_store
+from .metrics import stage
+from .parallel import aggregate_parallel, parallel_path
+from .parsing import DEFAULT_ENGINE
+from .validation import SAMPLE_ROWS, NoValidRows, Validator
+
+UploadResult = namedtuple('UploadResult', ['summary', 'cache_status', 'data_path'])
+
+
+def result_key(digest):
+    """Name of the result for content ``digest`` under the current settings.
+
+    The summary and the stored rows also depend on the validation ranges and
+    the parser, so the name carries a fingerprint of those; it keys the
+    summary cache and names the stored rows.
+    """
+    config = [settings.EQUIPMENT_VALIDATION, CHUNK_ROWS, DEFAULT_ENGINE]
+    fingerprint = hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+    return f'{digest}-{fingerprint[:16]}'
+
+
+def cached_result(digest):
+    """The stored result for content ``digest``, or None.
+
+    A cached summary only counts when the upload's rows are stored too (or
+    row storage is off), so every recorded upload can be re-analysed.
+    """
+    if not digest:
+        return None
+    key = result_key(digest)
+    store = get_column_store()
+    if store is not None and not store.exists(key):
+        return None
+    summary = get_summary_cache().get(key)
+    if summary is None:
+        return None
+    return UploadResult(summary, 'hit', key if store is not None else '')
+
+
+def upload_validator():
+    """A ``Validator`` with the ranges configured in ``EQUIPMENT_VALIDATION``."""
+    options = settings.EQUIPMENT_VALIDATION
+    return Validator(options.get('RANGES'), options.get('TYPE_RANGES'), options.get('SAMPLE_ROWS', SAMPLE_ROWS))
+
+
+def check_recordable(summary):
+    """Raise ValueError unless ``summary`` has every average an upload records."""
+    if not summary['total_equipment']:
+        if summary['quarantine']['rows']:
+            raise NoValidRows(summary['quarantine'])
+        raise ValueError("No equipment rows in file")
+    empty = [column.title() for column, stats in summary['column_stats'].items() if not stats['count']]
+    if empty:
+        raise ValueError(f"No values in column: {', '.join(empty)}")
+
+
+def summarize_upload(file, digest=None, progress=None, parallel=True):
+    """Summarise ``file``, reusing the cached result for the same bytes.
+
+    With ``parallel`` false a large file is still aggregated serially; pool
+    workers pass it, as they must not start a pool of their own.
+
+    Raises ValueError when the file gives nothing to record: no rows, or a
+    numeric column without a single value. That is ``NoValidRows`` when
+    every row was quarantined.
+    """
+    result = cached_result(digest)
+    if result is not None:
+        return result
+
+    key = result_key(digest) if digest else None
+    store = get_column_store()
+    writer = store.writer(key) if store is not None else None
+    validator = upload_validator()
+    try:
+        path = parallel_path(file) if parallel else None
+        if path is not None:
+            # Large CSV on disk: split across the aggregation pool
+            workers = settings.EQUIPMENT_PARALLEL['WORKERS']
+            summary = aggregate_parallel(path, workers, CHUNK_ROWS, progress=progress, writer=writer,
+                                         validator=validator)
+        else:
+            # Stream the upload in chunks instead of loading it into one DataFrame
+            summary = aggregate_upload(file, progress=progress, writer=writer, validator=validator)
+        # Neither cached nor stored, so a re-upload is checked again
+        check_recordable(summary)
+    except Exception:
+        if writer is not None:
+            writer.abort()
+        raise
+    with stage('store'):
+        data_path = writer.commit() if writer is not None else ''
+    if key:
+        get_summary_cache().set(key, summary)
+    return UploadResult(summary, 'miss', data_path)
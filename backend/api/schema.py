@@ -0,0 +1,35 @@
+"""Declared layout of an equipment CSV.
+
+Headers are matched case- and whitespace-insensitively, only the columns
+listed here are read, and their dtypes are pinned instead of inferred.
+``Equipment Name`` is never aggregated, so it is not read at all.
+"""
+import numpy as np
+
+# Canonical (normalized) column name -> dtype. Parsed as float64, so the
+# averages match a plain pandas read; only the column store keeps float32.
+NUMERIC_COLUMNS = {
+    'flowrate': np.float64,
+    'pressure': np.float64,
+    'temperature': np.float64,
+}
+CATEGORY_COLUMN = 'type'
+REQUIRED_COLUMNS = (CATEGORY_COLUMN, *NUMERIC_COLUMNS)
+
+
+def normalize(name):
+    return name.strip().lower()
+
+
+def resolve_columns(header):
+    """Map canonical names to the file's actual header names.
+
+    Raises ValueError naming any required column the header lacks.
+    """
+    actual = {}
+    for name in header:
+        actual.setdefault(normalize(name), name)
+    missing = [col for col in REQUIRED_COLUMNS if col not in actual]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    return {col: actual[col] for col in REQUIRED_COLUMNS}
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.urls import reverse
+
+from .validation import NoValidRows
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Summary keys that are recorded but not sent: the histograms are served by
+# api/uploads/<id>/distribution/, and the per-type totals feed api/analytics/
+INTERNAL_SUMMARY_KEYS = ('distribution', 'type_rollups')
+
+
+def history_entry(row):
+    """Serialize a ``values()`` row from ``EquipmentUpload.objects.history_page``."""
+    return {
+        'filename': row['filename'],
+        'upload_time': row['upload_time'].strftime(TIME_FORMAT),
+        'total_equipment': row['total_equipment'],
+        'average_flowrate': row['average_flowrate'],
+        'average_pressure': row['average_pressure'],
+        'average_temperature': row['average_temperature'],
+    }
+
+
+def upload_summary(summary):
+    """The client's copy of an upload summary."""
+    return {key: value for key, value in summary.items() if key not in INTERNAL_SUMMARY_KEYS}
+
+
+def history_params(query_params):
+    """``(limit, cursor)`` from the history query string; ValueError if invalid."""
+    limit = int(query_params.get('limit', settings.EQUIPMENT_HISTORY_PAGE_SIZE))
+    if not 1 <= limit <= 100:
+        raise ValueError('limit must be between 1 and 100')
+    return limit, query_params.get('cursor') or None
+
+
+def upload_error(error):
+    """Body of the 400 for an unusable upload (a ValueError)."""
+    body = {'error': str(error)}
+    if isinstance(error, NoValidRows):
+        body['quarantine'] = error.quarantine
+    return body
+
+
+def job_accepted(job):
+    return {
+        'job_id': str(job.id),
+        'status': job.status,
+        'status_url': reverse('get_job_status', args=[job.id]),
+    }
+
+
+def job_status(job):
+    return {
+        'job_id': str(job.id),
+        'filename': job.filename,
+        'status': job.status,
+        'rows_processed': job.rows_processed,
+        'result': job.result,
+        'error': job.error,
+        'upload_id': job.upload_id,
+        'created_at': job.created_at.strftime(TIME_FORMAT),
+        'finished_at': job.finished_at.strftime(TIME_FORMAT) if job.finished_at else None,
+    }
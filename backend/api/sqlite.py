@@ -0,0 +1,25 @@
+"""SQLite tuning for the backend's database connections.
+
+``EQUIPMENT_SQLITE_PRAGMAS`` are set on every new SQLite connection. The
+defaults put the database in WAL mode, so history reads do not wait for an
+upload being written (and the reverse), and relax ``synchronous`` to
+NORMAL, which in WAL mode syncs at checkpoints rather than on every commit:
+a committed upload survives the process crashing, though a power loss may
+lose the last few. Concurrent writers still take turns; the ``timeout`` in
+``DATABASES`` is how long one waits before "database is locked".
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+def _apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    # On the raw connection, so the settings are not counted as request queries
+    for name, value in settings.EQUIPMENT_SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def install_sqlite_pragmas():
+    """Tune every SQLite connection opened from now on; see ``ApiConfig.ready``."""
+    connection_created.connect(_apply_pragmas, dispatch_uid='equipment_sqlite_pragmas')
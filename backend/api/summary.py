@@ -0,0 +1,381 @@
+"""Fused summary kernel shared by the backend and the desktop client.
+
+All numeric aggregates for a block of rows are computed together from one
+``(rows, columns)`` float64 array, and the type histogram, per-type sums and
+per-type value histograms from integer-coded categories with ``np.bincount``.
+Accumulators can be merged, so a file can be summarised block by block (or
+in parallel) and combined afterwards.
+
+This module only depends on NumPy so it can be imported outside Django.
+"""
+import numpy as np
+
+COLUMNS = ('flowrate', 'pressure', 'temperature')
+PERCENTILES = (25, 50, 75)
+
+# Rows kept for percentile estimation; percentiles are exact below this size
+SAMPLE_SIZE = 10_000
+
+# Bins per column histogram (see SummaryAccumulator.distribution)
+HISTOGRAM_BINS = 32
+# Bin width for a column whose values are all equal
+MIN_BIN_WIDTH = 2.0 ** -16
+# Rows binned at a time
+HISTOGRAM_CHUNK_ROWS = 1 << 15
+
+
+def _finite(value):
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def _grid(low, high, bins):
+    """``(start, width)`` of the histogram grid for values in ``[low, high]``.
+
+    The width is the smallest power of two that fits the range in ``bins``
+    bins, and the start a multiple of it, so the grid depends on the range
+    alone and a wider range's bins are unions of a narrower range's.
+    """
+    width = 2.0 ** np.ceil(np.log2(max((high - low) / bins, MIN_BIN_WIDTH)))
+    while np.floor(high / width) - np.floor(low / width) >= bins:
+        width *= 2
+    return np.floor(low / width) * width, width
+
+
+def _rebin(counts, start, width, new_start, new_width):
+    """Histogram ``counts`` (bins on the last axis) moved onto a coarser grid."""
+    bins = counts.shape[-1]
+    if not width:
+        return counts
+    edges = start + width * np.arange(bins)
+    target = np.minimum(((edges - new_start) // new_width).astype(np.intp), bins - 1)
+    moved = np.zeros_like(counts)
+    np.add.at(moved, (Ellipsis, target), counts)
+    return moved
+
+
+class SummaryAccumulator:
+    """Mergeable running statistics for the equipment columns."""
+
+    def __init__(self, columns=COLUMNS, sample_size=SAMPLE_SIZE, seed=0, histogram_bins=HISTOGRAM_BINS):
+        self.columns = tuple(columns)
+        width = len(self.columns)
+        self.rows = 0
+        self.count = np.zeros(width, dtype=np.int64)
+        self.mean = np.zeros(width)
+        self.m2 = np.zeros(width)
+        self.min = np.full(width, np.nan)
+        self.max = np.full(width, np.nan)
+        self.type_names = []
+        self._type_index = {}
+        self.type_counts = np.zeros(0, dtype=np.int64)
+        # Per type and column: non-missing values, their sum and sum of squares
+        self.type_value_counts = np.zeros((0, width), dtype=np.int64)
+        self.type_sums = np.zeros((0, width))
+        self.type_sumsq = np.zeros((0, width))
+        # Per column: one grid of histogram bins (width 0 until a finite
+        # value is seen) shared by every type, and the finite extremes it covers
+        self.histogram_bins = histogram_bins
+        self.bin_start = np.zeros(width)
+        self.bin_width = np.zeros(width)
+        self._finite_min = np.full(width, np.nan)
+        self._finite_max = np.full(width, np.nan)
+        self.type_histograms = np.zeros((0, width, histogram_bins), dtype=np.int64)
+        self.untyped_histograms = np.zeros((width, histogram_bins), dtype=np.int64)
+        self.sample_size = sample_size
+        self._rng = np.random.default_rng(seed)
+        self._sample_keys = np.empty(0)
+        self._sample = np.empty((0, width))
+
+    @classmethod
+    def from_summary(cls, summary, columns=COLUMNS):
+        """Rebuild an accumulator from ``summary()`` output, e.g. a cached one.
+
+        Everything but the percentile sample is recovered, so merging these
+        gives exact counts, averages, extremes, deviations and per-type
+        totals, with None for the percentiles.
+        """
+        accumulator = cls(columns)
+        stats = [summary['column_stats'][column] for column in accumulator.columns]
+        accumulator.rows = summary['total_equipment']
+        accumulator.count = np.array([s['count'] for s in stats], dtype=np.int64)
+        accumulator.mean = np.array([
+            summary[f'average_{column}'] if s['count'] else 0.0
+            for column, s in zip(accumulator.columns, stats)
+        ], dtype=np.float64)
+        std = np.array([s['std'] if s['std'] is not None else 0.0 for s in stats], dtype=np.float64)
+        accumulator.m2 = std ** 2 * np.maximum(accumulator.count - 1, 0)
+        accumulator.min = np.array([np.nan if s['min'] is None else s['min'] for s in stats], dtype=np.float64)
+        accumulator.max = np.array([np.nan if s['max'] is None else s['max'] for s in stats], dtype=np.float64)
+
+        rollups = summary['type_rollups']
+        accumulator._global_codes(list(rollups))
+        for t, totals in enumerate(rollups.values()):
+            accumulator.type_counts[t] = totals['count']
+            for i, column in enumerate(accumulator.columns):
+                accumulator.type_value_counts[t, i] = totals[column]['count']
+                accumulator.type_sums[t, i] = totals[column]['sum']
+                accumulator.type_sumsq[t, i] = totals[column]['sumsq']
+
+        distribution = summary.get('distribution')
+        if distribution and distribution['bins'] == accumulator.histogram_bins:
+            accumulator._finite_min = accumulator.min.copy()
+            accumulator._finite_max = accumulator.max.copy()
+            for i, column in enumerate(accumulator.columns):
+                grid = distribution['grid'][column]
+                if grid is not None:
+                    accumulator.bin_start[i], accumulator.bin_width[i] = grid['start'], grid['width']
+                accumulator.untyped_histograms[i] = distribution['all'][column]
+                for t, name in enumerate(accumulator.type_names):
+                    counts = distribution['types'][name][column]
+                    accumulator.type_histograms[t, i] = counts
+                    accumulator.untyped_histograms[i] -= counts
+        return accumulator
+
+    def _global_codes(self, categories):
+        for name in categories:
+            if name not in self._type_index:
+                self._type_index[name] = len(self.type_names)
+                self.type_names.append(name)
+        grow = len(self.type_names) - len(self.type_counts)
+        if grow > 0:
+            self.type_counts = np.pad(self.type_counts, (0, grow))
+            self.type_value_counts = np.pad(self.type_value_counts, ((0, grow), (0, 0)))
+            self.type_sums = np.pad(self.type_sums, ((0, grow), (0, 0)))
+            self.type_sumsq = np.pad(self.type_sumsq, ((0, grow), (0, 0)))
+            self.type_histograms = np.pad(self.type_histograms, ((0, grow), (0, 0), (0, 0)))
+        return np.array([self._type_index[name] for name in categories], dtype=np.intp)
+
+    def _add_moments(self, count, mean, m2):
+        total = self.count + count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean - self.mean
+            weight = np.where(total > 0, count / np.maximum(total, 1), 0.0)
+            self.mean = np.where(count > 0, self.mean + delta * weight, self.mean)
+            self.m2 = np.where(count > 0, self.m2 + m2 + delta ** 2 * self.count * weight, self.m2)
+        self.count = total
+
+    def _fit_grids(self, low, high):
+        """Widen the histogram grids to cover ``low``/``high`` (finite extremes per column)."""
+        self._finite_min = np.fmin(self._finite_min, low)
+        self._finite_max = np.fmax(self._finite_max, high)
+        for i in np.flatnonzero(~np.isnan(self._finite_min)):
+            start, width = _grid(self._finite_min[i], self._finite_max[i], self.histogram_bins)
+            if start != self.bin_start[i] or width != self.bin_width[i]:
+                old = self.bin_start[i], self.bin_width[i]
+                self.type_histograms[:, i] = _rebin(self.type_histograms[:, i], *old, start, width)
+                self.untyped_histograms[i] = _rebin(self.untyped_histograms[i], *old, start, width)
+                self.bin_start[i], self.bin_width[i] = start, width
+
+    def _add_histograms(self, values, missing, low, high, row_types):
+        """Bin a block's values; ``low``/``high`` are its NaN-ignoring extremes
+        and ``row_types`` holds global type codes, ``len(type_names)`` for
+        rows without a type."""
+        if np.isinf(low).any() or np.isinf(high).any():
+            # Rare: infinities are skipped, like missing values
+            missing = ~np.isfinite(values)
+            with np.errstate(invalid='ignore'):
+                low = np.where(missing, np.inf, values).min(axis=1)
+                high = np.where(missing, -np.inf, values).max(axis=1)
+            low[np.isinf(low)] = np.nan
+            high[np.isinf(high)] = np.nan
+        self._fit_grids(low, high)
+        bins = self.histogram_bins
+        types = len(self.type_names)
+        offsets = row_types * bins
+        # Binned a slice at a time, so the scratch arrays stay in cache
+        scaled = np.empty(min(values.shape[1], HISTOGRAM_CHUNK_ROWS))
+        indexes = np.empty(len(scaled), dtype=np.intp)
+        for i in range(len(self.columns)):
+            if not self.bin_width[i]:
+                continue
+            column, keys = values[i], offsets
+            if missing is not None and missing[i].any():
+                column, keys = column[~missing[i]], offsets[~missing[i]]
+            counts = np.zeros((types + 1) * bins, dtype=np.int64)
+            for start in range(0, len(column), HISTOGRAM_CHUNK_ROWS):
+                chunk = column[start:start + HISTOGRAM_CHUNK_ROWS]
+                buffer, index = scaled[:len(chunk)], indexes[:len(chunk)]
+                # Widths are powers of two, so scaling is exact; values are
+                # at least the grid start, so truncating is flooring
+                np.subtract(chunk, self.bin_start[i], out=buffer)
+                np.multiply(buffer, 1 / self.bin_width[i], out=buffer)
+                np.minimum(buffer, bins - 1, out=buffer)
+                np.copyto(index, buffer, casting='unsafe')
+                index += keys[start:start + HISTOGRAM_CHUNK_ROWS]
+                counts += np.bincount(index, minlength=len(counts))
+            counts = counts.reshape(types + 1, bins)
+            self.type_histograms[:, i] += counts[:types]
+            self.untyped_histograms[i] += counts[types]
+
+    def _add_sample(self, keys, values):
+        if len(self._sample_keys) >= self.sample_size:
+            # Only keys below the current cut-off can enter the sample
+            keep = keys < self._sample_keys.max()
+            keys, values = keys[keep], values[keep]
+        keys = np.concatenate([self._sample_keys, keys])
+        values = np.concatenate([self._sample, values])
+        if len(keys) > self.sample_size:
+            keep = np.argpartition(keys, self.sample_size)[:self.sample_size]
+            keys, values = keys[keep], values[keep]
+        self._sample_keys, self._sample = keys, values
+
+    def update(self, block, codes, categories):
+        """Add a block of rows.
+
+        ``block`` is a ``(rows, len(columns))`` array with NaN for missing
+        values, ``codes`` indexes into ``categories`` with -1 for a missing type.
+        Column-major blocks (e.g. ``np.stack(columns).T``) avoid a copy.
+        """
+        # One contiguous row per column keeps every reduction sequential
+        values = np.ascontiguousarray(np.asarray(block, dtype=np.float64).T)
+        codes = np.asarray(codes)
+        rows = values.shape[1]
+        self.rows += rows
+        if not rows:
+            return
+
+        # Moments, extremes and the sample all come from the same block
+        missing = np.isnan(values)
+        has_missing = missing.any()
+        filled = np.where(missing, 0.0, values) if has_missing else values
+        count = rows - missing.sum(axis=1)
+        mean = filled.sum(axis=1) / np.maximum(count, 1)
+        deviation = filled - mean[:, None]
+        if has_missing:
+            deviation[missing] = 0.0
+        m2 = np.einsum('ij,ij->i', deviation, deviation)
+        self._add_moments(count, mean, m2)
+        low, high = np.fmin.reduce(values, axis=1), np.fmax.reduce(values, axis=1)
+        self.min = np.fmin(self.min, low)
+        self.max = np.fmax(self.max, high)
+        keys = self._rng.random(rows)
+        if len(self._sample_keys) >= self.sample_size:
+            candidates = np.flatnonzero(keys < self._sample_keys.max())
+            self._add_sample(keys[candidates], values[:, candidates].T)
+        else:
+            self._add_sample(keys, values.T)
+
+        # Type histogram, per-type sums and value histograms from integer codes
+        mapping = self._global_codes(categories)
+        typed = codes >= 0
+        row_types = np.full(rows, len(self.type_names), dtype=np.intp)
+        row_types[typed] = mapping[codes[typed]]
+        self._add_histograms(values, missing if has_missing else None, low, high, row_types)
+        if typed.any():
+            all_typed = typed.all()
+            type_codes = mapping[codes] if all_typed else mapping[codes[typed]]
+            typed_values = filled if all_typed else filled[:, typed]
+            size = len(self.type_names)
+            type_counts = np.bincount(type_codes, minlength=size)
+            self.type_counts += type_counts
+            for i in range(len(self.columns)):
+                if has_missing:
+                    present = ~missing[i] if all_typed else ~missing[i, typed]
+                    self.type_value_counts[:, i] += np.bincount(type_codes, weights=present, minlength=size).astype(np.int64)
+                else:
+                    self.type_value_counts[:, i] += type_counts
+                self.type_sums[:, i] += np.bincount(type_codes, weights=typed_values[i], minlength=size)
+                self.type_sumsq[:, i] += np.bincount(type_codes, weights=typed_values[i] ** 2, minlength=size)
+
+    def merge(self, other):
+        """Fold another accumulator over the same columns into this one."""
+        self.rows += other.rows
+        self._add_moments(other.count, other.mean, other.m2)
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        self._add_sample(other._sample_keys, other._sample)
+        mapping = self._global_codes(other.type_names)
+        np.add.at(self.type_counts, mapping, other.type_counts)
+        np.add.at(self.type_value_counts, mapping, other.type_value_counts)
+        np.add.at(self.type_sums, mapping, other.type_sums)
+        np.add.at(self.type_sumsq, mapping, other.type_sumsq)
+        # Both grids nest in the one for the combined range
+        self._fit_grids(other._finite_min, other._finite_max)
+        for i in range(len(self.columns)):
+            grids = other.bin_start[i], other.bin_width[i], self.bin_start[i], self.bin_width[i]
+            np.add.at(self.type_histograms[:, i], mapping, _rebin(other.type_histograms[:, i], *grids))
+            self.untyped_histograms[i] += _rebin(other.untyped_histograms[i], *grids)
+        return self
+
+    def type_distribution(self):
+        # Most common first, ties in first-seen order (like value_counts)
+        order = np.argsort(-self.type_counts, kind='stable')
+        return {self.type_names[i]: int(self.type_counts[i]) for i in order if self.type_counts[i]}
+
+    def column_stats(self):
+        stats = {}
+        for i, column in enumerate(self.columns):
+            values = self._sample[:, i]
+            values = values[~np.isnan(values)]
+            std = np.sqrt(self.m2[i] / (self.count[i] - 1)) if self.count[i] > 1 else np.nan
+            column_stats = {
+                'count': int(self.count[i]),
+                'min': _finite(self.min[i]),
+                'max': _finite(self.max[i]),
+                'std': _finite(std),
+            }
+            for q in PERCENTILES:
+                column_stats[f'p{q}'] = _finite(np.percentile(values, q)) if len(values) else None
+            stats[column] = column_stats
+        return stats
+
+    def type_rollups(self):
+        """Mergeable per-type totals: row count, and count/sum/sumsq per column."""
+        return {
+            name: {
+                'count': int(self.type_counts[t]),
+                **{
+                    column: {
+                        'count': int(self.type_value_counts[t, i]),
+                        'sum': float(self.type_sums[t, i]),
+                        'sumsq': float(self.type_sumsq[t, i]),
+                    }
+                    for i, column in enumerate(self.columns)
+                },
+            }
+            for t, name in enumerate(self.type_names)
+            if self.type_counts[t]
+        }
+
+    def distribution(self):
+        """Fixed-size value histograms per column, over all rows and per type.
+
+        Bin ``k`` of a column counts values in ``[start + k * width, start +
+        (k + 1) * width)`` of its ``grid``, which every type shares; ``grid``
+        is None for a column without values.
+        """
+        totals = self.type_histograms.sum(axis=0) + self.untyped_histograms
+        return {
+            'bins': self.histogram_bins,
+            'grid': {
+                column: {'start': float(self.bin_start[i]), 'width': float(self.bin_width[i])}
+                if self.bin_width[i] else None
+                for i, column in enumerate(self.columns)
+            },
+            'all': {column: totals[i].tolist() for i, column in enumerate(self.columns)},
+            'types': {
+                name: {column: self.type_histograms[t, i].tolist() for i, column in enumerate(self.columns)}
+                for t, name in enumerate(self.type_names)
+                if self.type_counts[t]
+            },
+        }
+
+    def averages(self):
+        return {
+            column: float(self.mean[i]) if self.count[i] else float('nan')
+            for i, column in enumerate(self.columns)
+        }
+
+    def summary(self):
+        averages = self.averages()
+        return {
+            'total_equipment': self.rows,
+            'average_flowrate': averages['flowrate'],
+            'average_pressure': averages['pressure'],
+            'average_temperature': averages['temperature'],
+            'type_distribution': self.type_distribution(),
+            'column_stats': self.column_stats(),
+            'type_rollups': self.type_rollups(),
+            'distribution': self.distribution(),
+        }
@@ -1,3 +1,914 @@
-from django.test import TestCase
+import gzip
+import hashlib
+import json
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as pa_ipc
+import pyarrow.parquet as pq
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection, connections
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+
+from . import async_views
+from .aggregation import aggregate_upload
+from .cache import SummaryCache, get_summary_cache
+from .columnar import get_column_store
+from .metrics import REGISTRY, RequestMetrics
+from .middleware import MetricsMiddleware
+from .models import EquipmentUpload, TypeRollup, UploadJob, WeeklyRollup
+from .parallel import aggregate_parallel, split_ranges
+from .parsing import detect_format
+from .pipeline import result_key, summarize_upload
+from .summary import SummaryAccumulator
+from .validation import Validator
+
+SAMPLE_CSV = Path(__file__).resolve().parents[2] / 'sample_equipment_data.csv'
+
+_storage = None
+
+
+def setUpModule():
+    # Keep stored rows out of the source tree
+    global _storage
+    tmp = tempfile.TemporaryDirectory()
+    _storage = (tmp, override_settings(EQUIPMENT_COLUMN_STORE={'ENABLED': True, 'ROOT': tmp.name}))
+    _storage[1].enable()
+
+
+def tearDownModule():
+    tmp, override = _storage
+    override.disable()
+    tmp.cleanup()
+
+
+def sample_upload(name='sample_equipment_data.csv'):
+    return SimpleUploadedFile(name, SAMPLE_CSV.read_bytes(), content_type='text/csv')
+
+
+def sample_as(fmt):
+    """The sample data encoded as ``fmt`` (see ``parsing.FORMAT_MAGIC``)."""
+    raw = SAMPLE_CSV.read_bytes()
+    if fmt == 'gzip':
+        return gzip.compress(raw)
+    if fmt == 'zstd':
+        sink = pa.BufferOutputStream()
+        with pa.CompressedOutputStream(sink, 'zstd') as out:
+            out.write(raw)
+        return sink.getvalue().to_pybytes()
+    table = pa.Table.from_pandas(pd.read_csv(SAMPLE_CSV), preserve_index=False)
+    out = BytesIO()
+    if fmt == 'parquet':
+        pq.write_table(table, out, row_group_size=4)
+    else:
+        open_writer = pa_ipc.new_file if fmt == 'arrow' else pa_ipc.new_stream
+        with open_writer(out, table.schema) as writer:
+            writer.write_table(table, max_chunksize=4)
+    return out.getvalue()
+
+
+class AggregationTests(TestCase):
+    def test_matches_pandas_summary(self):
+        df = pd.read_csv(SAMPLE_CSV)
+        summary = aggregate_upload(sample_upload())
+        self.assertEqual(summary['total_equipment'], len(df))
+        self.assertAlmostEqual(summary['average_flowrate'], df['Flowrate'].mean())
+        self.assertAlmostEqual(summary['average_pressure'], df['Pressure'].mean())
+        self.assertAlmostEqual(summary['average_temperature'], df['Temperature'].mean())
+        self.assertEqual(summary['type_distribution'], df['Type'].value_counts().to_dict())
+
+    def test_small_chunks_give_same_result(self):
+        whole = aggregate_upload(sample_upload())
+        chunked = aggregate_upload(BytesIO(SAMPLE_CSV.read_bytes()), chunk_rows=3, engine='c')
+        self.assertEqual(chunked['total_equipment'], whole['total_equipment'])
+        self.assertEqual(chunked['type_distribution'], whole['type_distribution'])
+        for key in ('average_flowrate', 'average_pressure', 'average_temperature'):
+            self.assertAlmostEqual(chunked[key], whole[key])
+
+    def test_parser_engines_agree(self):
+        pandas_engine = aggregate_upload(BytesIO(SAMPLE_CSV.read_bytes()), engine='c')
+        arrow_engine = aggregate_upload(BytesIO(SAMPLE_CSV.read_bytes()), engine='pyarrow')
+        self.assertEqual(pandas_engine['type_distribution'], arrow_engine['type_distribution'])
+        self.assertEqual(pandas_engine['column_stats'], arrow_engine['column_stats'])
+
+    def test_averages_match_pandas_in_float64(self):
+        rng = np.random.default_rng(5)
+        frame = pd.DataFrame({
+            'Type': rng.choice(['Pump', 'Valve'], size=5000),
+            'Flowrate': rng.uniform(0, 1e6, 5000).round(1),
+            'Pressure': rng.uniform(0, 40, 5000).round(2),
+            'Temperature': rng.uniform(-50, 500, 5000).round(3),
+        })
+        small = b'Type,Flowrate,Pressure,Temperature\nPump,8.1,0.1,333373.4\nValve,9.9,0.2,333373.6\nPump,9.0,0.3,333373.5\n'
+        for data in (small, frame.to_csv(index=False).encode()):
+            expected = pd.read_csv(BytesIO(data))
+            for engine in ('c', 'pyarrow'):
+                summary = aggregate_upload(BytesIO(data), engine=engine)
+                for column in ('Flowrate', 'Pressure', 'Temperature'):
+                    # float32 parsing was off by about 1e-8 of the value
+                    self.assertAlmostEqual(summary[f'average_{column.lower()}'], expected[column].mean(),
+                                           delta=abs(expected[column].mean()) * 1e-14, msg=f'{engine} {column}')
+        summary = aggregate_upload(BytesIO(small))
+        self.assertEqual(summary['average_flowrate'], 9.0)
+        self.assertEqual(summary['column_stats']['flowrate']['max'], 9.9)
+
+    def test_header_case_and_whitespace_are_ignored(self):
+        data = b' TYPE ,Flowrate,  pressure,Temperature ,Equipment Name\nPump,1.5,2,3,P1\nValve,,4,5,V1\n'
+        for engine in ('c', 'pyarrow'):
+            summary = aggregate_upload(BytesIO(data), engine=engine)
+            self.assertEqual(summary['total_equipment'], 2)
+            self.assertEqual(summary['average_flowrate'], 1.5)
+            self.assertEqual(summary['average_pressure'], 3.0)
+
+    def test_empty_type_is_missing_for_both_engines(self):
+        data = b'Type,Flowrate,Pressure,Temperature\nPump,1,2,3\n,4,5,6\n'
+        for engine in ('c', 'pyarrow'):
+            summary = aggregate_upload(BytesIO(data), engine=engine)
+            self.assertEqual(summary['total_equipment'], 2)
+            self.assertEqual(summary['type_distribution'], {'Pump': 1})
+
+    def test_missing_column_is_reported(self):
+        with self.assertRaisesRegex(ValueError, 'Missing columns: temperature'):
+            aggregate_upload(BytesIO(b'Type,Flowrate,Pressure\nPump,1,2\n'))
+
+    def test_compressed_and_columnar_formats_agree(self):
+        csv_summary = aggregate_upload(sample_upload())
+        for fmt in ('gzip', 'zstd', 'parquet', 'arrow', 'arrow-stream'):
+            with self.subTest(fmt=fmt):
+                summary = aggregate_upload(BytesIO(sample_as(fmt)), chunk_rows=3)
+                self.assertEqual(summary['total_equipment'], csv_summary['total_equipment'])
+                self.assertEqual(summary['type_distribution'], csv_summary['type_distribution'])
+                for key in ('average_flowrate', 'average_pressure', 'average_temperature'):
+                    self.assertAlmostEqual(summary[key], csv_summary[key])
+
+    def test_format_detection(self):
+        self.assertEqual(detect_format(sample_as('parquet')[:8]), 'parquet')
+        self.assertEqual(detect_format(b'Type,Flo', 'text/csv'), 'csv')
+        # Content type only decides when the leading bytes are not recognised
+        self.assertEqual(detect_format(b'\x10\x00\x00\x00', 'application/vnd.apache.arrow.stream'), 'arrow-stream')
+        self.assertEqual(detect_format(sample_as('gzip')[:8], 'text/csv'), 'gzip')
+
+
+class SummaryKernelTests(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.block = rng.normal(100, 15, size=(1000, 3))
+        self.block[::7, 1] = np.nan
+        self.codes = rng.integers(0, 3, size=1000)
+        self.categories = ['Pump', 'Valve', 'Heater']
+
+    def test_column_stats_match_pandas(self):
+        acc = SummaryAccumulator()
+        acc.update(self.block, self.codes, self.categories)
+        stats = acc.column_stats()
+        df = pd.DataFrame(self.block, columns=['flowrate', 'pressure', 'temperature'])
+        for column in df:
+            self.assertAlmostEqual(stats[column]['std'], df[column].std())
+            self.assertAlmostEqual(stats[column]['min'], df[column].min())
+            self.assertAlmostEqual(stats[column]['p50'], df[column].median())
+        self.assertAlmostEqual(acc.averages()['pressure'], df['pressure'].mean())
+
+    def test_merge_matches_single_pass(self):
+        whole = SummaryAccumulator()
+        whole.update(self.block, self.codes, self.categories)
+        left = SummaryAccumulator()
+        left.update(self.block[:400], self.codes[:400], self.categories)
+        # Same types, coded in a different order
+        right_codes = np.array([2, 1, 0])[self.codes[400:]]
+        right = SummaryAccumulator()
+        right.update(self.block[400:], right_codes, self.categories[::-1])
+        merged = left.merge(right).summary()
+        expected = whole.summary()
+        self.assertEqual(merged['total_equipment'], expected['total_equipment'])
+        self.assertEqual(merged['type_distribution'], expected['type_distribution'])
+        for column in ('flowrate', 'pressure', 'temperature'):
+            for key in ('std', 'min', 'max', 'p25', 'p75'):
+                self.assertAlmostEqual(merged['column_stats'][column][key], expected['column_stats'][column][key])
+        self.assertEqual(merged['distribution'], expected['distribution'])
+
+    def test_histograms_match_numpy(self):
+        acc = SummaryAccumulator()
+        for start in range(0, 1000, 300):
+            acc.update(self.block[start:start + 300], self.codes[start:start + 300], self.categories)
+        distribution = acc.distribution()
+        for i, column in enumerate(('flowrate', 'pressure', 'temperature')):
+            grid = distribution['grid'][column]
+            edges = grid['start'] + grid['width'] * np.arange(distribution['bins'] + 1)
+            values = self.block[:, i]
+            self.assertEqual(distribution['all'][column], np.histogram(values[~np.isnan(values)], edges)[0].tolist())
+            pumps = values[(self.codes == 0) & ~np.isnan(values)]
+            self.assertEqual(distribution['types']['Pump'][column], np.histogram(pumps, edges)[0].tolist())
+        rebuilt = SummaryAccumulator.from_summary(acc.summary())
+        self.assertEqual(rebuilt.distribution(), distribution)
+
+
+class ValidationTests(TestCase):
+    DIRTY = (b'Type,Flowrate,Pressure,Temperature\n'
+             b'Pump,10,2,30\n'
+             b'Pump,abc,2,30\n'
+             b'Valve,5,-1,20\n'
+             b'Valve, 12 ,3,\n'
+             b'Heater,7,inf,-300\n'
+             b'Cooler,,4,10\n')
+
+    def test_bad_rows_are_quarantined_by_both_engines(self):
+        for engine in ('c', 'pyarrow'):
+            with self.subTest(engine=engine):
+                summary = aggregate_upload(BytesIO(self.DIRTY), engine=engine, validator=Validator())
+                self.assertEqual(summary['total_equipment'], 3)
+                self.assertEqual(summary['type_distribution'], {'Pump': 1, 'Valve': 1, 'Cooler': 1})
+                quarantine = summary['quarantine']
+                self.assertEqual(quarantine['rows'], 3)
+                self.assertEqual(quarantine['columns'], {
+                    'flowrate': {'not_a_number': 1},
+                    'pressure': {'out_of_range': 2},
+                    'temperature': {'out_of_range': 1},
+                })
+                self.assertEqual([s['row'] for s in quarantine['samples']], [2, 3, 5])
+                self.assertEqual(quarantine['samples'][0]['flowrate'], 'abc')
+                self.assertEqual(quarantine['samples'][2]['problems'],
+                                 ['pressure: out_of_range', 'temperature: out_of_range'])
+                json.dumps(quarantine, allow_nan=False)
+
+    def test_text_found_after_the_first_blocks(self):
+        lines = [b'Type,Flowrate,Pressure,Temperature'] + [b'Pump,%d,2,30' % i for i in range(1000)]
+        lines[334] = b'Pump,12x,2,30'
+        lines[778] = b'Pump,1,2,hot'
+        data = b'\n'.join(lines) + b'\n'
+        for engine in ('c', 'pyarrow'):
+            with self.subTest(engine=engine):
+                summary = aggregate_upload(BytesIO(data), chunk_rows=100, engine=engine, validator=Validator())
+                self.assertEqual(summary['total_equipment'], 998)
+                self.assertEqual([s['row'] for s in summary['quarantine']['samples']], [334, 778])
+
+    def test_type_ranges_override_defaults(self):
+        validator = Validator(type_ranges={'Pump': {'pressure': (1, 3)}}, sample_rows=1)
+        data = b'Type,Flowrate,Pressure,Temperature\nPump,1,5,3\nValve,1,5,3\nPump,1,0.5,3\n'
+        summary = aggregate_upload(BytesIO(data), validator=validator)
+        self.assertEqual(summary['type_distribution'], {'Valve': 1})
+        self.assertEqual(summary['quarantine']['rows'], 2)
+        self.assertEqual(len(summary['quarantine']['samples']), 1)
+
+    def test_parallel_ranges_number_rows_from_the_file_start(self):
+        lines = [b'Type,Flowrate,Pressure,Temperature'] + [b'Pump,%d,2,30' % i for i in range(3000)]
+        lines[2500] = b'Pump,-1,2,30'
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'dirty.csv'
+            path.write_bytes(b'\n'.join(lines) + b'\n')
+            summary = aggregate_parallel(path, 3, chunk_rows=100, min_range_bytes=1, validator=Validator())
+        self.assertEqual(summary['total_equipment'], 2999)
+        self.assertEqual([s['row'] for s in summary['quarantine']['samples']], [2500])
+
+    def test_upload_reports_quarantine_and_rejects_missing_columns(self):
+        upload = SimpleUploadedFile('dirty.csv', self.DIRTY, content_type='text/csv')
+        response = self.client.post('/api/equipment/', {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_equipment'], 3)
+        self.assertEqual(response.json()['quarantine']['rows'], 3)
+        upload = SimpleUploadedFile('bad.csv', b'Type,Flowrate\nPump,1\n', content_type='text/csv')
+        response = self.client.post('/api/equipment/', {'file': upload})
+        self.assertEqual(response.status_code, 400)
+
+    def test_changed_ranges_recompute_a_cached_upload(self):
+        def post():
+            upload = SimpleUploadedFile('dirty.csv', self.DIRTY, content_type='text/csv')
+            return self.client.post('/api/equipment/', {'file': upload})
+
+        get_summary_cache().clear()
+        self.assertEqual(post()['X-Summary-Cache'], 'miss')
+        self.assertEqual(post()['X-Summary-Cache'], 'hit')
+        validation = dict(settings.EQUIPMENT_VALIDATION, TYPE_RANGES={'Pump': {'flowrate': (0, 5)}})
+        with override_settings(EQUIPMENT_VALIDATION=validation):
+            response = post()
+        self.assertEqual(response['X-Summary-Cache'], 'miss')
+        self.assertEqual(response.json()['total_equipment'], 2)
+        self.assertEqual(response.json()['quarantine']['rows'], 4)
+        self.assertEqual(post()['X-Summary-Cache'], 'hit')
+
+    def test_upload_without_averages_is_rejected_and_not_cached(self):
+        cases = {
+            'header only': (b'Type,Flowrate,Pressure,Temperature\n', 'No equipment rows'),
+            'blank column': (b'Type,Flowrate,Pressure,Temperature\nPump,1,,3\nValve,2,,4\n',
+                             'No values in column: Pressure'),
+        }
+        for case, (data, error) in cases.items():
+            with self.subTest(case):
+                for _ in range(2):
+                    upload = SimpleUploadedFile('empty.csv', data, content_type='text/csv')
+                    response = self.client.post('/api/equipment/', {'file': upload})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn(error, response.json()['error'])
+                key = result_key(hashlib.sha256(data).hexdigest())
+                self.assertIsNone(get_summary_cache().get(key))
+                self.assertFalse(get_column_store().exists(key))
+        self.assertEqual(EquipmentUpload.objects.count(), 0)
+
+    def test_upload_without_valid_rows_is_rejected_and_not_cached(self):
+        data = b'Type,Flowrate,Pressure,Temperature\nPump,-1,2,3\n'
+        for _ in range(2):
+            upload = SimpleUploadedFile('invalid.csv', data, content_type='text/csv')
+            response = self.client.post('/api/equipment/', {'file': upload})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['quarantine']['rows'], 1)
+        self.assertEqual(EquipmentUpload.objects.count(), 0)
+        key = result_key(hashlib.sha256(data).hexdigest())
+        self.assertIsNone(get_summary_cache().get(key))
+        self.assertFalse(get_column_store().exists(key))
+
+
+class UploadViewTests(TestCase):
+    def test_upload_returns_summary_and_saves_it(self):
+        response = self.client.post('/api/equipment/', {'file': sample_upload()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_equipment'], 10)
+        self.assertEqual(EquipmentUpload.objects.count(), 1)
+
+    def test_histograms_and_rollups_are_recorded_but_not_sent(self):
+        spool = tempfile.TemporaryDirectory()
+        self.addCleanup(spool.cleanup)
+        responses = {
+            'sync': self.client.post('/api/equipment/', {'file': sample_upload()}).json(),
+            'batch': self.client.post('/api/equipment/batch/', {'files': [sample_upload()]}).json(),
+        }
+        with override_settings(EQUIPMENT_JOBS={'WORKERS': 0, 'SPOOL_DIR': spool.name}):
+            accepted = self.client.post('/api/equipment/?mode=async', {'file': sample_upload('job.csv')}).json()
+        responses['job'] = self.client.get(accepted['status_url']).json()['result']
+        for name, summary in [*responses.items(), ('batch file', responses['batch']['files'][0]),
+                              ('batch combined', responses['batch']['combined'])]:
+            with self.subTest(name):
+                self.assertIn('type_distribution', summary if name != 'batch' else summary['combined'])
+                self.assertNotIn('distribution', summary)
+                self.assertNotIn('type_rollups', summary)
+        upload_id = responses['sync']['upload_id']
+        body = self.client.get(f'/api/uploads/{upload_id}/distribution/').json()
+        self.assertEqual(sum(body['counts']['flowrate']), 10)
+        self.assertEqual(TypeRollup.objects.filter(upload_id=upload_id).count(), 5)
+
+    def test_gzip_upload_is_decompressed(self):
+        data = gzip.compress(SAMPLE_CSV.read_bytes())
+        upload = SimpleUploadedFile('sample.csv.gz', data, content_type='application/gzip')
+        response = self.client.post('/api/equipment/', {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_equipment'], 10)
+
+    def test_parquet_upload(self):
+        upload = SimpleUploadedFile('sample.parquet', sample_as('parquet'), content_type='application/octet-stream')
+        response = self.client.post('/api/equipment/', {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_equipment'], 10)
+        upload_id = response.json()['upload_id']
+        rows = self.client.get(f'/api/uploads/{upload_id}/rows/').json()
+        self.assertEqual(rows['total'], 10)
+
+    def test_missing_file(self):
+        response = self.client.post('/api/equipment/', {})
+        self.assertEqual(response.status_code, 400)
+
+
+class SummaryCacheTests(TestCase):
+    def setUp(self):
+        get_summary_cache().clear()
+
+    def test_repeat_upload_is_served_from_cache(self):
+        first = self.client.post('/api/equipment/', {'file': sample_upload()})
+        second = self.client.post('/api/equipment/', {'file': sample_upload('copy.csv')})
+        self.assertEqual(first['X-Summary-Cache'], 'miss')
+        self.assertEqual(second['X-Summary-Cache'], 'hit')
+        self.assertEqual(second.json()['type_distribution'], first.json()['type_distribution'])
+        self.assertEqual(get_summary_cache().stats()['hits'], 1)
+        self.assertEqual(EquipmentUpload.objects.count(), 2)
+
+    def test_lru_evicts_by_size(self):
+        cache = SummaryCache(max_bytes=70)
+        cache.set('a', {'value': 'x' * 20})
+        cache.set('b', {'value': 'y' * 20})
+        cache.get('a')
+        cache.set('c', {'value': 'z' * 20})
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['entries'], 2)
+
+
+class InlineExecutor:
+    """Stands in for the job pool, running each call as it is submitted."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class UploadJobTests(TestCase):
+    def setUp(self):
+        get_summary_cache().clear()
+        spool = tempfile.TemporaryDirectory()
+        self.addCleanup(spool.cleanup)
+        self.enterContext(override_settings(EQUIPMENT_JOBS={'WORKERS': 0, 'SPOOL_DIR': spool.name}))
+        self.spool_dir = Path(spool.name)
+
+    def test_async_upload_returns_job_and_result(self):
+        response = self.client.post('/api/equipment/?mode=async', {'file': sample_upload()})
+        self.assertEqual(response.status_code, 202)
+        job = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(job['status'], UploadJob.DONE)
+        self.assertEqual(job['rows_processed'], 10)
+        self.assertEqual(job['result']['type_distribution']['Pump'], 3)
+        self.assertEqual(EquipmentUpload.objects.count(), 1)
+        self.assertEqual(list(self.spool_dir.iterdir()), [])
+
+    def test_compressed_upload_is_spooled_as_uploaded(self):
+        for fmt in ('gzip', 'parquet'):
+            with self.subTest(fmt=fmt):
+                upload = SimpleUploadedFile(f'sample.{fmt}', sample_as(fmt), content_type='application/octet-stream')
+                response = self.client.post('/api/equipment/?mode=async', {'file': upload})
+                job = self.client.get(response.json()['status_url']).json()
+                self.assertEqual(job['status'], UploadJob.DONE)
+                self.assertEqual(job['rows_processed'], 10)
+                spool_path = Path(UploadJob.objects.get(pk=job['job_id']).spool_path)
+                self.assertEqual(spool_path.name, f'{job["job_id"]}.upload')
+        self.assertEqual(list(self.spool_dir.iterdir()), [])
+
+    def test_bad_file_marks_job_failed(self):
+        bad = SimpleUploadedFile('bad.csv', b'a,b\n1,2\n', content_type='text/csv')
+        response = self.client.post('/api/equipment/?mode=async', {'file': bad})
+        job = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(job['status'], UploadJob.FAILED)
+        self.assertTrue(job['error'])
+
+    def test_job_without_valid_rows_fails_with_quarantine(self):
+        data = b'Type,Flowrate,Pressure,Temperature\nPump,-1,2,3\nValve,abc,2,3\n'
+        upload = SimpleUploadedFile('invalid.csv', data, content_type='text/csv')
+        response = self.client.post('/api/equipment/?mode=async', {'file': upload})
+        job = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(job['status'], UploadJob.FAILED)
+        self.assertIn('No valid rows', job['error'])
+        self.assertEqual(job['result']['quarantine']['rows'], 2)
+        self.assertEqual(EquipmentUpload.objects.count(), 0)
+
+    @override_settings(EQUIPMENT_PARALLEL={'WORKERS': 2, 'THRESHOLD_BYTES': 0})
+    def test_pool_worker_does_not_start_an_aggregation_pool(self):
+        jobs = dict(settings.EQUIPMENT_JOBS, WORKERS=2)
+        with override_settings(EQUIPMENT_JOBS=jobs), \
+                mock.patch('api.jobs.get_executor', return_value=InlineExecutor()), \
+                mock.patch('api.pipeline.aggregate_parallel') as aggregate_parallel:
+            response = self.client.post('/api/equipment/?mode=async', {'file': sample_upload()})
+        job = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(job['status'], UploadJob.DONE)
+        self.assertEqual(job['rows_processed'], 10)
+        aggregate_parallel.assert_not_called()
+
+    def test_error_before_the_summary_marks_job_failed(self):
+        with mock.patch.object(UploadJob.objects, 'get', side_effect=DatabaseError('database is locked')), \
+                self.assertLogs('api.jobs', 'ERROR'):
+            response = self.client.post('/api/equipment/?mode=async', {'file': sample_upload()})
+        job = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(job['status'], UploadJob.FAILED)
+        self.assertEqual(job['error'], 'database is locked')
+        self.assertEqual(list(self.spool_dir.iterdir()), [])
+
+    def test_pool_failure_marks_job_failed(self):
+        jobs = dict(settings.EQUIPMENT_JOBS, WORKERS=2)
+        with override_settings(EQUIPMENT_JOBS=jobs), \
+                mock.patch('api.jobs.get_executor', return_value=InlineExecutor()), \
+                mock.patch('api.worker.run_job', side_effect=BrokenProcessPool('worker died')), \
+                self.assertLogs('api.jobs', 'ERROR') as logs:
+            response = self.client.post('/api/equipment/?mode=async', {'file': sample_upload()})
+        job = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(job['status'], UploadJob.FAILED)
+        self.assertEqual(job['error'], 'worker died')
+        self.assertIn('failed in the worker pool', logs.output[0])
+        self.assertEqual(list(self.spool_dir.iterdir()), [])
+
+    def test_unknown_job(self):
+        response = self.client.get('/api/jobs/00000000-0000-0000-0000-000000000000/')
+        self.assertEqual(response.status_code, 404)
+
+
+class BatchUploadTests(TestCase):
+    def setUp(self):
+        get_summary_cache().clear()
+
+    def sample_zip(self, *names):
+        out = BytesIO()
+        with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name in names:
+                archive.writestr(name, SAMPLE_CSV.read_bytes())
+        return SimpleUploadedFile('units.zip', out.getvalue(), content_type='application/zip')
+
+    @override_settings(EQUIPMENT_HISTORY_LIMIT=10)
+    def test_files_and_zip_members_are_recorded_together(self):
+        files = [sample_upload('a.csv'), sample_upload('b.csv'), self.sample_zip('c.csv', 'units/d.csv')]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/equipment/batch/', {'files': files})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([f['filename'] for f in body['files']], ['a.csv', 'b.csv', 'c.csv', 'units/d.csv'])
+        self.assertEqual(body['combined']['total_equipment'], 40)
+        self.assertEqual(body['combined']['type_distribution']['Pump'], 12)
+        self.assertAlmostEqual(body['combined']['average_pressure'], body['files'][0]['average_pressure'])
+        self.assertEqual(EquipmentUpload.objects.count(), 4)
+        inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "api_equipmentupload"')]
+        deletes = [q for q in queries if q['sql'].startswith('DELETE FROM "api_equipmentupload"')]
+        self.assertEqual((len(inserts), len(deletes)), (1, 1))
+
+    def test_failed_file_is_reported_and_others_recorded(self):
+        bad = SimpleUploadedFile('bad.csv', b'a,b\n1,2\n', content_type='text/csv')
+        response = self.client.post('/api/equipment/batch/', {'files': [sample_upload(), bad]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['uploaded'], response.json()['failed']), (1, 1))
+        self.assertIn('error', response.json()['files'][1])
+        self.assertEqual(EquipmentUpload.objects.count(), 1)
+
+        response = self.client.post('/api/equipment/batch/', {'files': [bad]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(EquipmentUpload.objects.count(), 1)
+
+    def test_file_without_valid_rows_reports_its_quarantine(self):
+        data = b'Type,Flowrate,Pressure,Temperature\nPump,-1,2,3\nValve,abc,2,3\n'
+        invalid = SimpleUploadedFile('invalid.csv', data, content_type='text/csv')
+        single = self.client.post('/api/equipment/', {'file': SimpleUploadedFile('invalid.csv', data)}).json()
+        response = self.client.post('/api/equipment/batch/', {'files': [sample_upload(), invalid]})
+        failed = response.json()['files'][1]
+        self.assertEqual(failed, {'filename': 'invalid.csv', **single})
+        self.assertEqual(failed['quarantine']['rows'], 2)
+
+    @override_settings(EQUIPMENT_BATCH={'WORKERS': 2, 'MAX_FILES': 2})
+    def test_file_limit_counts_zip_members(self):
+        response = self.client.post('/api/equipment/batch/', {'files': [self.sample_zip('a.csv', 'b.csv', 'c.csv')]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(EquipmentUpload.objects.count(), 0)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        get_summary_cache().clear()
+        self.factory = AsyncRequestFactory()
+
+    async def test_async_upload_and_history(self):
+        request = self.factory.post('/api/equipment/', {'file': sample_upload()})
+        response = await async_views.upload_equipment_data(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['total_equipment'], 10)
+
+        response = await async_views.get_upload_history(self.factory.get('/api/history/'))
+        history = json.loads(response.content)
+        self.assertEqual([h['filename'] for h in history], ['sample_equipment_data.csv'])
+
+    async def test_async_batch_upload(self):
+        request = self.factory.post('/api/equipment/batch/', {'files': [sample_upload('a.csv'), sample_upload('b.csv')]})
+        response = await async_views.upload_batch(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['combined']['total_equipment'], 20)
+
+    async def test_async_upload_requires_file(self):
+        response = await async_views.upload_equipment_data(self.factory.post('/api/equipment/', {}))
+        self.assertEqual(response.status_code, 400)
+
+
+SUMMARY = {
+    'total_equipment': 1,
+    'average_flowrate': 1.0,
+    'average_pressure': 2.0,
+    'average_temperature': 3.0,
+}
+
+
+class HistoryRetentionTests(TestCase):
+    @override_settings(EQUIPMENT_HISTORY_LIMIT=3)
+    def test_prune_is_one_statement_and_removes_all_extra_rows(self):
+        for i in range(6):
+            EquipmentUpload.objects.create(filename=f'{i}.csv', **SUMMARY)
+        with CaptureQueriesContext(connection) as queries:
+            deleted = EquipmentUpload.objects.prune()
+        self.assertEqual(deleted, 3)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            list(EquipmentUpload.objects.order_by('id').values_list('filename', flat=True)),
+            ['3.csv', '4.csv', '5.csv'],
+        )
+
+    @override_settings(EQUIPMENT_HISTORY_LIMIT=10)
+    def test_history_keyset_pagination(self):
+        for i in range(7):
+            EquipmentUpload.objects.record_summary(f'{i}.csv', SUMMARY)
+
+        first = self.client.get('/api/history/')
+        self.assertEqual([h['filename'] for h in first.json()], ['6.csv', '5.csv', '4.csv', '3.csv', '2.csv'])
+        second = self.client.get('/api/history/', {'cursor': first['X-Next-Cursor']})
+        self.assertEqual([h['filename'] for h in second.json()], ['1.csv', '0.csv'])
+        self.assertFalse(second.has_header('X-Next-Cursor'))
+
+    def test_history_rejects_bad_cursor(self):
+        self.assertEqual(self.client.get('/api/history/', {'cursor': 'nope'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/history/', {'limit': '0'}).status_code, 400)
+
+
+class HistoryConditionalTests(TestCase):
+    def test_unchanged_history_is_not_modified(self):
+        EquipmentUpload.objects.record_summary('a.csv', SUMMARY)
+        first = self.client.get('/api/history/')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('no-cache', first['Cache-Control'])
+
+        again = self.client.get('/api/history/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], first['ETag'])
+
+        EquipmentUpload.objects.record_summary('b.csv', SUMMARY)
+        changed = self.client.get('/api/history/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+        self.assertEqual([h['filename'] for h in changed.json()], ['b.csv', 'a.csv'])
+
+    def test_changes_in_the_same_second_are_not_hidden_by_last_modified(self):
+        start = datetime(2026, 1, 1, 12, 0, 10, 200000, tzinfo=timezone.utc)
+        clock = mock.Mock(return_value=start)
+        self.enterContext(mock.patch('api.models.now', clock))
+        self.enterContext(mock.patch('api.history.now', clock))
+
+        def get(seconds, **headers):
+            clock.return_value = start + timedelta(seconds=seconds)
+            return self.client.get('/api/history/', **headers)
+
+        EquipmentUpload.objects.record_summary('a.csv', SUMMARY)
+        first = get(0.2)
+        self.assertNotIn('Last-Modified', first)
+        clock.return_value = start + timedelta(seconds=0.5)
+        EquipmentUpload.objects.record_summary('b.csv', SUMMARY)
+        second_of_change = http_date(int(start.timestamp()))
+        self.assertEqual(get(0.6, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+        self.assertEqual(get(0.6, HTTP_IF_MODIFIED_SINCE=second_of_change).status_code, 200)
+
+        settled = get(2)
+        self.assertEqual(settled['Last-Modified'], second_of_change)
+        self.assertEqual(get(3, HTTP_IF_MODIFIED_SINCE=settled['Last-Modified']).status_code, 304)
+        # A current date does not outweigh a stale ETag
+        stale = get(3, HTTP_IF_NONE_MATCH=first['ETag'], HTTP_IF_MODIFIED_SINCE=settled['Last-Modified'])
+        self.assertEqual(stale.status_code, 200)
+
+    def test_serialized_page_is_reused_until_an_upload(self):
+        EquipmentUpload.objects.record_summary('a.csv', SUMMARY)
+        self.client.get('/api/history/')
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get('/api/history/')
+        self.assertEqual(cached.status_code, 200)
+        self.assertFalse([q for q in queries if 'api_equipmentupload' in q['sql']])
+
+        self.client.post('/api/equipment/', {'file': sample_upload()})
+        fresh = self.client.get('/api/history/')
+        self.assertEqual(fresh.json()[0]['filename'], 'sample_equipment_data.csv')
+
+
+class SQLiteTuningTests(TestCase):
+    def test_new_connections_use_wal(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            other = type(connections['default'])({**connection.settings_dict, 'NAME': str(Path(tmp) / 'db.sqlite3')})
+            try:
+                with other.cursor() as cursor:
+                    self.assertEqual(cursor.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+                    self.assertEqual(cursor.execute('PRAGMA synchronous').fetchone()[0], 1)  # NORMAL
+            finally:
+                other.close()
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        get_summary_cache().clear()
+        for metric in REGISTRY:
+            metric.clear()
+
+    def test_upload_stages_are_exported(self):
+        response = self.client.post('/api/equipment/', {'file': sample_upload()})
+        self.assertIn('parse;dur=', response['Server-Timing'])
+
+        metrics = self.client.get('/api/metrics/')
+        self.assertTrue(metrics['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = metrics.content.decode()
+        for stage in ('receive', 'parse', 'aggregate', 'store', 'db_write', 'prune'):
+            self.assertIn(f'equipment_upload_stage_seconds_count{{stage="{stage}"}} 1', text)
+        self.assertIn('equipment_upload_rows_sum 10', text)
+        self.assertIn('equipment_upload_bytes_bucket{le="1024"} 1', text)
+        self.assertIn(
+            'equipment_request_duration_seconds_count{view="upload_equipment_data",method="POST",status="200"} 1',
+            text,
+        )
+        self.assertRegex(text, r'equipment_request_queries_sum\{view="upload_equipment_data"\} [1-9]')
+
+    def test_nested_stages_are_exclusive(self):
+        metrics = RequestMetrics()
+        metrics.begin('db_write')
+        metrics.begin('prune')
+        time.sleep(0.05)
+        metrics.end()
+        metrics.end()
+        self.assertGreaterEqual(metrics.stages['prune'], 0.05)
+        self.assertLess(metrics.stages['db_write'], 0.05)
+
+    def test_profiling_is_opt_in(self):
+        response = self.client.get('/api/history/', HTTP_X_PROFILE='cprofile')
+        self.assertFalse(response.has_header('X-Profile'))
+        with tempfile.TemporaryDirectory() as tmp:
+            with override_settings(EQUIPMENT_METRICS={'PROFILING': True, 'PROFILE_DIR': tmp}):
+                response = self.client.get('/api/history/', HTTP_X_PROFILE='cprofile')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue((Path(tmp) / response['X-Profile']).exists())
+
+    def test_profiler_stops_when_the_view_raises(self):
+        def fail(request):
+            raise RuntimeError('view failed')
+
+        request = RequestFactory().get('/api/history/', HTTP_X_PROFILE='cprofile')
+        with tempfile.TemporaryDirectory() as tmp:
+            with override_settings(EQUIPMENT_METRICS={'PROFILING': True, 'PROFILE_DIR': tmp}):
+                with self.assertRaises(RuntimeError):
+                    MetricsMiddleware(fail)(request)
+            self.assertEqual(len(list(Path(tmp).iterdir())), 1)
+        self.assertIsNone(sys.getprofile())
+
+
+class ParallelAggregationTests(TestCase):
+    def setUp(self):
+        get_summary_cache().clear()
+        rng = np.random.default_rng(3)
+        frame = pd.DataFrame({
+            'Equipment Name': [f'E{i}' for i in range(3000)],
+            'Type': rng.choice(['Pump', 'Valve', 'Heater', 'Cooler', None], size=3000),
+            'Flowrate': rng.uniform(0, 300, 3000).round(1),
+            'Pressure': rng.uniform(1, 40, 3000).round(1),
+            'Temperature': rng.uniform(20, 200, 3000).round(1),
+        })
+        frame.loc[::17, 'Pressure'] = np.nan
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / 'large.csv'
+        frame.to_csv(self.path, index=False)
+        self.frame = frame
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_split_ranges_end_at_newlines(self):
+        data = self.path.read_bytes()
+        start = data.index(b'\n') + 1
+        ranges = split_ranges(data, start, 7)
+        self.assertEqual(len(ranges), 7)
+        self.assertEqual(b''.join(data[a:b] for a, b in ranges), data[start:])
+        self.assertTrue(all(data[b - 1:b] == b'\n' for _, b in ranges))
+
+    def test_parallel_summary_matches_serial(self):
+        with open(self.path, 'rb') as f:
+            serial = aggregate_upload(f, chunk_rows=100)
+        parallel = aggregate_parallel(self.path, 3, chunk_rows=100, min_range_bytes=1)
+        self.assertEqual(parallel['total_equipment'], serial['total_equipment'])
+        self.assertEqual(list(parallel['type_distribution'].items()), list(serial['type_distribution'].items()))
+        for column, stats in serial['column_stats'].items():
+            for key, value in stats.items():
+                self.assertAlmostEqual(parallel['column_stats'][column][key], value, msg=f'{column} {key}')
+        for name, rollup in serial['type_rollups'].items():
+            self.assertEqual(parallel['type_rollups'][name]['count'], rollup['count'])
+            self.assertAlmostEqual(parallel['type_rollups'][name]['pressure']['sum'], rollup['pressure']['sum'])
+        for key in ('average_flowrate', 'average_pressure', 'average_temperature'):
+            self.assertAlmostEqual(parallel[key], serial[key])
+        self.assertEqual(parallel['distribution'], serial['distribution'])
+
+    @override_settings(EQUIPMENT_PARALLEL={'WORKERS': 2, 'THRESHOLD_BYTES': 0})
+    def test_parallel_upload_stores_rows_in_file_order(self):
+        with open(self.path, 'rb') as f:
+            result = summarize_upload(f)
+        self.assertEqual(result.summary['total_equipment'], 3000)
+        columns = get_column_store().open(result.data_path)
+        types = [columns.types[code] if code >= 0 else None for code in columns.codes.tolist()]
+        expected = [name if isinstance(name, str) else None for name in self.frame['Type']]
+        self.assertEqual(types, expected)
+        np.testing.assert_allclose(columns.columns['pressure'], self.frame['Pressure'], rtol=1e-6)
+
+
+class ColumnStoreTests(TestCase):
+    def setUp(self):
+        get_summary_cache().clear()
+
+    def upload(self):
+        response = self.client.post('/api/equipment/', {'file': sample_upload()})
+        return response.json()['upload_id']
+
+    def test_rows_are_sliced_and_filtered_by_type(self):
+        upload_id = self.upload()
+        page = self.client.get(f'/api/uploads/{upload_id}/rows/', {'offset': 1, 'limit': 2}).json()
+        self.assertEqual(page['total'], 10)
+        self.assertEqual(page['rows'], [
+            {'type': 'Valve', 'flowrate': 0.0, 'pressure': 10.0, 'temperature': 75.0},
+            {'type': 'Compressor', 'flowrate': 200.0, 'pressure': 30.0, 'temperature': 90.0},
+        ])
+        pumps = self.client.get(f'/api/uploads/{upload_id}/rows/', {'type': 'Pump'}).json()
+        self.assertEqual(pumps['total'], 3)
+        self.assertEqual([r['flowrate'] for r in pumps['rows']], [120.0, 110.0, 115.0])
+
+    def test_summary_from_stored_columns(self):
+        upload_id = self.upload()
+        summary = self.client.get(f'/api/uploads/{upload_id}/summary/').json()
+        self.assertEqual(summary['total_equipment'], 10)
+        self.assertAlmostEqual(summary['average_flowrate'], 75.5)
+        pumps = self.client.get(f'/api/uploads/{upload_id}/summary/', {'type': 'Pump'}).json()
+        self.assertEqual(pumps['type_distribution'], {'Pump': 3})
+        self.assertAlmostEqual(pumps['average_flowrate'], 115.0)
+
+    def test_identical_uploads_share_stored_rows(self):
+        first, second = self.upload(), self.upload()
+        paths = set(EquipmentUpload.objects.filter(pk__in=[first, second]).values_list('data_path', flat=True))
+        self.assertEqual(len(paths), 1)
+        self.assertTrue(get_column_store().exists(paths.pop()))
+
+    def test_distribution_is_served_per_type(self):
+        upload_id = self.upload()
+        response = self.client.get(f'/api/uploads/{upload_id}/distribution/')
+        body = response.json()
+        self.assertEqual(body['bins'], 32)
+        self.assertEqual(sum(body['counts']['flowrate']), 10)
+        self.assertEqual(sum(body['types']['Pump']['flowrate']), 3)
+        pumps = self.client.get(f'/api/uploads/{upload_id}/distribution/', {'type': 'Pump'}).json()
+        self.assertEqual(pumps['counts'], body['types']['Pump'])
+        self.assertNotIn('types', pumps)
+        cached = self.client.get(f'/api/uploads/{upload_id}/distribution/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_distribution_of_older_upload_is_computed_once(self):
+        upload_id = self.upload()
+        EquipmentUpload.objects.filter(pk=upload_id).update(distribution={})
+        body = self.client.get(f'/api/uploads/{upload_id}/distribution/').json()
+        self.assertEqual(sum(body['counts']['pressure']), 10)
+        self.assertEqual(EquipmentUpload.objects.get(pk=upload_id).distribution['grid'], body['grid'])
+
+    def test_unknown_upload(self):
+        self.assertEqual(self.client.get('/api/uploads/999/rows/').status_code, 404)
+        self.assertEqual(self.client.get('/api/uploads/999/distribution/').status_code, 404)
+
+
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        get_summary_cache().clear()
+
+    def test_rollups_are_recorded_and_survive_pruning(self):
+        for _ in range(7):
+            self.client.post('/api/equipment/', {'file': sample_upload()})
+        self.assertEqual(EquipmentUpload.objects.count(), 5)
+        self.assertEqual(TypeRollup.objects.values('upload_id').distinct().count(), 7)
+        pump = TypeRollup.objects.filter(equipment_type='Pump').first()
+        self.assertEqual(pump.count, 3)
+        self.assertAlmostEqual(pump.pressure_sum, 42.0)
+        self.assertAlmostEqual(pump.pressure_sumsq, 15 ** 2 + 14 ** 2 + 13 ** 2)
+
+    def test_type_trends_over_last_uploads(self):
+        for _ in range(3):
+            self.client.post('/api/equipment/', {'file': sample_upload()})
+        data = self.client.get('/api/analytics/', {'metric': 'pressure', 'last': 2}).json()
+        self.assertEqual(data['uploads'], 2)
+        self.assertEqual(data['types']['Pump']['count'], 6)
+        self.assertAlmostEqual(data['types']['Pump']['mean'], 14.0)
+        self.assertAlmostEqual(data['types']['Pump']['std'], pd.Series([15, 14, 13] * 2).std())
+        self.assertEqual(len(data['series']), 2 * 5)
+
+    def test_weekly_trend(self):
+        for _ in range(2):
+            self.client.post('/api/equipment/', {'file': sample_upload()})
+        # One row per week and type, added to by every upload
+        self.assertEqual(WeeklyRollup.objects.filter(equipment_type='Pump').get().count, 6)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/api/analytics/', {'group': 'week', 'type': 'Compressor'}).json()
+        self.assertFalse([q for q in queries if 'api_typerollup' in q['sql']])
+        self.assertEqual(len(data['weeks']), 1)
+        self.assertAlmostEqual(data['weeks'][0]['mean'], 205.0)
+        self.assertIsNone(data['weeks'][0]['change_pct'])
+
+    def test_weekly_change_is_against_the_calendar_week_before(self):
+        def pumps(flowrate):
+            metric = {'count': 1, 'sum': flowrate, 'sumsq': flowrate ** 2}
+            return {'Pump': {'count': 1, 'flowrate': metric, 'pressure': metric, 'temperature': metric}}
+
+        now = datetime.now(timezone.utc)
+        WeeklyRollup.objects.add_many([
+            (now - timedelta(weeks=3), pumps(100.0)),
+            (now - timedelta(weeks=1), pumps(100.0)),
+            (now, pumps(120.0)),
+        ])
+        weeks = self.client.get('/api/analytics/', {'group': 'week', 'weeks': 4}).json()['weeks']
+        self.assertEqual([w['mean'] for w in weeks], [100.0, 100.0, 120.0])
+        self.assertEqual([w['change_pct'] for w in weeks], [None, None, 20.0])
+
+    def test_unknown_metric(self):
+        self.assertEqual(self.client.get('/api/analytics/', {'metric': 'speed'}).status_code, 400)
@@ -0,0 +1,27 @@
+import hashlib
+
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """Hash each uploaded file while Django receives it.
+
+    Must come first in ``FILE_UPLOAD_HANDLERS``: it passes every chunk on
+    unchanged and leaves creating the file to the next handler. Digests are
+    kept on the request (see ``api.cache.upload_digest``), in upload order
+    per field, so the file never has to be read a second time to hash it.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not hasattr(self.request, 'upload_digests'):
+            self.request.upload_digests = {}
+        self.request.upload_digests.setdefault(self.field_name, []).append(self.hasher.hexdigest())
+        return None
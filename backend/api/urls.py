@@ -1,8 +1,19 @@
-
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# ASGI deployments serve the native async versions of these endpoints
+upload_views = async_views if settings.EQUIPMENT_ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('equipment/', views.upload_equipment_data, name='upload_equipment_data'),
-    path('history/', views.get_upload_history, name='get_upload_history'),
-]
\ No newline at end of file
+    path('equipment/', upload_views.upload_equipment_data, name='upload_equipment_data'),
+    path('equipment/batch/', upload_views.upload_batch, name='upload_batch'),
+    path('history/', upload_views.get_upload_history, name='get_upload_history'),
+    path('analytics/', views.get_analytics, name='get_analytics'),
+    path('metrics/', views.get_metrics, name='get_metrics'),
+    path('jobs/<uuid:job_id>/', views.get_job_status, name='get_job_status'),
+    path('uploads/<int:upload_id>/rows/', views.get_upload_rows, name='get_upload_rows'),
+    path('uploads/<int:upload_id>/summary/', views.get_upload_summary, name='get_upload_summary'),
+    path('uploads/<int:upload_id>/distribution/', views.get_upload_distribution,
+         name='get_upload_distribution'),
+]
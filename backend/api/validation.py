@@ -0,0 +1,157 @@
+"""Row validation and the quarantine report.
+
+Every parsed block is checked before it is aggregated or stored. A row is
+quarantined (left out of the summary and the stored rows) when one of its
+numeric cells holds text that is not a number, or a number outside the
+allowed range for the row's equipment type; infinities are always out of
+range. Missing values are not errors. The checks are a few comparisons on
+the whole block, so clean blocks pass through untouched.
+
+Quarantined rows are counted per column and reason, and the first few are
+kept as samples, so the report stays small however dirty the file is.
+
+Like ``api.summary``, this module only depends on NumPy.
+"""
+import numpy as np
+
+from .summary import COLUMNS
+
+# Allowed (low, high) per column, None for unbounded; per-type ranges override these
+DEFAULT_RANGES = {
+    'flowrate': (0, None),
+    'pressure': (0, None),
+    'temperature': (-273.15, None),
+}
+SAMPLE_ROWS = 20
+
+NOT_A_NUMBER = 'not_a_number'
+OUT_OF_RANGE = 'out_of_range'
+
+# Unbounded sides still reject infinities, and numbers the float32 column
+# store could only keep as infinities
+_FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+
+def _bounds(ranges):
+    """``(2, columns)`` float64 array of low and high limits."""
+    low = [-_FLOAT32_MAX if ranges[col][0] is None else ranges[col][0] for col in COLUMNS]
+    high = [_FLOAT32_MAX if ranges[col][1] is None else ranges[col][1] for col in COLUMNS]
+    return np.array([low, high], dtype=np.float64)
+
+
+def _cell(value):
+    value = float(value)
+    if np.isnan(value):
+        return None
+    if not np.isfinite(value):
+        # Strict JSON has no infinities
+        return repr(value)
+    return value
+
+
+class QuarantineReport:
+    """Counts of quarantined rows per column and reason, with a bounded sample."""
+
+    def __init__(self, sample_rows=SAMPLE_ROWS):
+        self.sample_rows = sample_rows
+        self.checked = 0
+        self.rows = 0
+        self.counts = np.zeros((len(COLUMNS), 2), dtype=np.int64)  # [not a number, out of range]
+        self.samples = []
+
+    def add(self, start, rows, block, codes, categories, invalid, out_of_range, raw):
+        """Record the quarantined ``rows`` (indexes into a block read from row ``start``)."""
+        self.rows += len(rows)
+        if invalid is not None:
+            self.counts[:, 0] += invalid[rows].sum(axis=0)
+        self.counts[:, 1] += out_of_range[rows].sum(axis=0)
+        for row in rows[:max(self.sample_rows - len(self.samples), 0)]:
+            sample = {'row': start + int(row) + 1, 'type': categories[codes[row]] if codes[row] >= 0 else None}
+            problems = []
+            for i, col in enumerate(COLUMNS):
+                if invalid is not None and invalid[row, i]:
+                    sample[col] = str(raw[i][row])
+                    problems.append(f'{col}: {NOT_A_NUMBER}')
+                else:
+                    sample[col] = _cell(block[row, i])
+                    if out_of_range[row, i]:
+                        problems.append(f'{col}: {OUT_OF_RANGE}')
+            sample['problems'] = problems
+            self.samples.append(sample)
+
+    def merge(self, other):
+        """Append the report of the rows read after this one's."""
+        room = max(self.sample_rows - len(self.samples), 0)
+        self.samples.extend({**s, 'row': s['row'] + self.checked} for s in other.samples[:room])
+        self.checked += other.checked
+        self.rows += other.rows
+        self.counts += other.counts
+        return self
+
+    def as_dict(self):
+        """The report as sent with the summary; ``row`` numbers count data rows from 1."""
+        columns = {}
+        for i, col in enumerate(COLUMNS):
+            counts = {reason: int(n) for reason, n in zip((NOT_A_NUMBER, OUT_OF_RANGE), self.counts[i]) if n}
+            if counts:
+                columns[col] = counts
+        return {'rows': self.rows, 'columns': columns, 'samples': self.samples}
+
+
+def combine_reports(reports):
+    """Totals of several ``as_dict()`` reports (of different files), without samples."""
+    columns = {}
+    for report in reports:
+        for col, counts in report['columns'].items():
+            totals = columns.setdefault(col, {})
+            for reason, n in counts.items():
+                totals[reason] = totals.get(reason, 0) + n
+    return {'rows': sum(report['rows'] for report in reports), 'columns': columns, 'samples': []}
+
+
+class NoValidRows(ValueError):
+    """Every row of an upload was quarantined; ``quarantine`` is the report."""
+
+    def __init__(self, quarantine):
+        super().__init__(f"No valid rows: all {quarantine['rows']} rows were quarantined")
+        self.quarantine = quarantine
+
+
+class Validator:
+    """Checks blocks against per-type ranges, collecting a ``QuarantineReport``.
+
+    ``ranges`` overrides ``DEFAULT_RANGES`` by column; ``type_ranges`` maps an
+    equipment type to its own column overrides.
+    """
+
+    def __init__(self, ranges=None, type_ranges=None, sample_rows=SAMPLE_ROWS):
+        ranges = {**DEFAULT_RANGES, **(ranges or {})}
+        self._default = _bounds(ranges)
+        self._type_bounds = {name: _bounds({**ranges, **limits}) for name, limits in (type_ranges or {}).items()}
+        self.report = QuarantineReport(sample_rows)
+
+    def _limits(self, codes, categories):
+        if not self._type_bounds:
+            return self._default
+        # One (low, high) pair per category, plus the default for a missing type (-1)
+        table = np.stack([self._type_bounds.get(name, self._default) for name in categories] + [self._default])
+        limits = table[codes]
+        return limits[:, 0], limits[:, 1]
+
+    def check(self, block, codes, categories, invalid=None, raw=None):
+        """``(block, codes)`` without the rows that fail validation, which are reported.
+
+        ``invalid`` marks cells whose text was not a number (they are NaN in
+        ``block``), and ``raw`` maps a column index to that column's text.
+        """
+        start = self.report.checked
+        self.report.checked += len(block)
+        low, high = self._limits(codes, categories)
+        out_of_range = (block < low) | (block > high)
+        bad_cells = out_of_range if invalid is None else out_of_range | invalid
+        bad = bad_cells.any(axis=1)
+        if not bad.any():
+            return block, codes
+        self.report.add(start, np.flatnonzero(bad), block, codes, categories, invalid, out_of_range, raw)
+        keep = ~bad
+        return block[keep], codes[keep]
@@ -1,63 +1,186 @@
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-import pandas as pd
-from io import TextIOWrapper
-from .models import EquipmentUpload
+from .analytics import type_trends, weekly_trend
+from .batch import record_batch, summarize_request
+from .cache import upload_digest
+from .columnar import get_column_store
+from .history import history_response
+from .jobs import submit_upload
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .metrics import observe_upload, render_metrics, stage
+from .models import EquipmentUpload, UploadJob
+from .pipeline import summarize_upload
+from .serializers import history_params, job_accepted, job_status, upload_error, upload_summary
 
 @api_view(['POST'])
 def upload_equipment_data(request):
-    file = request.FILES.get('file')
+    # Reading request.FILES receives and parses the multipart body
+    with stage('receive'):
+        file = request.FILES.get('file')
     if not file:
         return Response({'error': 'No file uploaded'}, status=400)
 
-    try:
-        df = pd.read_csv(TextIOWrapper(file, encoding='utf-8'))
-
-        # Normalize columns
-        df.columns = [col.strip().lower() for col in df.columns]
-
-        summary = {
-            'total_equipment': len(df),
-            'average_flowrate': df['flowrate'].mean(),
-            'average_pressure': df['pressure'].mean(),
-            'average_temperature': df['temperature'].mean(),
+    # ?mode=async spools the file and returns a job to poll instead
+    if request.query_params.get('mode') == 'async':
+        job = submit_upload(file, upload_digest(request))
+        return Response(job_accepted(job), status=202)
 
-            # IMPORTANT FIX:
-            'type_distribution': df['type'].value_counts().to_dict()
-        }
+    try:
+        # Re-uploads of the same bytes are answered from the cache
+        result = summarize_upload(file, upload_digest(request))
+        observe_upload(result.summary['total_equipment'], file.size)
 
         # Save summary to DB
-        EquipmentUpload.objects.create(
-            filename=file.name,
-            total_equipment=len(df),
-            average_flowrate=df['flowrate'].mean(),
-            average_pressure=df['pressure'].mean(),
-            average_temperature=df['temperature'].mean()
-        )
+        upload = EquipmentUpload.objects.record_summary(file.name, result.summary, result.data_path)
 
-        # Keep last 5 uploads
-        if EquipmentUpload.objects.count() > 5:
-            oldest = EquipmentUpload.objects.order_by('upload_time').first()
-            oldest.delete()
-
-        return Response(summary)
+        return Response(
+            {**upload_summary(result.summary), 'upload_id': upload.id},
+            headers={'X-Summary-Cache': result.cache_status},
+        )
 
+    except ValueError as e:
+        # The file itself is unusable (missing columns, not a CSV, no valid rows, ...)
+        return Response(upload_error(e), status=400)
     except Exception as e:
         return Response({'error': str(e)}, status=500)
 
 
+@api_view(['POST'])
+def upload_batch(request):
+    with stage('receive'):
+        files = request.FILES.getlist('files')
+    if not files:
+        return Response({'error': 'No files uploaded'}, status=400)
+
+    try:
+        # Files are summarized concurrently, then recorded in one transaction
+        with stage('parse'):
+            results = summarize_request(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    body = record_batch(results)
+    return Response(body, status=200 if body['uploaded'] else 400)
+
+
 @api_view(['GET'])
 def get_upload_history(request):
-    uploads = EquipmentUpload.objects.order_by('-upload_time')[:5]
-    data = [
-        {
-            'filename': u.filename,
-            'upload_time': u.upload_time.strftime("%Y-%m-%d %H:%M:%S"),
-            'total_equipment': u.total_equipment,
-            'average_flowrate': u.average_flowrate,
-            'average_pressure': u.average_pressure,
-            'average_temperature': u.average_temperature,
-        }
-        for u in uploads
-    ]
-    return Response(data)
\ No newline at end of file
+    try:
+        limit, cursor = history_params(request.query_params)
+        # Conditional, with the serialized page cached (see api/history.py)
+        return history_response(request, limit, cursor)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+
+
+@api_view(['GET'])
+def get_job_status(request, job_id):
+    job = get_object_or_404(UploadJob, pk=job_id)
+    return Response(job_status(job))
+
+
+def _stored_columns(upload_id):
+    upload = get_object_or_404(EquipmentUpload.objects.only('data_path'), pk=upload_id)
+    store = get_column_store()
+    if store is None or not store.exists(upload.data_path):
+        return None
+    return store.open(upload.data_path)
+
+
+@api_view(['GET'])
+def get_upload_rows(request, upload_id):
+    columns = _stored_columns(upload_id)
+    if columns is None:
+        return Response({'error': 'No row data stored for this upload'}, status=404)
+    try:
+        offset = int(request.query_params.get('offset', 0))
+        limit = int(request.query_params.get('limit', 100))
+        if offset < 0 or not 1 <= limit <= 10000:
+            raise ValueError
+    except ValueError:
+        return Response({'error': 'offset must be >= 0 and limit between 1 and 10000'}, status=400)
+
+    equipment_type = request.query_params.get('type')
+    total, rows = columns.slice(offset, limit, equipment_type)
+    return Response({
+        'upload_id': upload_id,
+        'type': equipment_type,
+        'total': total,
+        'offset': offset,
+        'rows': rows,
+    })
+
+
+@api_view(['GET'])
+def get_upload_summary(request, upload_id):
+    columns = _stored_columns(upload_id)
+    if columns is None:
+        return Response({'error': 'No row data stored for this upload'}, status=404)
+    equipment_type = request.query_params.get('type')
+    return Response({'upload_id': upload_id, 'type': equipment_type, **columns.summary(equipment_type)})
+
+
+def _stored_distribution(upload):
+    """The upload's histograms; recorded with its summary, or computed once
+    from its stored rows for uploads recorded before they were."""
+    if upload.distribution:
+        return upload.distribution
+    store = get_column_store()
+    if store is None or not store.exists(upload.data_path):
+        return None
+    distribution = store.open(upload.data_path).summary()['distribution']
+    EquipmentUpload.objects.filter(pk=upload.pk).update(distribution=distribution)
+    return distribution
+
+
+@api_view(['GET'])
+def get_upload_distribution(request, upload_id):
+    upload = get_object_or_404(EquipmentUpload.objects.only('upload_time', 'data_path', 'distribution'), pk=upload_id)
+    # A recorded upload's histograms never change
+    etag = f'"distribution-{upload.pk}-{upload.upload_time.timestamp():.6f}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        distribution = _stored_distribution(upload)
+        if distribution is None:
+            return Response({'error': 'No distribution stored for this upload'}, status=404)
+        equipment_type = request.query_params.get('type')
+        body = {'upload_id': upload_id, 'type': equipment_type,
+                'bins': distribution['bins'], 'grid': distribution['grid']}
+        if equipment_type is None:
+            body.update(counts=distribution['all'], types=distribution['types'])
+        else:
+            empty = {column: [0] * distribution['bins'] for column in distribution['grid']}
+            body['counts'] = distribution['types'].get(equipment_type, empty)
+        response = Response(body)
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@api_view(['GET'])
+def get_analytics(request):
+    params = request.query_params
+    metric = params.get('metric', 'flowrate')
+    equipment_type = params.get('type') or None
+    try:
+        if params.get('group', 'upload') == 'week':
+            weeks = int(params.get('weeks', 8))
+            if not 1 <= weeks <= 520:
+                raise ValueError('weeks must be between 1 and 520')
+            return Response(weekly_trend(metric, weeks, equipment_type))
+
+        last = int(params.get('last', 10))
+        if not 1 <= last <= 1000:
+            raise ValueError('last must be between 1 and 1000')
+        return Response(type_trends(metric, last, equipment_type))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+
+
+@require_GET
+def get_metrics(request):
+    # Plain Django view: Prometheus expects its text format, not DRF's renderers
+    return HttpResponse(render_metrics(), content_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,18 @@
+"""Entry points for spawned pool workers.
+
+Spawned processes unpickle these functions before Django is configured, so
+this module must not import models at import time.
+"""
+import os
+
+
+def init_worker():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    import django
+    django.setup()
+
+
+def run_job(job_id):
+    from .jobs import run_job
+    # No aggregation pool inside a pool worker
+    run_job(job_id, parallel=False)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the other middleware too
+    "api.middleware.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.security.SecurityMiddleware",
@@ -85,9 +88,23 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Seconds a connection waits for another's write lock before
+        # "database is locked"
+        "OPTIONS": {"timeout": 20},
+        # Reuse connections across requests; Django advises against
+        # persistent connections under ASGI (see EQUIPMENT_ASYNC_VIEWS)
+        "CONN_MAX_AGE": 0 if os.environ.get("EQUIPMENT_ASYNC_VIEWS", "0") == "1" else 600,
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Set on every new SQLite connection (see api/sqlite.py)
+EQUIPMENT_SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -130,4 +147,100 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-CORS_ALLOW_ALL_ORIGINS = True
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = True
+
+
+# Uploads
+# HashingUploadHandler must run first so files are hashed while received
+
+FILE_UPLOAD_HANDLERS = [
+    "api.uploadhandlers.HashingUploadHandler",
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+
+# Summary cache keyed on the upload's content hash. BACKEND is an optional
+# alias from CACHES (e.g. a FileBasedCache shared by all workers).
+
+EQUIPMENT_SUMMARY_CACHE = {
+    "MAX_BYTES": 16 * 1024 * 1024,
+    "BACKEND": None,
+    "TIMEOUT": 24 * 60 * 60,
+}
+
+# Background upload jobs (POST api/equipment/?mode=async). WORKERS=0 runs
+# jobs inline in the request.
+
+EQUIPMENT_JOBS = {
+    "WORKERS": 2,
+    "SPOOL_DIR": BASE_DIR / "spool",
+}
+
+# Batch uploads (POST api/equipment/batch/, see api/batch.py): WORKERS
+# threads summarize a request's files; MAX_FILES counts zip members too.
+
+EQUIPMENT_BATCH = {
+    "WORKERS": min(4, os.cpu_count() or 1),
+    "MAX_FILES": 200,
+}
+
+# Serve api/equipment/ and api/history/ with native async views (see
+# api/async_views.py). backend/asgi.py turns this on.
+
+EQUIPMENT_ASYNC_VIEWS = os.environ.get("EQUIPMENT_ASYNC_VIEWS", "0") == "1"
+
+# Upload history: rows kept in the database, and the default page size of
+# api/history/ (pages further back with ?cursor=).
+
+EQUIPMENT_HISTORY_LIMIT = 5
+EQUIPMENT_HISTORY_PAGE_SIZE = 5
+
+# Upload validation (see api/validation.py): rows with a numeric cell that
+# is not a number, or outside RANGES ((low, high) per column, None for
+# unbounded), are left out of the summary and reported in its "quarantine",
+# with up to SAMPLE_ROWS sample rows. TYPE_RANGES overrides the ranges per
+# equipment type, e.g. {"Pump": {"pressure": (0, 60)}}. Changing them makes
+# earlier cached summaries miss; recorded uploads keep their stored rows.
+
+EQUIPMENT_VALIDATION = {
+    "RANGES": {
+        "flowrate": (0, None),
+        "pressure": (0, None),
+        "temperature": (-273.15, None),
+    },
+    "TYPE_RANGES": {},
+    "SAMPLE_ROWS": 20,
+}
+
+# Serialized api/history/ pages kept per process, keyed on the history
+# version that uploads bump (see api/history.py).
+
+EQUIPMENT_HISTORY_CACHE = {
+    "ENABLED": True,
+    "MAX_ENTRIES": 64,
+}
+
+# Parallel aggregation of large plain-CSV uploads already on disk (see
+# api/parallel.py): files of at least THRESHOLD_BYTES are split into ranges
+# aggregated by up to WORKERS processes. Fewer than 2 workers turns it off.
+
+EQUIPMENT_PARALLEL = {
+    "WORKERS": os.cpu_count() or 1,
+    "THRESHOLD_BYTES": 256 * 1024 * 1024,
+}
+
+# Request metrics, served in the Prometheus text format at api/metrics/.
+# With PROFILING on, a request sent with "X-Profile: cprofile" (or
+# "pyinstrument", if installed) is profiled into PROFILE_DIR.
+
+EQUIPMENT_METRICS = {
+    "PROFILING": os.environ.get("EQUIPMENT_PROFILING", "0") == "1",
+    "PROFILE_DIR": BASE_DIR / "profiles",
+}
+
+# Per-upload columnar copy of the parsed rows, served by api/uploads/<id>/...
+
+EQUIPMENT_COLUMN_STORE = {
+    "ENABLED": True,
+    "ROOT": BASE_DIR / "column_store",
+}
@@ -0,0 +1,86 @@
+"""Latency of api/analytics/ as the number of recorded uploads grows.
+
+Trend queries read only rollup rows, never the files. The last-N queries
+read the rollups of those N uploads; the weekly query reads one row per
+week and type, so its latency should stay flat whether there are a hundred
+or a hundred thousand uploads.
+
+    python benchmarks/analytics_latency.py --sizes 100 1000 10000 100000
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from common import django_in_process, latency_stats, write_results
+
+TYPES = ["Pump", "Valve", "Compressor", "Heater", "Cooler"]
+QUERIES = {
+    "last_20_pressure": {"metric": "pressure", "last": 20},
+    "last_20_pump": {"metric": "pressure", "last": 20, "type": "Pump"},
+    "weekly_8_flowrate": {"metric": "flowrate", "group": "week", "weeks": 8},
+}
+
+
+def fill_rollups(uploads, now):
+    """Replace all rollups with ``uploads`` hourly uploads, the last one now."""
+    from api.models import TypeRollup, WeeklyRollup, rollup_fields
+
+    TypeRollup.objects.all().delete()
+    WeeklyRollup.objects.all().delete()
+    first_time = now - timedelta(hours=uploads)
+    rng = random.Random(uploads)
+    rows, weekly = [], []
+    for upload_id in range(uploads):
+        upload_time = first_time + timedelta(hours=upload_id)
+        rollups = {}
+        for equipment_type in TYPES:
+            n = rng.randint(100, 1000)
+            totals = {"count": n}
+            for metric in TypeRollup.METRICS:
+                mean = rng.uniform(10, 200)
+                totals[metric] = {"count": n, "sum": mean * n, "sumsq": (mean * mean + 25) * n}
+            rollups[equipment_type] = totals
+            rows.append(TypeRollup(upload_id=upload_id, upload_time=upload_time,
+                                   equipment_type=equipment_type, **rollup_fields(totals)))
+        weekly.append((upload_time, rollups))
+    TypeRollup.objects.bulk_create(rows, batch_size=5000)
+    WeeklyRollup.objects.add_many(weekly)
+
+
+def time_queries(client, repeat):
+    results = {}
+    for name, params in QUERIES.items():
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get("/api/analytics/", params)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.content
+        results[name] = latency_stats(latencies)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    with django_in_process():
+        from django.test import Client
+        from django.utils import timezone
+
+        client = Client()
+        results = {}
+        print(f"{'uploads':>10}" + "".join(f"{name + ' p50 ms':>26}" for name in QUERIES))
+        for size in sorted(args.sizes):
+            fill_rollups(size, timezone.now())
+            results[size] = time_queries(client, args.repeat)
+            print(f"{size:>10}" + "".join(f"{results[size][name]['p50_ms']:>26.2f}" for name in QUERIES))
+        write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""A nightly push of many per-unit CSVs: one POST per file vs one batch request.
+
+N synthetic files (see datagen.py) are sent to a fresh gunicorn deployment
+per mode:
+
+  single     one POST to api/equipment/ per file, one after the other, as
+             the nightly job did: a parse, INSERT and prune per file
+  batch      every file in one multipart POST to api/equipment/batch/
+  batch-zip  the files as one zip archive posted to api/equipment/batch/
+
+Each file has distinct content, so the summary cache does not help.
+
+    pip install gunicorn
+    python benchmarks/batch_upload.py --files 48 --rows 20000 --output batch.json
+"""
+import argparse
+import http.client
+import io
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from common import multipart_body, multipart_files, running_server, write_results
+from datagen import generate_csv
+
+MODES = ("single", "batch", "batch-zip")
+
+
+def post(conn, path, body, content_type):
+    start = time.perf_counter()
+    conn.request("POST", path, body, {"Content-Type": content_type})
+    response = conn.getresponse()
+    payload = response.read()
+    if response.status != 200:
+        raise RuntimeError(f"{path} answered {response.status}: {payload[:200]!r}")
+    return time.perf_counter() - start
+
+
+def run_mode(base_url, mode, files):
+    host, port = base_url.removeprefix("http://").split(":")
+    conn = http.client.HTTPConnection(host, int(port), timeout=600)
+    try:
+        if mode == "single":
+            seconds = sum(post(conn, "/api/equipment/", *multipart_body(name, data)) for name, data in files)
+        elif mode == "batch":
+            seconds = post(conn, "/api/equipment/batch/", *multipart_files(files))
+        else:
+            archive = io.BytesIO()
+            with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as out:
+                for name, data in files:
+                    out.writestr(name, data)
+            seconds = post(conn, "/api/equipment/batch/",
+                           *multipart_files([("units.zip", archive.getvalue())], content_type="application/zip"))
+    finally:
+        conn.close()
+    rows = sum(data.count(b"\n") - 1 for _, data in files)
+    return {"seconds": seconds, "files_per_sec": len(files) / seconds, "rows_per_sec": rows / seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=48)
+    parser.add_argument("--rows", type=int, default=20_000, help="rows per file")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn worker processes")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--port", type=int, default=8830)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    files = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.files):
+            path = generate_csv(Path(tmp) / f"unit-{i:03d}.csv", args.rows, seed=i)
+            files.append((path.name, path.read_bytes()))
+
+    results = {"files": args.files, "rows_per_file": args.rows, "workers": args.workers}
+    for offset, mode in enumerate(args.modes):
+        with running_server("wsgi", args.port + offset, args.workers) as base_url:
+            results[mode] = run_mode(base_url, mode, files)
+
+    print(f"{'':11}{'seconds':>9}{'files/s':>9}{'rows/s':>12}")
+    for mode in args.modes:
+        r = results[mode]
+        print(f"{mode:11}{r['seconds']:9.2f}{r['files_per_sec']:9.1f}{r['rows_per_sec']:12.0f}")
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
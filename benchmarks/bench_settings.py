@@ -0,0 +1,29 @@
+"""Django settings for benchmark servers: the project settings with a
+throwaway database given by ``BENCH_DB_PATH``."""
+import os
+from pathlib import Path
+
+from backend.settings import *  # noqa: F401,F403
+from backend.settings import DATABASES, EQUIPMENT_COLUMN_STORE, EQUIPMENT_HISTORY_CACHE, EQUIPMENT_SQLITE_PRAGMAS
+
+DEBUG = False
+ALLOWED_HOSTS = ["127.0.0.1", "localhost", "testserver"]
+
+DATABASES["default"]["NAME"] = os.environ["BENCH_DB_PATH"]
+# Stored rows go next to the throwaway database, not into the source tree
+EQUIPMENT_COLUMN_STORE = {
+    **EQUIPMENT_COLUMN_STORE,
+    "ROOT": Path(os.environ["BENCH_DB_PATH"]).parent / "column_store",
+}
+
+# history_polling.py compares polling with and without the page cache
+EQUIPMENT_HISTORY_CACHE = {
+    **EQUIPMENT_HISTORY_CACHE,
+    "ENABLED": os.environ.get("BENCH_HISTORY_CACHE", "1") == "1",
+}
+
+# sqlite_concurrency.py compares the tuned connections with Django's defaults
+if os.environ.get("BENCH_SQLITE_TUNING", "1") != "1":
+    EQUIPMENT_SQLITE_PRAGMAS = {}
+    DATABASES["default"].pop("OPTIONS", None)
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
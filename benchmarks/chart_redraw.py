@@ -0,0 +1,105 @@
+"""Chart refresh time on a headless Agg canvas: rebuild vs in-place update.
+
+"rebuild" is the previous update_charts (ax.clear(), new bars and pie,
+tight_layout, full draw of figures created with tight_layout=True);
+"in-place" uses desktop/charts.py. Each refresh shows new counts for the same
+types, as when re-uploading similar files; the first refresh of each run,
+which builds the axes, is excluded.
+
+    python benchmarks/chart_redraw.py --refreshes 200 --types 5 20
+"""
+import argparse
+import sys
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np  # noqa: E402
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+
+from common import DESKTOP_DIR, latency_stats, write_results  # noqa: E402
+
+sys.path.insert(0, str(DESKTOP_DIR))
+from charts import COLORS, BarChart, PieChart  # noqa: E402
+from datagen import type_names  # noqa: E402
+
+
+class Rebuild:
+    def __init__(self):
+        self.bar_fig = Figure(figsize=(6, 3), tight_layout=True)
+        self.pie_fig = Figure(figsize=(6, 3), tight_layout=True)
+        self.canvases = [FigureCanvasAgg(self.bar_fig), FigureCanvasAgg(self.pie_fig)]
+        self.bar_ax = self.bar_fig.add_subplot(111)
+        self.pie_ax = self.pie_fig.add_subplot(111)
+
+    def refresh(self, labels, counts):
+        colors = COLORS
+        self.bar_ax.clear()
+        self.bar_ax.bar(labels, counts, color=colors[:len(labels)], edgecolor="white", width=0.45)
+        self.bar_ax.margins(x=0.15)
+        self.bar_ax.set_title("Equipment Type Distribution (Bar)")
+        self.bar_ax.tick_params(axis="x", rotation=25)
+        self.bar_fig.tight_layout()
+        self.pie_ax.clear()
+        self.pie_ax.pie(counts, labels=labels, autopct="%1.1f%%", colors=colors[:len(labels)])
+        self.pie_ax.axis("equal")
+        self.pie_ax.set_title("Equipment Type Distribution (Pie)")
+        self.pie_fig.tight_layout()
+        for canvas in self.canvases:
+            canvas.draw()
+
+
+class InPlace:
+    def __init__(self):
+        bar_fig, pie_fig = Figure(figsize=(6, 3)), Figure(figsize=(6, 3))
+        self.canvases = [FigureCanvasAgg(bar_fig), FigureCanvasAgg(pie_fig)]
+        self.bar = BarChart(bar_fig)
+        self.pie = PieChart(pie_fig)
+
+    def refresh(self, labels, counts):
+        self.bar.update(labels, counts)
+        self.pie.update(labels, counts)
+        for canvas in self.canvases:
+            canvas.draw()
+
+
+VARIANTS = {"rebuild": Rebuild, "in-place": InPlace}
+
+
+def time_variant(variant, labels, refreshes, seed=0):
+    rng = np.random.default_rng(seed)
+    charts = VARIANTS[variant]()
+    charts.refresh(labels, rng.integers(1, 1000, len(labels)).tolist())
+    latencies = []
+    for _ in range(refreshes):
+        counts = rng.integers(1, 1000, len(labels)).tolist()
+        start = time.perf_counter()
+        charts.refresh(labels, counts)
+        latencies.append(time.perf_counter() - start)
+    return latency_stats(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--refreshes", type=int, default=100)
+    parser.add_argument("--types", type=int, nargs="+", default=[5, 20])
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'types':>6}  {'variant':10}{'p50 ms':>10}{'p90 ms':>10}")
+    for types in args.types:
+        labels = type_names(types)
+        results[types] = {}
+        for variant in VARIANTS:
+            stats = time_variant(variant, labels, args.refreshes)
+            results[types][variant] = stats
+            print(f"{types:>6}  {variant:10}{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}")
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
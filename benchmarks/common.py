@@ -0,0 +1,142 @@
+"""Helpers shared by the benchmark scripts."""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BACKEND_DIR = REPO_ROOT / "backend"
+DESKTOP_DIR = REPO_ROOT / "desktop"
+BENCH_DIR = REPO_ROOT / "benchmarks"
+SAMPLE_CSV = REPO_ROOT / "sample_equipment_data.csv"
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of ``values`` (0 < q <= 100)."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(1, int(round(q / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB.
+
+    Prefers VmHWM: ru_maxrss survives exec, so a child started by a large
+    parent would report the parent's peak.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def latency_stats(latencies):
+    return {
+        "count": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def multipart_body(filename, data, field="file", content_type="text/csv"):
+    """Encode one file as multipart/form-data; returns (body, content_type)."""
+    return multipart_files([(filename, data)], field, content_type)
+
+
+def multipart_files(files, field="files", content_type="text/csv"):
+    """Encode ``(filename, data)`` pairs as repeated ``field`` parts; returns (body, content_type)."""
+    boundary = uuid.uuid4().hex
+    parts = [
+        (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode() + data + b"\r\n"
+        for filename, data in files
+    ]
+    body = b"".join(parts) + f"--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def django_env(db_path, **extra):
+    """Environment for running the backend against a benchmark database."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(BACKEND_DIR), str(BENCH_DIR), env.get("PYTHONPATH", "")])
+    env["DJANGO_SETTINGS_MODULE"] = "bench_settings"
+    env["BENCH_DB_PATH"] = str(db_path)
+    env.update(extra)
+    return env
+
+
+@contextmanager
+def django_in_process(**extra_env):
+    """Configure Django in this process against a fresh, migrated database."""
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(django_env(Path(tmp) / "bench.sqlite3", **extra_env))
+        for path in (str(BACKEND_DIR), str(BENCH_DIR)):
+            if path not in sys.path:
+                sys.path.insert(0, path)
+        import django
+        from django.core.management import call_command
+
+        django.setup()
+        call_command("migrate", verbosity=0)
+        yield
+
+
+def server_command(kind, port, workers):
+    if kind == "wsgi":
+        return [sys.executable, "-m", "gunicorn", "backend.wsgi:application",
+                "--workers", str(workers), "--bind", f"127.0.0.1:{port}", "--log-level", "warning"]
+    if kind == "asgi":
+        return [sys.executable, "-m", "uvicorn", "backend.asgi:application",
+                "--workers", str(workers), "--port", str(port), "--log-level", "warning"]
+    raise ValueError(f"unknown server kind {kind!r}")
+
+
+@contextmanager
+def running_server(kind, port, workers=1, env_extra=None):
+    """Start gunicorn (wsgi) or uvicorn (asgi) on a fresh database."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = django_env(Path(tmp) / "bench.sqlite3", **(env_extra or {}))
+        subprocess.run([sys.executable, "manage.py", "migrate", "-v0"], cwd=BACKEND_DIR, env=env, check=True)
+        proc = subprocess.Popen(server_command(kind, port, workers), cwd=BACKEND_DIR, env=env)
+        try:
+            wait_until_up(f"http://127.0.0.1:{port}/")
+            yield f"http://127.0.0.1:{port}"
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+def wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not start")
+
+
+def write_results(path, results):
+    if path:
+        Path(path).write_text(json.dumps(results, indent=2))
+        print(f"results written to {path}")
@@ -0,0 +1,93 @@
+"""Synthetic equipment CSV generator.
+
+    python benchmarks/datagen.py out.csv --rows 1000000
+    python benchmarks/datagen.py out.csv --size-mb 1024
+    python benchmarks/datagen.py out.csv --rows 50000000 --types 40 --dirty 0.02
+
+``--dirty`` is the fraction of rows given one defect the pipeline has to
+cope with: an empty numeric cell, an out-of-range value, an empty type or a
+type with stray case/whitespace.
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+TYPES = ["Pump", "Valve", "Compressor", "Heater", "Cooler"]
+BATCH_ROWS = 1_000_000
+# Rough size of one generated row, used to turn --size-mb into rows
+APPROX_ROW_BYTES = 40
+NUMERIC_RANGES = {
+    "Flowrate": (0, 250, 1),
+    "Pressure": (2, 40, 2),
+    "Temperature": (40, 150, 1),
+}
+DEFECTS = ("empty_value", "out_of_range", "empty_type", "messy_type")
+
+
+def type_names(cardinality):
+    """``cardinality`` type names, starting with the sample file's five."""
+    extra = [f"Type {i}" for i in range(len(TYPES) + 1, cardinality + 1)]
+    return (TYPES + extra)[:cardinality]
+
+
+def _dirty(frame, rng, ratio):
+    """Give about ``ratio`` of the rows one defect each, in place."""
+    rows = np.flatnonzero(rng.random(len(frame)) < ratio)
+    kinds = rng.integers(len(DEFECTS), size=len(rows))
+    numeric = list(NUMERIC_RANGES)
+    for kind, name in enumerate(DEFECTS):
+        target = rows[kinds == kind]
+        if not len(target):
+            continue
+        if name == "empty_type":
+            frame.loc[target, "Type"] = ""
+        elif name == "messy_type":
+            frame.loc[target, "Type"] = " " + frame.loc[target, "Type"].str.lower()
+        else:
+            columns = rng.choice(numeric, size=len(target))
+            for column in numeric:
+                hit = target[columns == column]
+                if name == "empty_value":
+                    frame.loc[hit, column] = np.nan
+                else:
+                    frame.loc[hit, column] = -frame.loc[hit, column] * 100
+    return frame
+
+
+def generate_csv(path, rows, seed=0, types=len(TYPES), dirty=0.0):
+    """Write ``rows`` synthetic equipment rows in the sample file's layout."""
+    rng = np.random.default_rng(seed)
+    names = np.array(type_names(types))
+    with open(path, "w", newline="") as f:
+        for start in range(0, rows, BATCH_ROWS):
+            n = min(BATCH_ROWS, rows - start)
+            kinds = rng.choice(names, size=n)
+            frame = pd.DataFrame({
+                "Equipment Name": [f"{t} {start + i}" for i, t in enumerate(kinds)],
+                "Type": kinds,
+            })
+            for column, (low, high, decimals) in NUMERIC_RANGES.items():
+                frame[column] = rng.uniform(low, high, n).round(decimals)
+            if dirty:
+                _dirty(frame, rng, dirty)
+            frame.to_csv(f, index=False, header=start == 0)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    size = parser.add_mutually_exclusive_group(required=True)
+    size.add_argument("--rows", type=int)
+    size.add_argument("--size-mb", type=float)
+    parser.add_argument("--types", type=int, default=len(TYPES), help="number of distinct equipment types")
+    parser.add_argument("--dirty", type=float, default=0.0, help="fraction of rows with a defect")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rows = args.rows or int(args.size_mb * 1024 * 1024 / APPROX_ROW_BYTES)
+    generate_csv(args.path, rows, args.seed, args.types, args.dirty)
+
+
+if __name__ == "__main__":
+    main()
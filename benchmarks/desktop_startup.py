@@ -0,0 +1,104 @@
+"""Desktop cold start: import cost and time to first paint.
+
+Each run starts a fresh interpreter that imports desktop/app.py, builds the
+window and exits on its first paint event; time to first paint is measured
+from process launch, so interpreter start-up is included. One extra run
+with ``-X importtime`` lists the slowest imports.
+
+    python benchmarks/desktop_startup.py --runs 5 --target-ms 500
+
+Uses the offscreen Qt platform unless QT_QPA_PLATFORM is set. Exits with
+status 1 when the median time to first paint misses the target.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import DESKTOP_DIR, percentile, write_results
+
+CHILD = """
+import sys, time
+from PyQt5.QtCore import QEvent, QObject
+from PyQt5.QtWidgets import QApplication
+
+app = QApplication(sys.argv)
+import app as desktop
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            print(f"painted {time.time():.6f}", flush=True)
+            app.exit(0)
+        return False
+
+window = desktop.App()
+watcher = FirstPaint()
+window.installEventFilter(watcher)
+window.show()
+app.exec_()
+"""
+
+
+def launch(extra_args=(), cwd=None):
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    env["PYTHONPATH"] = os.pathsep.join([str(DESKTOP_DIR), env.get("PYTHONPATH", "")])
+    start = time.time()
+    proc = subprocess.run([sys.executable, *extra_args, "-c", CHILD], cwd=cwd, env=env,
+                          capture_output=True, text=True, timeout=120)
+    if proc.returncode:
+        raise RuntimeError(proc.stderr)
+    painted = next(line for line in proc.stdout.splitlines() if line.startswith("painted"))
+    return float(painted.split()[1]) - start, proc.stderr
+
+
+def slowest_imports(importtime_log, top):
+    """``(module, cumulative_ms)`` for the slowest imports in a -X importtime log.
+
+    Cumulative times include nested imports, so a module and the package
+    that imported it can both be listed.
+    """
+    entries = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        entries.append((name.strip(), int(cumulative) / 1000))
+    return sorted(entries, key=lambda e: -e[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=500, help="target median time to first paint")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    # Run from an empty directory so no local history is loaded
+    with tempfile.TemporaryDirectory() as cwd:
+        launch(cwd=cwd)  # warm the OS file cache
+        paints = [launch(cwd=cwd)[0] * 1000 for _ in range(args.runs)]
+        _, log = launch(["-X", "importtime"], cwd=cwd)
+
+    median = percentile(paints, 50)
+    imports = slowest_imports(log, args.top)
+    print(f"time to first paint: median {median:.0f} ms, min {min(paints):.0f} ms "
+          f"(target {args.target_ms:.0f} ms)")
+    print("slowest imports (cumulative):")
+    for name, ms in imports:
+        print(f"  {ms:8.1f} ms  {name}")
+    write_results(args.output, {
+        "first_paint_ms": paints,
+        "median_ms": median,
+        "target_ms": args.target_ms,
+        "slowest_imports_ms": dict(imports),
+    })
+    sys.exit(0 if median <= args.target_ms else 1)
+
+
+if __name__ == "__main__":
+    main()
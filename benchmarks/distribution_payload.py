@@ -0,0 +1,61 @@
+"""Payload size and latency of api/uploads/<id>/distribution/ as uploads grow.
+
+The histograms are computed while the upload is summarized and stored with
+it, so the response should stay the same size (and about as fast) whether
+the upload has ten thousand rows or ten million. The CSV size is what a
+client would otherwise have to fetch to bin the values itself.
+
+    python benchmarks/distribution_payload.py --rows 10000 1000000 10000000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from common import django_in_process, latency_stats, write_results
+from datagen import generate_csv
+
+
+def time_distribution(client, upload_id, repeat, params=None):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(f"/api/uploads/{upload_id}/distribution/", params or {})
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.content
+    return {"bytes": len(response.content), **latency_stats(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--types", type=int, default=5, help="equipment types in the generated files")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    with django_in_process(), tempfile.TemporaryDirectory() as tmp:
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.test import Client
+
+        client = Client()
+        results = {}
+        print(f"{'rows':>10}{'CSV bytes':>14}{'all bytes':>11}{'p50 ms':>9}{'one type bytes':>16}{'p50 ms':>9}")
+        for rows in sorted(args.rows):
+            path = generate_csv(Path(tmp) / f"{rows}.csv", rows, types=args.types)
+            upload = SimpleUploadedFile(path.name, path.read_bytes(), content_type="text/csv")
+            upload_id = client.post("/api/equipment/", {"file": upload}).json()["upload_id"]
+            results[rows] = {
+                "csv_bytes": path.stat().st_size,
+                "all": time_distribution(client, upload_id, args.repeat),
+                "one_type": time_distribution(client, upload_id, args.repeat, {"type": "Pump"}),
+            }
+            r = results[rows]
+            print(f"{rows:>10}{r['csv_bytes']:>14}{r['all']['bytes']:>11}{r['all']['p50_ms']:>9.2f}"
+                  f"{r['one_type']['bytes']:>16}{r['one_type']['p50_ms']:>9.2f}")
+            path.unlink()
+        write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
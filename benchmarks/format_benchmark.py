@@ -0,0 +1,130 @@
+"""Bytes on the wire and server CPU per upload format.
+
+A synthetic CSV (see datagen.py) is encoded as each format the upload
+endpoint accepts. For every format the encoded size and the client's
+encoding time are reported, and a fresh process runs
+``aggregate_upload`` on the encoded file to measure the server's CPU time,
+wall time and peak RSS. Multipart parsing is left out: its cost depends
+only on the bytes received, which are reported separately.
+
+    python benchmarks/format_benchmark.py --rows 10000000 --output formats.json
+    python benchmarks/format_benchmark.py --formats csv gzip parquet --rows 1000000
+"""
+import argparse
+import gzip
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from common import BACKEND_DIR, peak_rss_mb, write_results
+from datagen import generate_csv
+
+FORMATS = ("csv", "gzip", "zstd", "parquet", "arrow", "arrow-stream")
+SUFFIXES = {
+    "csv": ".csv", "gzip": ".csv.gz", "zstd": ".csv.zst",
+    "parquet": ".parquet", "arrow": ".arrow", "arrow-stream": ".arrows",
+}
+COPY_BYTES = 1024 * 1024
+
+
+def _csv_batches(csv_path):
+    import pyarrow.csv as pa_csv
+
+    return pa_csv.open_csv(csv_path, read_options=pa_csv.ReadOptions(block_size=16 * 1024 * 1024))
+
+
+def encode(fmt, csv_path, out_path):
+    """Write ``csv_path`` to ``out_path`` as ``fmt``, streaming in batches."""
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+
+    if fmt == "csv":
+        shutil.copyfile(csv_path, out_path)
+    elif fmt == "gzip":
+        with open(csv_path, "rb") as src, gzip.open(out_path, "wb", compresslevel=6) as out:
+            shutil.copyfileobj(src, out, COPY_BYTES)
+    elif fmt == "zstd":
+        with open(csv_path, "rb") as src, pa.CompressedOutputStream(str(out_path), "zstd") as out:
+            shutil.copyfileobj(src, out, COPY_BYTES)
+    else:
+        reader = _csv_batches(csv_path)
+        if fmt == "parquet":
+            writer = pq.ParquetWriter(out_path, reader.schema, compression="zstd")
+        else:
+            # Record batch buffers are zstd-compressed; readers decompress them transparently
+            options = pa_ipc.IpcWriteOptions(compression="zstd")
+            open_writer = pa_ipc.new_file if fmt == "arrow" else pa_ipc.new_stream
+            writer = open_writer(str(out_path), reader.schema, options=options)
+        with writer:
+            for batch in reader:
+                writer.write_batch(batch)
+
+
+def run_format(path):
+    """Runs inside the child process."""
+    sys.path.insert(0, str(BACKEND_DIR))
+    from api.aggregation import aggregate_upload
+
+    cpu, wall = time.process_time(), time.perf_counter()
+    with open(path, "rb") as f:
+        rows = aggregate_upload(f)["total_equipment"]
+    print(json.dumps({
+        "rows": rows,
+        "cpu_s": time.process_time() - cpu,
+        "wall_s": time.perf_counter() - wall,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", help="existing CSV to encode (default: generate one)")
+    parser.add_argument("--rows", type=int, default=10_000_000, help="rows in the generated CSV")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--child", metavar="FILE", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_format(args.child)
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = args.csv
+        if not csv_path:
+            csv_path = Path(tmp) / "equipment.csv"
+            print(f"generating {args.rows} rows...")
+            generate_csv(csv_path, args.rows)
+        csv_bytes = Path(csv_path).stat().st_size
+        for fmt in args.formats:
+            out_path = Path(tmp) / f"upload{SUFFIXES[fmt]}"
+            start = time.perf_counter()
+            encode(fmt, csv_path, out_path)
+            encode_s = time.perf_counter() - start
+            out = subprocess.run([sys.executable, __file__, "--child", str(out_path)],
+                                 check=True, capture_output=True, text=True).stdout
+            wire = out_path.stat().st_size
+            results[fmt] = {
+                "bytes": wire,
+                "ratio": wire / csv_bytes,
+                "encode_s": encode_s,
+                **json.loads(out.strip().splitlines()[-1]),
+            }
+            out_path.unlink()
+
+    print(f"{'format':14}{'rows':>11}{'MB':>9}{'ratio':>7}{'encode s':>10}{'cpu s':>8}{'wall s':>8}{'peak MB':>9}")
+    for fmt in args.formats:
+        r = results[fmt]
+        print(f"{fmt:14}{r['rows']:>11}{r['bytes'] / 1e6:>9.1f}{r['ratio']:>7.2f}{r['encode_s']:>10.2f}"
+              f"{r['cpu_s']:>8.2f}{r['wall_s']:>8.2f}{r['peak_rss_mb']:>9.0f}")
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
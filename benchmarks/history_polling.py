@@ -0,0 +1,118 @@
+"""Polling load on api/history/: requests/sec with and without caching.
+
+N clients poll the history on keep-alive connections against a fresh
+gunicorn deployment per mode, while one client uploads a file every few
+seconds so the history keeps changing:
+
+  uncached     plain GETs with the page cache off: every request reads and
+               serializes the history, as before ETags and caching
+  cached       plain GETs served from the per-process page cache
+  conditional  GETs with If-None-Match, as browsers send when revalidating;
+               unchanged history is answered with 304 Not Modified
+
+    pip install gunicorn
+    python benchmarks/history_polling.py --clients 20 --duration 15 --output polling.json
+"""
+import argparse
+import http.client
+import threading
+import time
+
+from common import SAMPLE_CSV, latency_stats, multipart_body, running_server, write_results
+
+MODES = ("uncached", "cached", "conditional")
+
+
+def poll_loop(host, port, deadline, conditional, latencies, statuses):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    etag = None
+    while time.monotonic() < deadline:
+        headers = {"If-None-Match": etag} if conditional and etag else {}
+        start = time.perf_counter()
+        conn.request("GET", "/api/history/", headers=headers)
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        statuses.append(response.status)
+        etag = response.getheader("ETag") or etag
+    conn.close()
+
+
+def upload_loop(host, port, deadline, interval, body, content_type, stop):
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    while time.monotonic() < deadline and not stop.wait(interval):
+        conn.request("POST", "/api/equipment/", body, {"Content-Type": content_type})
+        conn.getresponse().read()
+    conn.close()
+
+
+def run_polling(base_url, clients, duration, upload_interval, seed_uploads, csv_bytes, conditional):
+    host, port = base_url.removeprefix("http://").split(":")
+    port = int(port)
+    body, content_type = multipart_body("bench.csv", csv_bytes)
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    for _ in range(seed_uploads):
+        conn.request("POST", "/api/equipment/", body, {"Content-Type": content_type})
+        conn.getresponse().read()
+    conn.close()
+
+    latencies, statuses = [], []
+    stop = threading.Event()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=poll_loop, args=(host, port, deadline, conditional, latencies, statuses))
+        for _ in range(clients)
+    ]
+    if upload_interval:
+        threads.append(threading.Thread(
+            target=upload_loop, args=(host, port, deadline, upload_interval, body, content_type, stop)))
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stop.set()
+    elapsed = time.monotonic() - started
+    return {
+        "requests": len(latencies),
+        "requests_per_sec": len(latencies) / elapsed,
+        "not_modified": statuses.count(304),
+        "errors": sum(1 for status in statuses if status >= 400),
+        **latency_stats(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per mode")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--upload-interval", type=float, default=2.0,
+                        help="seconds between uploads while polling (0: none)")
+    parser.add_argument("--seed-uploads", type=int, default=5, help="uploads before polling starts")
+    parser.add_argument("--csv", default=str(SAMPLE_CSV), help="file to upload")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--port", type=int, default=8820)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    with open(args.csv, "rb") as f:
+        csv_bytes = f.read()
+
+    results = {"clients": args.clients, "workers": args.workers, "upload_interval": args.upload_interval}
+    for offset, mode in enumerate(args.modes):
+        env = {"BENCH_HISTORY_CACHE": "0" if mode == "uncached" else "1"}
+        with running_server("wsgi", args.port + offset, args.workers, env) as base_url:
+            results[mode] = run_polling(base_url, args.clients, args.duration, args.upload_interval,
+                                        args.seed_uploads, csv_bytes, mode == "conditional")
+
+    print(f"{'':12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'304s':>8}{'errors':>8}")
+    for mode in args.modes:
+        r = results[mode]
+        print(f"{mode:12}{r['requests_per_sec']:10.1f}{r['p50_ms']:10.1f}{r['p99_ms']:10.1f}"
+              f"{r['not_modified']:8d}{r['errors']:8d}")
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Load test: WSGI (gunicorn, sync views) vs ASGI (uvicorn, async views).
+
+Drives a mix of CSV uploads and history reads from N concurrent clients and
+reports requests/sec and latency percentiles per deployment.
+
+    pip install gunicorn uvicorn
+    python benchmarks/load_asgi_wsgi.py --clients 50 --duration 20 --output load.json
+"""
+import argparse
+import http.client
+import random
+import threading
+import time
+
+from common import SAMPLE_CSV, latency_stats, multipart_body, running_server, write_results
+
+
+def client_loop(host, port, deadline, upload_ratio, body, content_type, latencies, errors, seed):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            if rng.random() < upload_ratio:
+                conn.request("POST", "/api/equipment/", body, {"Content-Type": content_type})
+            else:
+                conn.request("GET", "/api/history/")
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=60)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def run_load(base_url, clients, duration, upload_ratio, csv_bytes):
+    host, port = base_url.removeprefix("http://").split(":")
+    body, content_type = multipart_body("bench.csv", csv_bytes)
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=client_loop, args=(host, int(port), deadline, upload_ratio,
+                                                   body, content_type, latencies, errors, i))
+        for i in range(clients)
+    ]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_sec": len(latencies) / elapsed,
+        **latency_stats(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per deployment")
+    parser.add_argument("--workers", type=int, default=2, help="server processes for both deployments")
+    parser.add_argument("--upload-ratio", type=float, default=0.2, help="share of requests that are uploads")
+    parser.add_argument("--csv", default=str(SAMPLE_CSV), help="file to upload")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    with open(args.csv, "rb") as f:
+        csv_bytes = f.read()
+
+    results = {"clients": args.clients, "workers": args.workers, "upload_ratio": args.upload_ratio}
+    for offset, kind in enumerate(("wsgi", "asgi")):
+        with running_server(kind, args.port + offset, args.workers) as base_url:
+            results[kind] = run_load(base_url, args.clients, args.duration, args.upload_ratio, csv_bytes)
+
+    print(f"{'':6}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for kind in ("wsgi", "asgi"):
+        r = results[kind]
+        print(f"{kind:6}{r['requests_per_sec']:10.1f}{r['p50_ms']:10.1f}{r['p99_ms']:10.1f}{r['errors']:8d}")
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Wall time of a large CSV upload: serial pass vs 1..N pool processes.
+
+A synthetic CSV (see datagen.py) is summarized once by ``aggregate_upload``
+and then by ``aggregate_parallel`` with each worker count. Every run is
+repeated and the best time kept; the pool for a worker count is started
+before it is timed, as it is in a long-running server. Speedup and
+efficiency are relative to the serial pass, and each parallel summary is
+checked against the serial one (counts and types exactly, statistics to
+rounding; percentiles are sampled above ``summary.SAMPLE_SIZE`` rows and are
+not compared).
+
+Speedup is bounded by the cores available: on a single core the parallel
+runs only show the cost of splitting and merging.
+
+    python benchmarks/parallel_scaling.py --size-mb 2048 --max-workers 8 --output scaling.json
+"""
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from common import BACKEND_DIR, write_results
+from datagen import APPROX_ROW_BYTES, generate_csv
+
+COMPARED = ("count", "min", "max", "std")
+
+
+def best_of(repeat, run):
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def mismatches(serial, parallel):
+    """Keys where the parallel summary differs from the serial one."""
+    bad = []
+    for key in ("total_equipment", "type_distribution"):
+        if parallel[key] != serial[key]:
+            bad.append(key)
+    for key in ("average_flowrate", "average_pressure", "average_temperature"):
+        if not math.isclose(parallel[key], serial[key], rel_tol=1e-9):
+            bad.append(key)
+    for column, stats in serial["column_stats"].items():
+        for key in COMPARED:
+            if not math.isclose(parallel["column_stats"][column][key], stats[key], rel_tol=1e-9, abs_tol=1e-9):
+                bad.append(f"{column}.{key}")
+    return bad
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", help="existing CSV (default: generate one)")
+    parser.add_argument("--size-mb", type=int, default=1024, help="size of the generated CSV")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--min-range-mb", type=int, default=16, help="smallest range given to a process")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    from api.aggregation import CHUNK_ROWS, aggregate_upload
+    from api.parallel import aggregate_parallel, get_executor
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.csv
+        if not path:
+            path = Path(tmp) / "equipment.csv"
+            print(f"generating {args.size_mb} MB...")
+            generate_csv(path, args.size_mb * 1024 * 1024 // APPROX_ROW_BYTES)
+
+        def serial_run():
+            with open(path, "rb") as f:
+                return aggregate_upload(f)
+
+        serial_s, serial = best_of(args.repeat, serial_run)
+        results = {
+            "cpus": os.cpu_count(),
+            "bytes": Path(path).stat().st_size,
+            "rows": serial["total_equipment"],
+            "serial_s": serial_s,
+            "workers": {},
+        }
+        for workers in range(1, args.max_workers + 1):
+            get_executor(workers).submit(int).result()
+            seconds, summary = best_of(args.repeat, lambda: aggregate_parallel(
+                path, workers, CHUNK_ROWS, min_range_bytes=args.min_range_mb * 1024 * 1024))
+            results["workers"][workers] = {
+                "seconds": seconds,
+                "speedup": serial_s / seconds,
+                "efficiency": serial_s / seconds / workers,
+                "mismatches": mismatches(serial, summary),
+            }
+
+    print(f"{results['rows']} rows, {results['bytes'] / 1e6:.0f} MB, {results['cpus']} CPUs; "
+          f"serial {serial_s:.2f} s")
+    print(f"{'workers':>8}{'seconds':>10}{'speedup':>9}{'eff.':>7}  matches serial")
+    for workers, r in results["workers"].items():
+        print(f"{workers:>8}{r['seconds']:>10.2f}{r['speedup']:>9.2f}{r['efficiency']:>7.2f}  "
+              f"{'yes' if not r['mismatches'] else ', '.join(r['mismatches'])}")
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
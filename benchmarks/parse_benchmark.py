@@ -0,0 +1,77 @@
+"""Parse time and peak memory: the original pandas path vs the schema parser.
+
+Each variant runs in its own process so peak RSS is measured separately.
+
+    python benchmarks/parse_benchmark.py --size-mb 1024
+    python benchmarks/parse_benchmark.py --csv existing.csv --output parse.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from common import BACKEND_DIR, peak_rss_mb, write_results
+from datagen import APPROX_ROW_BYTES, generate_csv
+
+VARIANTS = ("legacy", "schema-c", "schema-pyarrow")
+
+
+def run_variant(variant, path):
+    """Runs inside the child process."""
+    sys.path.insert(0, str(BACKEND_DIR))
+    start = time.perf_counter()
+    if variant == "legacy":
+        # The original view: whole-file read with inferred dtypes
+        import pandas as pd
+
+        df = pd.read_csv(path)
+        df.columns = [col.strip().lower() for col in df.columns]
+        rows = len(df)
+        df["flowrate"].mean(), df["pressure"].mean(), df["temperature"].mean()
+        df["type"].value_counts().to_dict()
+    else:
+        from api.aggregation import aggregate_upload
+
+        with open(path, "rb") as f:
+            rows = aggregate_upload(f, engine=variant.removeprefix("schema-"))["total_equipment"]
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"rows": rows, "seconds": elapsed, "peak_rss_mb": peak_rss_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", help="existing CSV to parse (default: generate one)")
+    parser.add_argument("--size-mb", type=float, default=1024, help="size of the generated CSV")
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--child", nargs=2, metavar=("VARIANT", "CSV"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_variant(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.csv
+        if not path:
+            path = Path(tmp) / "equipment.csv"
+            print(f"generating {args.size_mb:.0f} MB sample...")
+            generate_csv(path, int(args.size_mb * 1024 * 1024 / APPROX_ROW_BYTES))
+        results = {"csv_bytes": Path(path).stat().st_size}
+        for variant in args.variants:
+            out = subprocess.run([sys.executable, __file__, "--child", variant, str(path)],
+                                 check=True, capture_output=True, text=True).stdout
+            results[variant] = json.loads(out.strip().splitlines()[-1])
+
+    print(f"{'variant':16}{'rows':>12}{'seconds':>10}{'peak MB':>10}")
+    for variant in args.variants:
+        r = results[variant]
+        print(f"{variant:16}{r['rows']:>12}{r['seconds']:>10.2f}{r['peak_rss_mb']:>10.0f}")
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
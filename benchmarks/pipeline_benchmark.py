@@ -0,0 +1,147 @@
+"""Throughput, peak memory and latency of the upload pipeline.
+
+For each row count a synthetic CSV is generated (see datagen.py) and every
+target runs in a fresh process, so peak RSS is measured per target:
+
+  backend  POST /api/equipment/ through Django's test client: upload
+           handlers, parsing, column store and history write (the test
+           client builds the request body in memory, which adds the file
+           size to the peak)
+  desktop  processing.summarize_csv, the work behind the desktop client's
+           process_csv, without a display
+
+Throughput uses the fastest run. Results are written with the commit they
+were measured at, so JSON files from different commits can be compared
+directly.
+
+    python benchmarks/pipeline_benchmark.py --rows 10000 1000000 10000000 --output pipeline.json
+    python benchmarks/pipeline_benchmark.py --rows 50000000 --types 40 --dirty 0.02 --repeat 1
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from common import DESKTOP_DIR, REPO_ROOT, latency_stats, peak_rss_mb, write_results
+from datagen import TYPES, generate_csv
+
+TARGETS = ("backend", "desktop")
+
+
+def run_backend(path, repeat):
+    from common import django_in_process
+
+    with django_in_process():
+        from django.test import Client
+
+        from api.cache import get_summary_cache
+
+        client = Client()
+        latencies = []
+        for _ in range(repeat):
+            # Every request must parse, not hit the summary cache
+            get_summary_cache().clear()
+            with open(path, "rb") as f:
+                start = time.perf_counter()
+                response = client.post("/api/equipment/", {"file": f})
+                latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.content
+            assert response["X-Summary-Cache"] == "miss"
+            rows = response.json()["total_equipment"]
+    return rows, latencies
+
+
+def run_desktop(path, repeat):
+    sys.path.insert(0, str(DESKTOP_DIR))
+    from processing import summarize_csv
+
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = summarize_csv(path)["total_equipment"]
+        latencies.append(time.perf_counter() - start)
+    return rows, latencies
+
+
+def run_target(target, path, repeat):
+    """Runs inside the child process."""
+    rows, latencies = {"backend": run_backend, "desktop": run_desktop}[target](path, repeat)
+    best = min(latencies)
+    print(json.dumps({
+        "rows": rows,
+        "rows_per_s": rows / best if best else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "latency": latency_stats(latencies),
+    }))
+
+
+def environment():
+    commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT,
+                            capture_output=True, text=True).stdout.strip()
+    try:
+        from api.parsing import DEFAULT_ENGINE
+    except ImportError:
+        DEFAULT_ENGINE = None
+    return {
+        "commit": commit or None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parser_engine": DEFAULT_ENGINE,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--types", type=int, default=len(TYPES), help="number of distinct equipment types")
+    parser.add_argument("--dirty", type=float, default=0.0, help="fraction of rows with a defect")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per target and size")
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--data-dir", help="keep generated CSVs here and reuse them (default: temporary)")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--child", nargs=3, metavar=("TARGET", "CSV", "REPEAT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        target, path, repeat = args.child
+        run_target(target, path, int(repeat))
+        return
+
+    sys.path.insert(0, str(REPO_ROOT / "backend"))
+    results = {
+        "environment": environment(),
+        "data": {"types": args.types, "dirty": args.dirty, "seed": args.seed},
+        "runs": [],
+    }
+    print(f"{'target':10}{'rows':>12}{'rows/s':>14}{'p50 ms':>12}{'p99 ms':>12}{'peak MB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(args.data_dir or tmp)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        for rows in sorted(args.rows):
+            path = data_dir / f"equipment-{rows}-t{args.types}-d{args.dirty}-s{args.seed}.csv"
+            if not path.exists():
+                generate_csv(path, rows, args.seed, args.types, args.dirty)
+            for target in args.targets:
+                out = subprocess.run(
+                    [sys.executable, __file__, "--child", target, str(path), str(args.repeat)],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                run = {"target": target, "csv_bytes": path.stat().st_size,
+                       **json.loads(out.strip().splitlines()[-1])}
+                results["runs"].append(run)
+                print(f"{target:10}{run['rows']:>12}{run['rows_per_s']:>14,.0f}"
+                      f"{run['latency']['p50_ms']:>12.1f}{run['latency']['p99_ms']:>12.1f}"
+                      f"{run['peak_rss_mb']:>10.0f}")
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
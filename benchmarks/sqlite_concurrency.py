@@ -0,0 +1,96 @@
+"""Concurrent uploads against SQLite: lock errors and throughput.
+
+N clients upload the sample file as fast as they can for a fixed time, on
+keep-alive connections, against a fresh gunicorn deployment per mode:
+
+  stock  Django's SQLite defaults: rollback journal, synchronous=FULL, a
+         5 s lock timeout and a new connection per request
+  tuned  the project settings: WAL, synchronous=NORMAL, a 20 s lock
+         timeout and persistent connections (see api/sqlite.py)
+
+Every answer other than 200 counts as an error; "database is locked" ones
+are counted separately.
+
+    pip install gunicorn
+    python benchmarks/sqlite_concurrency.py --clients 20 --duration 15 --output sqlite.json
+"""
+import argparse
+import http.client
+import threading
+import time
+
+from common import SAMPLE_CSV, latency_stats, multipart_body, running_server, write_results
+
+MODES = ("stock", "tuned")
+
+
+def upload_loop(host, port, deadline, body, content_type, latencies, outcomes):
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        conn.request("POST", "/api/equipment/", body, {"Content-Type": content_type})
+        response = conn.getresponse()
+        payload = response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status == 200:
+            outcomes.append("ok")
+        else:
+            outcomes.append("locked" if b"database is locked" in payload else "error")
+    conn.close()
+
+
+def run_uploads(base_url, clients, duration, csv_bytes):
+    host, port = base_url.removeprefix("http://").split(":")
+    body, content_type = multipart_body("bench.csv", csv_bytes)
+    latencies, outcomes = [], []
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=upload_loop,
+                         args=(host, int(port), deadline, body, content_type, latencies, outcomes))
+        for _ in range(clients)
+    ]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+    return {
+        "uploads": outcomes.count("ok"),
+        "uploads_per_sec": outcomes.count("ok") / elapsed,
+        "lock_errors": outcomes.count("locked"),
+        "other_errors": outcomes.count("error"),
+        **latency_stats(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per mode")
+    parser.add_argument("--workers", type=int, default=8, help="gunicorn worker processes")
+    parser.add_argument("--csv", default=str(SAMPLE_CSV), help="file to upload")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--port", type=int, default=8840)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    with open(args.csv, "rb") as f:
+        csv_bytes = f.read()
+
+    results = {"clients": args.clients, "workers": args.workers}
+    for offset, mode in enumerate(args.modes):
+        env = {"BENCH_SQLITE_TUNING": "1" if mode == "tuned" else "0"}
+        with running_server("wsgi", args.port + offset, args.workers, env) as base_url:
+            results[mode] = run_uploads(base_url, args.clients, args.duration, csv_bytes)
+
+    print(f"{'':8}{'uploads/s':>11}{'p50 ms':>10}{'p99 ms':>10}{'locked':>8}{'errors':>8}")
+    for mode in args.modes:
+        r = results[mode]
+        print(f"{mode:8}{r['uploads_per_sec']:11.1f}{r['p50_ms']:10.1f}{r['p99_ms']:10.1f}"
+              f"{r['lock_errors']:8d}{r['other_errors']:8d}")
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Cost of row validation on a clean file, and of a file with text in numeric cells.
+
+Each variant runs in its own process on a generated CSV:
+
+  baseline        the clean file parsed by the backend of --baseline REF
+                  (e.g. a commit before validation), exported with git archive
+  validated       the clean file, checked against the default ranges
+  validated-text  a copy where --text-ratio of the rows hold a non-numeric
+                  cell, so the file is re-read as text from the first one
+
+The time spent in the ``validate`` stage is reported too.
+
+    python benchmarks/validation_benchmark.py --rows 10000000 --baseline <commit> --output validation.json
+"""
+import argparse
+import io
+import json
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from common import BACKEND_DIR, REPO_ROOT, peak_rss_mb, write_results
+from datagen import generate_csv
+
+VARIANTS = ("baseline", "validated", "validated-text")
+
+
+def write_text_defects(source, target, ratio, seed=0):
+    """Copy ``source`` with the flowrate of about ``ratio`` of the rows replaced by text."""
+    rng = np.random.default_rng(seed)
+    next_hit = rng.geometric(ratio) if ratio else -1
+    with open(source, "rb") as src, open(target, "wb") as out:
+        out.write(src.readline())
+        for row, line in enumerate(src, 1):
+            if row == next_hit:
+                name, kind, _, rest = line.split(b",", 3)
+                line = b",".join([name, kind, b"unknown", rest])
+                next_hit += rng.geometric(ratio)
+            out.write(line)
+
+
+def export_backend(ref, target):
+    """Extract ``backend/`` as of git ``ref`` under ``target``; returns its path."""
+    archive = subprocess.run(["git", "archive", ref, "backend"], cwd=REPO_ROOT,
+                             check=True, capture_output=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(target, filter="data")
+    return Path(target) / "backend"
+
+
+def run_variant(backend_dir, path, engine):
+    """Runs inside the child process."""
+    sys.path.insert(0, backend_dir)
+    from api.aggregation import aggregate_upload
+    from api.metrics import finish_request, start_request
+
+    metrics, token = start_request()
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        summary = aggregate_upload(f, engine=engine)
+    elapsed = time.perf_counter() - start
+    finish_request(token)
+    print(json.dumps({
+        "rows": summary["total_equipment"],
+        "quarantined": summary.get("quarantine", {}).get("rows", 0),
+        "seconds": elapsed,
+        "validate_seconds": metrics.stages.get("validate", 0.0),
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--text-ratio", type=float, default=0.001, help="rows with a non-numeric cell")
+    parser.add_argument("--engine", choices=("pyarrow", "c"), default=None, help="CSV parser (default: best available)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per variant; the fastest is kept")
+    parser.add_argument("--baseline", metavar="REF", help="git ref to compare against (runs the baseline variant)")
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--child", nargs=3, metavar=("BACKEND", "CSV", "ENGINE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        backend_dir, path, engine = args.child
+        run_variant(backend_dir, path, None if engine == "auto" else engine)
+        return
+    variants = [v for v in args.variants if v != "baseline" or args.baseline]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clean = Path(tmp) / "clean.csv"
+        print(f"generating {args.rows:,} rows...")
+        generate_csv(clean, args.rows)
+        paths = {"baseline": clean, "validated": clean}
+        backends = {"validated": BACKEND_DIR, "validated-text": BACKEND_DIR}
+        if "baseline" in variants:
+            backends["baseline"] = export_backend(args.baseline, Path(tmp) / "baseline")
+        if "validated-text" in variants:
+            paths["validated-text"] = Path(tmp) / "text.csv"
+            write_text_defects(clean, paths["validated-text"], args.text_ratio)
+        results = {"rows": args.rows, "text_ratio": args.text_ratio, "engine": args.engine or "auto",
+                   "baseline_ref": args.baseline}
+        for variant in variants:
+            command = [sys.executable, __file__, "--child", str(backends[variant]), str(paths[variant]),
+                       args.engine or "auto"]
+            runs = [
+                json.loads(subprocess.run(command, check=True, capture_output=True, text=True)
+                           .stdout.strip().splitlines()[-1])
+                for _ in range(args.repeat)
+            ]
+            results[variant] = min(runs, key=lambda r: r["seconds"])
+
+    baseline = results.get("baseline", {}).get("seconds")
+    print(f"{'variant':16}{'rows':>12}{'quarantined':>13}{'seconds':>10}{'validate':>10}{'overhead':>10}{'peak MB':>10}")
+    for variant in variants:
+        r = results[variant]
+        if baseline:
+            r["overhead"] = r["seconds"] / baseline - 1
+        overhead = f"{r['overhead']:+.1%}" if baseline else ""
+        print(f"{variant:16}{r['rows']:>12}{r['quarantined']:>13}{r['seconds']:>10.2f}"
+              f"{r['validate_seconds']:>10.2f}{overhead:>10}{r['peak_rss_mb']:>10.0f}")
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
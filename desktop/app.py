@@ -1,26 +1,21 @@
-import sys, os, json
-import pandas as pd
+import sys, os, shutil, tempfile
 from datetime import datetime
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
-    QTableWidget, QTableWidgetItem, QFileDialog, QScrollArea, QFrame, QSizePolicy
+    QTableView, QHeaderView, QFileDialog, QScrollArea, QFrame, QSizePolicy,
+    QProgressBar, QComboBox, QCheckBox
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThreadPool, QTimer
 from PyQt5.QtGui import QFont
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-from fpdf import FPDF
-
-HISTORY_FILE = "history.json"
+from workers import SummaryWorker
+from tablemodels import (
+    HISTORY_COLUMNS, SUMMARY_COLUMNS, EquipmentRowsModel, RecordTableModel, summary_records
+)
+from history import HISTORY_LIMIT, HistoryStore
 
-# Load history
-if os.path.exists(HISTORY_FILE):
-    with open(HISTORY_FILE, "r") as f:
-        history = json.load(f)
-        for item in history:
-            item["upload_time"] = datetime.fromisoformat(item["upload_time"])
-else:
-    history = []
+# pandas, Matplotlib and fpdf are imported on first use (first CSV, first
+# chart, first export) so the window appears quickly; see
+# benchmarks/desktop_startup.py
 
 class App(QWidget):
     def __init__(self):
@@ -30,6 +25,16 @@ class App(QWidget):
         self.height = 900
         self.csv_file = None
         self.summary = None
+        self.worker = None
+        self.pool = QThreadPool.globalInstance()
+        # Parsed rows of the current file, memory-mapped for the rows table
+        self.rows_root = None
+        self.rows_name = ""
+        # Opened on first use
+        self.history = HistoryStore()
+        # Pooled API client, created when remote processing is first used
+        self.remote = None
+        self.fallback_reason = None
         self._build_ui()
 
     def _build_ui(self):
@@ -77,11 +82,29 @@ class App(QWidget):
         self.btn_upload.setFixedHeight(36)
         self.btn_upload.setStyleSheet("background-color:#007bff; color:white; border-radius:6px;")
 
+        self.btn_cancel = QPushButton("Cancel")
+        self.btn_cancel.clicked.connect(self.cancel_processing)
+        self.btn_cancel.setFixedHeight(36)
+        self.btn_cancel.setEnabled(False)
+
+        # Process on the Django API (EQUIPMENT_API_URL), locally if it is down
+        self.chk_remote = QCheckBox("Process on server")
+        self.chk_remote.setChecked(bool(os.environ.get("EQUIPMENT_API_URL")))
+
         file_row.addWidget(self.btn_select)
         file_row.addWidget(self.lbl_file)
+        file_row.addWidget(self.chk_remote)
         file_row.addWidget(self.btn_upload)
+        file_row.addWidget(self.btn_cancel)
         self.layout.addLayout(file_row)
 
+        # Progress of the file being processed
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setFixedHeight(18)
+        self.progress_bar.setVisible(False)
+        self.layout.addWidget(self.progress_bar)
+
         # Message
         self.lbl_message = QLabel("")
         self.lbl_message.setStyleSheet("color: green;")
@@ -101,38 +124,49 @@ class App(QWidget):
         summary_layout.addWidget(title)
 
         # Summary table
-        self.table_summary = QTableWidget(4,2)
-        self.table_summary.setMinimumHeight(260)
-        self.table_summary.setHorizontalHeaderLabels(["Metric","Value"])
+        self.summary_model = RecordTableModel(SUMMARY_COLUMNS)
+        self.table_summary = QTableView()
+        self.table_summary.setModel(self.summary_model)
         self.table_summary.verticalHeader().setVisible(False)
         self.table_summary.horizontalHeader().setStretchLastSection(True)
         self.table_summary.setFixedHeight(140)
         self.table_summary.setColumnWidth(0,300)
         summary_layout.addWidget(self.table_summary)
 
-        # Charts area: bar on top, pie below
-        charts_frame = QFrame()
-        charts_frame.setStyleSheet("background: #fafafa; border-radius: 10px; padding: 14px;")
-        charts_layout = QVBoxLayout()
-        charts_layout.setSpacing(18)
-        charts_frame.setLayout(charts_layout)
-        self.layout.addWidget(charts_frame)
-
-        # Bar chart
-        self.bar_fig = Figure(figsize=(6,3), tight_layout=True)
-        self.bar_canvas = FigureCanvas(self.bar_fig)
-        self.bar_ax = self.bar_fig.add_subplot(111)
-        self.bar_canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-        self.bar_canvas.setFixedHeight(320)
-        charts_layout.addWidget(self.bar_canvas)
-
-        # Pie chart (below bar)
-        self.pie_fig = Figure(figsize=(6,3), tight_layout=True)
-        self.pie_canvas = FigureCanvas(self.pie_fig)
-        self.pie_ax = self.pie_fig.add_subplot(111)
-        self.pie_canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-        self.pie_canvas.setFixedHeight(300)
-        charts_layout.addWidget(self.pie_canvas)
+        # Charts area: bar on top, pie below; the figures are created by
+        # _build_charts when there is a first summary to show
+        self.charts_frame = QFrame()
+        self.charts_frame.setStyleSheet("background: #fafafa; border-radius: 10px; padding: 14px;")
+        self.charts_layout = QVBoxLayout()
+        self.charts_layout.setSpacing(18)
+        self.charts_frame.setLayout(self.charts_layout)
+        self.charts_frame.setVisible(False)
+        self.layout.addWidget(self.charts_frame)
+        self.bar_chart = self.pie_chart = None
+
+        # Equipment rows: every parsed row, filtered by type and sortable
+        rows_header = QHBoxLayout()
+        rows_label = QLabel("Equipment Rows")
+        rows_label.setStyleSheet("font-size:16px; font-weight:600; color:#343a40;")
+        self.type_filter = QComboBox()
+        self.type_filter.addItem("All types")
+        self.type_filter.currentIndexChanged.connect(self.filter_rows)
+        rows_header.addWidget(rows_label)
+        rows_header.addStretch()
+        rows_header.addWidget(self.type_filter)
+        self.layout.addLayout(rows_header)
+
+        self.rows_model = EquipmentRowsModel()
+        self.table_rows = QTableView()
+        self.table_rows.setModel(self.rows_model)
+        self.table_rows.setSortingEnabled(True)
+        self.table_rows.sortByColumn(-1, Qt.AscendingOrder)
+        # Fixed row heights so the view never measures rows it does not show
+        self.table_rows.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table_rows.verticalHeader().setDefaultSectionSize(22)
+        self.table_rows.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table_rows.setMinimumHeight(320)
+        self.layout.addWidget(self.table_rows)
 
         # Controls row
         controls_row = QHBoxLayout()
@@ -152,14 +186,17 @@ class App(QWidget):
         self.layout.addLayout(controls_row)
 
         # History
-        history_label = QLabel("Last 5 Uploads")
+        history_label = QLabel(f"Last {HISTORY_LIMIT} Uploads")
         history_label.setStyleSheet("font-size:16px; font-weight:600; color:#343a40;")
         self.layout.addWidget(history_label)
 
-        self.table_history = QTableWidget(0,6)
+        self.history_model = RecordTableModel(HISTORY_COLUMNS)
+        self.table_history = QTableView()
+        self.table_history.setModel(self.history_model)
+        self.table_history.setSortingEnabled(True)
+        self.table_history.sortByColumn(-1, Qt.AscendingOrder)
         self.table_history.setMinimumHeight(260)
-        self.table_history.setHorizontalHeaderLabels(["Filename","Upload Time","Total","Flowrate","Pressure","Temperature"])
-        self.table_history.horizontalHeader().setStretchLastSection(True)
+        self.table_history.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.table_history.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.layout.addWidget(self.table_history)
 
@@ -167,11 +204,8 @@ class App(QWidget):
         scroll.setWidget(container)
         outer_layout.addWidget(scroll)
 
-        # initial history load
-        try:
-            self.update_history_table()
-        except Exception:
-            pass
+        # initial history load, once the window is up
+        QTimer.singleShot(0, self.update_history_table)
 
     def select_csv(self):
         path, _ = QFileDialog.getOpenFileName(self, "Select CSV file", "", "CSV files (*.csv)")
@@ -183,90 +217,148 @@ class App(QWidget):
         if not hasattr(self, "csv_file") or not self.csv_file:
             self.lbl_message.setText("Please select a CSV file first!")
             return
-        df = pd.read_csv(self.csv_file)
-        if df.empty:
-            self.lbl_message.setText("CSV is empty!")
+        if self.worker is not None:
+            return
+        # Parse on a pool thread; the handlers below run on the GUI thread
+        if self.rows_root is None:
+            self.rows_root = tempfile.mkdtemp(prefix="equipment-rows-")
+        self.fallback_reason = None
+        self.worker = SummaryWorker(self.csv_file, self.rows_root, self._remote_processor())
+        self.worker.signals.progress.connect(self.progress_bar.setValue)
+        self.worker.signals.finished.connect(self.show_summary)
+        self.worker.signals.failed.connect(self.processing_failed)
+        self.worker.signals.cancelled.connect(self.processing_cancelled)
+        self.worker.signals.fell_back.connect(self.processing_fell_back)
+        self._set_processing(True)
+        self.lbl_message.setText(f"Processing {os.path.basename(self.csv_file)}...")
+        self.pool.start(self.worker)
+
+    def _remote_processor(self):
+        if not self.chk_remote.isChecked():
+            return None
+        if self.remote is None:
+            from remote import RemoteProcessor
+
+            self.remote = RemoteProcessor()
+        return self.remote
+
+    def processing_fell_back(self, reason):
+        self.fallback_reason = reason
+        self.lbl_message.setText("Server unavailable, processing locally...")
+
+    def cancel_processing(self):
+        if self.worker is not None:
+            self.btn_cancel.setEnabled(False)
+            self.worker.cancel()
+
+    def _set_processing(self, running):
+        self.btn_upload.setEnabled(not running)
+        self.btn_select.setEnabled(not running)
+        self.btn_cancel.setEnabled(running)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(running)
+
+    def _finish_processing(self):
+        self.worker = None
+        self._set_processing(False)
+
+    def processing_failed(self, error):
+        self._finish_processing()
+        self.lbl_message.setText(f"Could not process CSV: {error}")
+
+    def processing_cancelled(self):
+        self._finish_processing()
+        self.lbl_message.setText("Processing cancelled.")
+
+    def show_summary(self, summary, rows_name):
+        from processing import describe_quarantine
+
+        self._finish_processing()
+        self.show_rows(rows_name)
+        # Rows with values that are not numbers or out of range were left out
+        quarantined, details = describe_quarantine(summary.get("quarantine"))
+        self.lbl_message.setToolTip(details)
+        if not summary["total_equipment"]:
+            self.lbl_message.setText(f"No valid rows: {quarantined}" if quarantined else "CSV is empty!")
             return
 
-        self.summary = {
-            "total_equipment": len(df),
-            "average_flowrate": df["Flowrate"].mean(),
-            "average_pressure": df["Pressure"].mean(),
-            "average_temperature": df["Temperature"].mean(),
-            "type_distribution": df["Type"].value_counts().to_dict()
-        }
-
-        # populate summary table
-        rows = [
-            ("Total Equipment", str(self.summary["total_equipment"])),
-            ("Avg Flowrate", f"{self.summary['average_flowrate']:.2f}"),
-            ("Avg Pressure", f"{self.summary['average_pressure']:.2f}"),
-            ("Avg Temperature", f"{self.summary['average_temperature']:.2f}")
-        ]
-        self.table_summary.setRowCount(len(rows))
-        for r,(k,v) in enumerate(rows):
-            item_k = QTableWidgetItem(k)
-            item_k.setFlags(Qt.ItemIsEnabled)
-            item_v = QTableWidgetItem(v)
-            item_v.setFlags(Qt.ItemIsEnabled)
-            item_v.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.table_summary.setItem(r,0,item_k)
-            self.table_summary.setItem(r,1,item_v)
+        self.summary = summary
+        self.summary_model.set_records(summary_records(self.summary))
 
         # update charts
         self.update_charts()
 
-        # update history file
-        global history
-        history.insert(0, {"filename": os.path.basename(self.csv_file), "upload_time": datetime.now(), **self.summary})
-        history = history[:5]
-        with open(HISTORY_FILE, "w") as f:
-            json.dump([{**h, "upload_time": h["upload_time"].isoformat()} for h in history], f, indent=2)
+        # record the upload
+        self.history.append(os.path.basename(self.csv_file), datetime.now(), self.summary)
 
         self.update_history_table()
-        self.lbl_message.setText("File uploaded successfully!")
+        if self.fallback_reason:
+            message = "Server unavailable; file processed locally."
+        else:
+            message = "File uploaded successfully!"
+        self.lbl_message.setText(f"{message} {quarantined}".strip())
+
+    def _build_charts(self):
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+        from charts import BarChart, PieChart
+
+        # Bar chart (layout is recomputed by the chart only when the types change)
+        self.bar_fig = Figure(figsize=(6,3))
+        self.bar_canvas = FigureCanvas(self.bar_fig)
+        self.bar_chart = BarChart(self.bar_fig)
+        self.bar_canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.bar_canvas.setFixedHeight(320)
+        self.charts_layout.addWidget(self.bar_canvas)
+
+        # Pie chart (below bar)
+        self.pie_fig = Figure(figsize=(6,3))
+        self.pie_canvas = FigureCanvas(self.pie_fig)
+        self.pie_chart = PieChart(self.pie_fig)
+        self.pie_canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.pie_canvas.setFixedHeight(300)
+        self.charts_layout.addWidget(self.pie_canvas)
+        self.charts_frame.setVisible(True)
 
     def update_charts(self):
-        if not self.summary:
-            self.bar_ax.clear(); self.pie_ax.clear(); self.bar_canvas.draw(); self.pie_canvas.draw(); return
-        dist = self.summary.get("type_distribution", {})
-        items = list(dist.items())
+        items = list((self.summary or {}).get("type_distribution", {}).items())
+        if self.bar_chart is None:
+            if not items:
+                return
+            self._build_charts()
         if not items:
-            self.bar_ax.clear(); self.pie_ax.clear(); self.bar_canvas.draw(); self.pie_canvas.draw(); return
-        labels, counts = zip(*items)
-        colors = ["#007bff","#6610f2","#ff8a8a","#20c998","#ffc107","#dc3545"]
-
-        # Bar
-        self.bar_ax.clear()
-        self.bar_ax.bar(labels, counts, color=colors[:len(labels)], edgecolor='white', width=0.45)
-        self.bar_ax.margins(x=0.15)
-        self.bar_ax.set_title("Equipment Type Distribution (Bar)")
-        self.bar_ax.tick_params(axis='x', rotation=25)
-        self.bar_fig.tight_layout()
-        self.bar_canvas.draw()
-
-        # Pie
-        self.pie_ax.clear()
-        wedges, texts, autotexts = self.pie_ax.pie(counts, labels=labels, autopct="%1.1f%%", colors=colors[:len(labels)])
-        self.pie_ax.axis('equal')
-        self.pie_ax.set_title("Equipment Type Distribution (Pie)")
-        self.pie_fig.tight_layout()
-        self.pie_canvas.draw()
+            self.bar_chart.clear(); self.pie_chart.clear()
+        else:
+            # Same types as last time: bars and wedges are updated in place
+            labels, counts = zip(*items)
+            self.bar_chart.update(labels, counts)
+            self.pie_chart.update(labels, counts)
+        # Coalesced into one repaint per canvas by the Qt event loop
+        self.bar_canvas.draw_idle()
+        self.pie_canvas.draw_idle()
+
+    def show_rows(self, rows_name):
+        # Already imported by the worker that wrote the rows
+        from api.columnar import UploadColumns
+
+        previous, self.rows_name = self.rows_name, rows_name
+        self.rows_model.set_rows(UploadColumns(os.path.join(self.rows_root, rows_name)) if rows_name else None)
+        self.type_filter.blockSignals(True)
+        self.type_filter.clear()
+        self.type_filter.addItem("All types")
+        self.type_filter.addItems(sorted(self.rows_model.types()))
+        self.type_filter.blockSignals(False)
+        if previous and previous != rows_name:
+            shutil.rmtree(os.path.join(self.rows_root, previous), ignore_errors=True)
+
+    def filter_rows(self, index):
+        self.rows_model.set_type_filter(self.type_filter.currentText() if index > 0 else None)
 
     def update_history_table(self):
-        h = history or []
-        self.table_history.setRowCount(len(h))
-        for r,item in enumerate(h):
-            self.table_history.setItem(r,0,QTableWidgetItem(item.get('filename','')))
-            ut = item.get('upload_time')
-            ut_str = ut.strftime('%d/%m/%Y %H:%M:%S') if hasattr(ut, 'strftime') else str(ut)
-            self.table_history.setItem(r,1,QTableWidgetItem(ut_str))
-            self.table_history.setItem(r,2,QTableWidgetItem(str(item.get('total_equipment',''))))
-            self.table_history.setItem(r,3,QTableWidgetItem(f"{item.get('average_flowrate',0):.2f}"))
-            self.table_history.setItem(r,4,QTableWidgetItem(f"{item.get('average_pressure',0):.2f}"))
-            self.table_history.setItem(r,5,QTableWidgetItem(f"{item.get('average_temperature',0):.2f}"))
-        self.table_history.resizeColumnsToContents()
-        self.table_history.horizontalHeader().setStretchLastSection(True)
+        try:
+            self.history_model.set_records(self.history.recent())
+        except Exception as e:
+            self.lbl_message.setText(f"Could not load history: {e}")
 
     def export_pdf(self):
         if not self.summary:
@@ -275,29 +367,29 @@ class App(QWidget):
         pdf_file, _ = QFileDialog.getSaveFileName(self, 'Save PDF', 'equipment_report.pdf', 'PDF Files (*.pdf)')
         if not pdf_file:
             return
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font('Arial','B',16)
-        pdf.cell(0,10,'Chemical Equipment Report',ln=True,align='C')
-        pdf.ln(8)
-        pdf.set_font('Arial','',12)
-        for k,v in [('Total Equipment', self.summary['total_equipment']), ('Avg Flowrate', f"{self.summary['average_flowrate']:.2f}"), ('Avg Pressure', f"{self.summary['average_pressure']:.2f}"), ('Avg Temperature', f"{self.summary['average_temperature']:.2f}")]:
-            pdf.cell(0,8,f"{k}: {v}",ln=True)
-        # Save charts to temp files and add
-        bar_tmp = 'bar_tmp.png'
-        pie_tmp = 'pie_tmp.png'
-        self.bar_fig.savefig(bar_tmp, bbox_inches='tight')
-        self.pie_fig.savefig(pie_tmp, bbox_inches='tight')
-        pdf.image(bar_tmp, x=10, w=pdf.w-20)
-        pdf.ln(4)
-        pdf.image(pie_tmp, x=10, w=pdf.w-20)
+        from report import write_report
+
         try:
-            os.remove(bar_tmp); os.remove(pie_tmp)
-        except Exception:
-            pass
-        pdf.output(pdf_file)
+            figures = [self.bar_fig, self.pie_fig] if self.bar_chart is not None else []
+            write_report(pdf_file, self.summary, figures)
+        except OSError as e:
+            self.lbl_message.setText(f'Could not export PDF: {e}')
+            return
         self.lbl_message.setText(f'PDF exported: {pdf_file}')
 
+    def closeEvent(self, event):
+        # Don't keep parsing a large file after the window is gone
+        if self.worker is not None:
+            self.worker.cancel()
+            self.pool.waitForDone()
+        self.rows_model.set_rows(None)
+        self.history.close()
+        if self.remote is not None:
+            self.remote.close()
+        if self.rows_root is not None:
+            shutil.rmtree(self.rows_root, ignore_errors=True)
+        super().closeEvent(event)
+
 if __name__=='__main__':
     app = QApplication(sys.argv)
     ex = App()
@@ -0,0 +1,107 @@
+"""Type-distribution charts that update their artists in place.
+
+Rebuilding the axes (``ax.clear()``, new bars and wedges, ``tight_layout``)
+costs far more than the final draw. When a new summary has the same
+equipment types as the last one, the bar heights and wedge angles are
+changed on the existing artists and the layout is kept. The axes are only
+rebuilt when the set of types changes, and the layout recomputed then or
+when the bar chart's tick labels change width.
+
+Only Matplotlib is needed, so the charts can be driven headlessly on an
+Agg canvas (see benchmarks/chart_redraw.py).
+"""
+import math
+
+COLORS = ["#007bff", "#6610f2", "#ff8a8a", "#20c998", "#ffc107", "#dc3545"]
+
+# Match the defaults of Axes.pie
+LABEL_DISTANCE = 1.1
+PCT_DISTANCE = 0.6
+PCT_FORMAT = "%1.1f%%"
+
+
+def _colors(count):
+    return [COLORS[i % len(COLORS)] for i in range(count)]
+
+
+class BarChart:
+    def __init__(self, figure, title="Equipment Type Distribution (Bar)"):
+        self.figure = figure
+        self.ax = figure.add_subplot(111)
+        self.title = title
+        self.labels = None
+        self.bars = []
+        self._tick_digits = None
+
+    def clear(self):
+        self.ax.clear()
+        self.labels = None
+        self.bars = []
+        self._tick_digits = None
+
+    def update(self, labels, counts):
+        """Show ``counts`` per label; returns True if the axes were rebuilt."""
+        labels = list(labels)
+        if labels != self.labels:
+            self.ax.clear()
+            self.bars = list(self.ax.bar(labels, counts, color=_colors(len(labels)), edgecolor="white", width=0.45))
+            self.ax.margins(x=0.15)
+            self.ax.set_title(self.title)
+            self.ax.tick_params(axis="x", rotation=25)
+            self.labels = labels
+            self._tick_digits = len(str(max(counts)))
+            self.figure.tight_layout()
+            return True
+        for bar, count in zip(self.bars, counts):
+            bar.set_height(count)
+        # Same headroom as autoscaling
+        self.ax.set_ylim(0, max(counts) * 1.05 if max(counts) > 0 else 1)
+        if len(str(max(counts))) != self._tick_digits:
+            # Y tick labels changed width; make room for them
+            self._tick_digits = len(str(max(counts)))
+            self.figure.tight_layout()
+        return False
+
+
+class PieChart:
+    def __init__(self, figure, title="Equipment Type Distribution (Pie)"):
+        self.figure = figure
+        self.ax = figure.add_subplot(111)
+        self.title = title
+        self.labels = None
+        self.wedges = []
+        self.texts = []
+        self.autotexts = []
+
+    def clear(self):
+        self.ax.clear()
+        self.labels = None
+        self.wedges, self.texts, self.autotexts = [], [], []
+
+    def update(self, labels, counts):
+        """Show ``counts`` per label; returns True if the axes were rebuilt."""
+        labels = list(labels)
+        if labels != self.labels:
+            self.ax.clear()
+            self.wedges, self.texts, self.autotexts = self.ax.pie(
+                counts, labels=labels, autopct=PCT_FORMAT, colors=_colors(len(labels))
+            )
+            self.ax.axis("equal")
+            self.ax.set_title(self.title)
+            self.labels = labels
+            self.figure.tight_layout()
+            return True
+        total = float(sum(counts))
+        start = 0.0
+        for wedge, text, autotext, count in zip(self.wedges, self.texts, self.autotexts, counts):
+            frac = count / total if total else 0.0
+            wedge.set_theta1(360 * start)
+            wedge.set_theta2(360 * (start + frac))
+            middle = 2 * math.pi * (start + frac / 2)
+            x, y = math.cos(middle), math.sin(middle)
+            text.set_position((LABEL_DISTANCE * x, LABEL_DISTANCE * y))
+            text.set_horizontalalignment("left" if x > 0 else "right")
+            autotext.set_position((PCT_DISTANCE * x, PCT_DISTANCE * y))
+            autotext.set_text(PCT_FORMAT % (100 * frac))
+            start += frac
+        return False
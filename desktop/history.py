@@ -0,0 +1,123 @@
+"""Desktop upload history, kept in a local SQLite database.
+
+Uploads are appended with one INSERT each (WAL mode, so a crash never
+leaves a half-written history) and read newest first through an index on
+``upload_time``. The database is opened on first use. A ``history.json``
+left by older versions is imported once, when the database is created,
+and renamed to ``history.json.migrated``; one that cannot be read is set
+aside as ``history.json.corrupt`` and the history starts empty.
+"""
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+HISTORY_DB = "history.sqlite3"
+LEGACY_HISTORY_FILE = "history.json"
+
+# Rows shown in the desktop history table
+HISTORY_LIMIT = 5
+
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    id INTEGER PRIMARY KEY,
+    filename TEXT NOT NULL,
+    upload_time TEXT NOT NULL,
+    total_equipment INTEGER NOT NULL,
+    average_flowrate REAL,
+    average_pressure REAL,
+    average_temperature REAL,
+    type_distribution TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS uploads_upload_time_idx ON uploads (upload_time, id);
+"""
+FIELDS = (
+    "filename", "upload_time", "total_equipment",
+    "average_flowrate", "average_pressure", "average_temperature", "type_distribution",
+)
+
+
+def _row(filename, upload_time, summary):
+    if isinstance(upload_time, datetime):
+        upload_time = upload_time.isoformat()
+    return (
+        filename, upload_time, summary["total_equipment"],
+        summary.get("average_flowrate"), summary.get("average_pressure"),
+        summary.get("average_temperature"), json.dumps(summary.get("type_distribution", {})),
+    )
+
+
+class HistoryStore:
+    def __init__(self, path=HISTORY_DB, legacy_file=LEGACY_HISTORY_FILE):
+        self.path = path
+        self.legacy_file = legacy_file
+        self._connection = None
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            self._connection = self._open()
+        return self._connection
+
+    def _open(self):
+        connection = sqlite3.connect(self.path)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            with connection:
+                connection.executescript(SCHEMA)
+                outcome = self._import_legacy(connection)
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            if outcome:
+                os.replace(self.legacy_file, f"{self.legacy_file}.{outcome}")
+        return connection
+
+    def _import_legacy(self, connection):
+        """Copy the old JSON history in.
+
+        Returns "migrated", "corrupt" if the file could not be read (it
+        would otherwise fail every start), or None if there was none.
+        """
+        if not self.legacy_file or not os.path.exists(self.legacy_file):
+            return None
+        try:
+            with open(self.legacy_file) as f:
+                entries = json.load(f)
+            # The file is newest first; insert oldest first so ids follow time
+            rows = [_row(entry.get("filename", ""), entry["upload_time"], entry) for entry in reversed(entries)]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return "corrupt"
+        connection.executemany(
+            f"INSERT INTO uploads ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})", rows,
+        )
+        return "migrated"
+
+    def append(self, filename, upload_time, summary):
+        with self.connection:
+            self.connection.execute(
+                f"INSERT INTO uploads ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+                _row(filename, upload_time, summary),
+            )
+
+    def recent(self, limit=HISTORY_LIMIT):
+        """The newest ``limit`` uploads as dicts, newest first."""
+        rows = self.connection.execute(
+            f"SELECT {', '.join(FIELDS)} FROM uploads ORDER BY upload_time DESC, id DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [
+            {
+                **dict(row),
+                "upload_time": datetime.fromisoformat(row["upload_time"]),
+                "type_distribution": json.loads(row["type_distribution"]),
+            }
+            for row in rows
+        ]
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,55 @@
+"""CSV processing for the desktop client.
+
+The summary math lives in the backend's ``api`` package (``api.summary`` and
+``api.aggregation`` only need pandas/NumPy), so both clients produce the same
+numbers from the same code.
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "backend")
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from api.aggregation import aggregate_upload  # noqa: E402
+
+
+class Cancelled(Exception):
+    """Raised by ``summarize_csv`` when ``is_cancelled`` returns True."""
+
+
+def summarize_csv(path, progress=None, is_cancelled=None, writer=None):
+    """Return the equipment summary for the CSV file at ``path``.
+
+    The file is parsed in chunks. After each one ``progress`` (if given) is
+    called with ``(rows, bytes_read, total_bytes)`` and ``is_cancelled`` (if
+    given) is polled; when it returns True, ``Cancelled`` is raised.
+    ``writer`` (an ``api.columnar.ColumnWriter``) receives the parsed rows.
+    """
+    total = os.path.getsize(path)
+    with open(path, "rb") as f:
+        def on_chunk(rows):
+            if is_cancelled is not None and is_cancelled():
+                raise Cancelled()
+            if progress is not None:
+                progress(rows, min(f.tell(), total), total)
+
+        return aggregate_upload(f, progress=on_chunk, writer=writer)
+
+
+def describe_quarantine(report, samples=5):
+    """``(message, details)`` for a summary's quarantine report; empty strings if no row was left out."""
+    if not report or not report["rows"]:
+        return "", ""
+    rows = report["rows"]
+    message = f"{rows} invalid row{'s' if rows != 1 else ''} left out."
+    lines = []
+    for sample in report["samples"][:samples]:
+        problems = []
+        for problem in sample["problems"]:
+            column, reason = problem.split(": ")
+            problems.append(f"{column} {sample[column]!r} {reason.replace('_', ' ')}")
+        lines.append(f"Row {sample['row']} ({sample['type'] or 'no type'}): {'; '.join(problems)}")
+    if rows > len(lines):
+        lines.append(f"... and {rows - len(lines)} more")
+    return message, "\n".join(lines)
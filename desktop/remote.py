@@ -0,0 +1,171 @@
+"""Processing uploads on the Django API instead of locally.
+
+The CSV is gzip-compressed into a spooled buffer, then streamed to
+``api/equipment/`` as a multipart body with a known length (the backend
+recognises gzip content by its magic bytes). One ``requests.Session`` is
+kept per client, so consecutive uploads reuse a keep-alive connection from
+its pool. Connection failures, timeouts and server errors raise
+``ServerUnavailable`` so the caller can fall back to local processing.
+"""
+import gzip
+import io
+import os
+import tempfile
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from processing import Cancelled
+
+DEFAULT_API_URL = "http://127.0.0.1:8000"
+
+# (connect, read) seconds; a large file can take a while to summarise
+TIMEOUT = (3.05, 300)
+POOL_SIZE = 4
+COMPRESS_CHUNK_BYTES = 1024 * 1024
+# Compressed uploads above this size are spooled to disk
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+
+
+class ServerUnavailable(Exception):
+    """The API could not be reached or failed; process locally instead."""
+
+
+class RemoteError(Exception):
+    """The API rejected the upload (e.g. missing columns)."""
+
+
+class MultipartBody(io.RawIOBase):
+    """A single-file multipart/form-data body read from a seekable file.
+
+    Sized and seekable, so requests sends a Content-Length (Django cannot
+    read chunked request bodies) and streams the file instead of loading it.
+    """
+
+    def __init__(self, file, filename, field="file", content_type="application/gzip"):
+        self.boundary = uuid.uuid4().hex
+        head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+        tail = f"\r\n--{self.boundary}--\r\n".encode()
+        file.seek(0, os.SEEK_END)
+        self._parts = [io.BytesIO(head), file, io.BytesIO(tail)]
+        self._sizes = [len(head), file.tell(), len(tail)]
+        self.seek(0)
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return sum(self._sizes)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        # urllib3 rewinds the body before retrying a failed connect
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += len(self)
+        self._position = offset
+        self._current = 0
+        for i, (part, size) in enumerate(zip(self._parts, self._sizes)):
+            part.seek(min(max(offset, 0), size))
+            if offset >= size:
+                self._current = i + 1
+            offset -= size
+        return self._position
+
+    def readinto(self, buffer):
+        while self._current < len(self._parts):
+            size = self._parts[self._current].readinto(buffer)
+            if size:
+                self._position += size
+                return size
+            self._current += 1
+        return 0
+
+
+class RemoteProcessor:
+    def __init__(self, base_url=None, timeout=TIMEOUT, session=None):
+        self.base_url = (base_url or os.environ.get("EQUIPMENT_API_URL") or DEFAULT_API_URL).rstrip("/")
+        self.timeout = timeout
+        self.session = session or self._session()
+
+    @staticmethod
+    def _session():
+        session = requests.Session()
+        # Retry only failed connects; an upload that reached the server is not resent
+        retries = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.2, allowed_methods=None)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retries)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _compress(self, path, progress, is_cancelled):
+        total = os.path.getsize(path)
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        try:
+            with open(path, "rb") as src, gzip.GzipFile(fileobj=spool, mode="wb", compresslevel=1, mtime=0) as gz:
+                while True:
+                    chunk = src.read(COMPRESS_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    gz.write(chunk)
+                    if is_cancelled is not None and is_cancelled():
+                        raise Cancelled()
+                    if progress is not None:
+                        progress(0, src.tell(), total)
+        except BaseException:
+            # After the gzip block, which writes its trailer to the spool on the way out
+            spool.close()
+            raise
+        return spool
+
+    def summarize(self, path, progress=None, is_cancelled=None):
+        """Upload the CSV at ``path`` and return the server's summary.
+
+        ``progress`` and ``is_cancelled`` work as for
+        ``processing.summarize_csv`` while the file is compressed.
+        """
+        spool = self._compress(path, progress, is_cancelled)
+        try:
+            body = MultipartBody(spool, os.path.basename(path) + ".gz")
+            response = self.session.post(
+                f"{self.base_url}/api/equipment/",
+                data=body,
+                headers={"Content-Type": body.content_type},
+                timeout=self.timeout,
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise ServerUnavailable(str(e)) from e
+        finally:
+            spool.close()
+        if response.status_code >= 500:
+            raise ServerUnavailable(f"server error {response.status_code}: {_error(response)}")
+        if response.status_code != 200:
+            raise RemoteError(_error(response))
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+
+def _error(response):
+    try:
+        return response.json().get("error") or response.reason
+    except ValueError:
+        return response.reason
+
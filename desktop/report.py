@@ -0,0 +1,128 @@
+"""PDF reports, built in memory.
+
+Charts are rendered to PNG buffers at ``REPORT_DPI`` and embedded directly,
+so no temporary image files are written. The same code serves the desktop
+app's "Download PDF Report" and a headless batch mode that reports on every
+CSV in a directory using a pool of worker processes:
+
+    python report.py data/ --out reports/ --workers 4
+"""
+import argparse
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Matches the resolution of the earlier savefig-to-file export
+REPORT_DPI = 100
+TITLE = "Chemical Equipment Report"
+
+
+def summary_lines(summary):
+    return [
+        ("Total Equipment", summary["total_equipment"]),
+        ("Avg Flowrate", f"{summary['average_flowrate']:.2f}"),
+        ("Avg Pressure", f"{summary['average_pressure']:.2f}"),
+        ("Avg Temperature", f"{summary['average_temperature']:.2f}"),
+    ]
+
+
+def render_png(figure, dpi=REPORT_DPI):
+    """The figure as PNG bytes in a buffer (its layout is already computed)."""
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png", dpi=dpi)
+    buffer.seek(0)
+    return buffer
+
+
+def chart_figures(summary):
+    """Bar and pie figures for ``summary`` on Agg canvases, without a GUI."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    from charts import BarChart, PieChart
+
+    figures = []
+    for chart_class in (BarChart, PieChart):
+        figure = Figure(figsize=(6, 3))
+        FigureCanvasAgg(figure)
+        chart = chart_class(figure)
+        if summary["type_distribution"]:
+            chart.update(*zip(*summary["type_distribution"].items()))
+        figures.append(figure)
+    return figures
+
+
+def build_report(summary, figures, dpi=REPORT_DPI):
+    """The PDF report for ``summary`` with ``figures`` embedded, as bytes."""
+    from fpdf import FPDF
+    from fpdf.enums import XPos, YPos
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Helvetica", "B", 16)
+    pdf.cell(0, 10, TITLE, align="C", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.ln(8)
+    pdf.set_font("Helvetica", "", 12)
+    for label, value in summary_lines(summary):
+        pdf.cell(0, 8, f"{label}: {value}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    for figure in figures:
+        pdf.image(render_png(figure, dpi), x=10, w=pdf.w - 20)
+        pdf.ln(4)
+    return bytes(pdf.output())
+
+
+def write_report(path, summary, figures, dpi=REPORT_DPI):
+    data = build_report(summary, figures, dpi)
+    # Written next to the target and renamed, so a failed export leaves no partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+def report_csv(csv_path, out_dir, dpi=REPORT_DPI):
+    """Summarise one CSV and write its report; runs in a batch worker."""
+    from processing import summarize_csv
+
+    summary = summarize_csv(csv_path)
+    name = os.path.splitext(os.path.basename(csv_path))[0] + ".pdf"
+    return write_report(os.path.join(out_dir, name), summary, chart_figures(summary), dpi)
+
+
+def batch_reports(directory, out_dir, workers=None, dpi=REPORT_DPI):
+    """Write a report per CSV in ``directory``; yields ``(csv, pdf, error)``."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory) if name.lower().endswith(".csv")
+    )
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(report_csv, path, out_dir, dpi): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, str(e)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a PDF report for every CSV in a directory.")
+    parser.add_argument("directory")
+    parser.add_argument("--out", default="reports", help="directory for the PDFs")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--dpi", type=int, default=REPORT_DPI)
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for csv_path, pdf_path, error in batch_reports(args.directory, args.out, args.workers, args.dpi):
+        if error:
+            failed += 1
+            print(f"FAILED {csv_path}: {error}")
+        else:
+            print(f"{csv_path} -> {pdf_path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
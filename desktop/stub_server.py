@@ -0,0 +1,114 @@
+"""Stand-in for the Django API, for trying remote processing without a backend.
+
+Serves ``POST /api/equipment/`` with the shared summary code (gzip bodies
+included) over HTTP/1.1 keep-alive, and counts the connections it accepts
+so connection reuse can be checked:
+
+    python stub_server.py --port 8765
+    EQUIPMENT_API_URL=http://127.0.0.1:8765 python app.py
+
+``--status 503`` answers every upload with that error instead, or only the
+first few with ``--failures``.
+"""
+import argparse
+import itertools
+import json
+import threading
+from contextlib import contextmanager
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import processing  # noqa: F401  (puts the backend on sys.path)
+from api.aggregation import aggregate_upload
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.rstrip("/") != "/api/equipment":
+            return self._json(404, {"error": "Not found"})
+        with self.server.lock:
+            self.server.uploads += 1
+            failing = self.server.failures is None or self.server.uploads <= self.server.failures
+        if self.server.status and failing:
+            return self._json(self.server.status, {"error": "Stub configured to fail"})
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+        )
+        files = [part for part in message.iter_parts() if part.get_param("name", header="content-disposition") == "file"]
+        if not files:
+            return self._json(400, {"error": "No file uploaded"})
+        try:
+            summary = aggregate_upload(BytesIO(files[0].get_payload(decode=True)))
+        except Exception as e:
+            return self._json(500, {"error": str(e)})
+        self._json(200, {**summary, "upload_id": next(self.server.ids)})
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, status=0, failures=None, verbose=False):
+        super().__init__(address, StubHandler)
+        self.status = status
+        # Uploads answered with ``status`` before the stub starts working; None for all
+        self.failures = failures
+        self.verbose = verbose
+        self.connections = 0
+        self.uploads = 0
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+@contextmanager
+def running_stub(port=0, status=0, failures=None):
+    """Serve the stub on a background thread; yields the server."""
+    server = StubServer(("127.0.0.1", port), status=status, failures=failures)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--status", type=int, default=0, help="fail every upload with this HTTP status")
+    parser.add_argument("--failures", type=int, help="fail only this many uploads with --status")
+    args = parser.parse_args()
+    server = StubServer(("127.0.0.1", args.port), status=args.status, failures=args.failures, verbose=True)
+    print(f"stub API on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Qt table models for the desktop client.
+
+Views ask a model only for the cells they show, and cells are formatted as
+they are requested, so a table over a million stored equipment rows costs
+no more to display than one over five. Sorting and type filtering reorder
+an index array over the backing NumPy columns; rows are never copied.
+NumPy is only imported once there are rows to sort or filter.
+"""
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+ALIGN_LEFT = Qt.AlignLeft | Qt.AlignVCenter
+ALIGN_RIGHT = Qt.AlignRight | Qt.AlignVCenter
+
+
+def _fixed(value, digits=2):
+    if value is None or value != value:
+        return ""
+    return f"{value:.{digits}f}"
+
+
+class RecordTableModel(QAbstractTableModel):
+    """Rows of dicts shown through ``columns``: ``(header, key, format, alignment)``."""
+
+    def __init__(self, columns, records=(), parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.records = list(records)
+
+    def set_records(self, records):
+        self.beginResetModel()
+        self.records = list(records)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.records)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columns[section][0]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        _, key, fmt, alignment = self.columns[index.column()]
+        if role == Qt.DisplayRole:
+            value = self.records[index.row()].get(key)
+            return fmt(value) if fmt else ("" if value is None else str(value))
+        if role == Qt.TextAlignmentRole:
+            return alignment
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if column < 0:
+            # Views pass -1 for "unsorted"; keep the order records were given in
+            return
+        key = self.columns[column][1]
+        self.layoutAboutToBeChanged.emit()
+        # Missing values sort last either way
+        present = [r for r in self.records if r.get(key) is not None]
+        missing = [r for r in self.records if r.get(key) is None]
+        present.sort(key=lambda r: r[key], reverse=order == Qt.DescendingOrder)
+        self.records = present + missing
+        self.layoutChanged.emit()
+
+
+SUMMARY_COLUMNS = [
+    ("Metric", "metric", None, ALIGN_LEFT),
+    ("Value", "value", None, ALIGN_RIGHT),
+]
+
+HISTORY_COLUMNS = [
+    ("Filename", "filename", None, ALIGN_LEFT),
+    ("Upload Time", "upload_time",
+     lambda ut: ut.strftime("%d/%m/%Y %H:%M:%S") if hasattr(ut, "strftime") else str(ut or ""), ALIGN_LEFT),
+    ("Total", "total_equipment", None, ALIGN_RIGHT),
+    ("Flowrate", "average_flowrate", _fixed, ALIGN_RIGHT),
+    ("Pressure", "average_pressure", _fixed, ALIGN_RIGHT),
+    ("Temperature", "average_temperature", _fixed, ALIGN_RIGHT),
+]
+
+
+def summary_records(summary):
+    return [
+        {"metric": "Total Equipment", "value": str(summary["total_equipment"])},
+        {"metric": "Avg Flowrate", "value": _fixed(summary["average_flowrate"])},
+        {"metric": "Avg Pressure", "value": _fixed(summary["average_pressure"])},
+        {"metric": "Avg Temperature", "value": _fixed(summary["average_temperature"])},
+    ]
+
+
+class EquipmentRowsModel(QAbstractTableModel):
+    """Per-row view over an ``api.columnar.UploadColumns`` (memory-mapped)."""
+
+    VALUE_COLUMNS = ("flowrate", "pressure", "temperature")
+    HEADERS = ("Type", "Flowrate", "Pressure", "Temperature")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = None
+        self.equipment_type = None
+        self._sort = None
+        # Source row of each displayed row; None means identity
+        self._index = None
+
+    def set_rows(self, rows):
+        """Show ``rows`` (an ``UploadColumns``, or None to empty the table)."""
+        self.beginResetModel()
+        self.rows = rows
+        self.equipment_type = None
+        self._sort = None
+        self._index = None
+        self.endResetModel()
+
+    def types(self):
+        return list(self.rows.types) if self.rows is not None else []
+
+    def set_type_filter(self, equipment_type):
+        """Only show rows of ``equipment_type``; None shows every row."""
+        self.beginResetModel()
+        self.equipment_type = equipment_type
+        self._reindex()
+        self.endResetModel()
+
+    def _reindex(self):
+        if self.rows is None:
+            self._index = None
+            return
+        import numpy as np
+
+        index = self.rows.row_indices(self.equipment_type)
+        if self._sort is not None:
+            column, order = self._sort
+            if column == 0:
+                keys = self._type_sort_keys()
+            else:
+                keys = self.rows.columns[self.VALUE_COLUMNS[column - 1]]
+            keys = keys if index is None else keys[index]
+            order_index = np.argsort(keys, kind="stable")
+            if order == Qt.DescendingOrder:
+                # Keep NaN last and ties stable when reversing
+                nan = np.isnan(keys[order_index]) if keys.dtype.kind == "f" else np.zeros(len(keys), bool)
+                order_index = np.concatenate([order_index[~nan][::-1], order_index[nan]])
+            index = order_index if index is None else index[order_index]
+        self._index = index
+
+    def _type_sort_keys(self):
+        import numpy as np
+
+        # Sort types by name; missing types (-1) last
+        ranks = np.argsort(np.argsort(self.rows.types)) if self.rows.types else np.empty(0, np.int64)
+        ranks = np.append(ranks, len(ranks))
+        return ranks[np.where(self.rows.codes < 0, len(ranks) - 1, self.rows.codes)]
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        # Views pass -1 for "unsorted"
+        self._sort = (column, order) if column >= 0 else None
+        self._reindex()
+        self.layoutChanged.emit()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.rows is None:
+            return 0
+        return self.rows.rows if self._index is None else len(self._index)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return str(section + 1)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        column = index.column()
+        if role == Qt.TextAlignmentRole:
+            return ALIGN_LEFT if column == 0 else ALIGN_RIGHT
+        if role != Qt.DisplayRole:
+            return None
+        row = index.row() if self._index is None else int(self._index[index.row()])
+        if column == 0:
+            code = int(self.rows.codes[row])
+            return self.rows.types[code] if code >= 0 else ""
+        return _fixed(float(self.rows.columns[self.VALUE_COLUMNS[column - 1]][row]))
@@ -0,0 +1,82 @@
+"""Background workers for the desktop client.
+
+CSV parsing runs on a ``QThreadPool`` thread; results, progress and errors
+come back to the GUI thread through Qt signals, which are queued across
+threads, so slots can touch widgets safely.
+"""
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+
+class SummarySignals(QObject):
+    progress = pyqtSignal(int)        # percent of the file read
+    finished = pyqtSignal(dict, str)  # the summary, stored rows ("" if not kept)
+    failed = pyqtSignal(str)          # error message
+    fell_back = pyqtSignal(str)       # server unavailable, processing locally
+    cancelled = pyqtSignal()
+
+
+class SummaryWorker(QRunnable):
+    """Summarise one CSV file off the GUI thread.
+
+    With ``rows_root`` the parsed rows are also written, in the same pass, to
+    an ``api.columnar.ColumnStore`` there, for the per-row table. With a
+    ``remote`` (a ``remote.RemoteProcessor``) the file is processed by the
+    API instead, falling back to local processing if it is unavailable.
+    """
+
+    def __init__(self, path, rows_root=None, remote=None):
+        super().__init__()
+        self.path = path
+        self.rows_root = rows_root
+        self.remote = remote
+        self.signals = SummarySignals()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        """Stop after the chunk being parsed; ``cancelled`` is emitted."""
+        self._cancel.set()
+
+    def _progress(self, rows, done, total):
+        self.signals.progress.emit(int(done * 100 / total) if total else 100)
+
+    def run(self):
+        # pandas and the parser load here, on the first CSV, off the GUI thread
+        from processing import Cancelled, summarize_csv
+        from api.columnar import ColumnStore
+
+        if self.remote is not None and self._run_remote(Cancelled):
+            return
+        writer = ColumnStore(self.rows_root).writer() if self.rows_root else None
+        try:
+            summary = summarize_csv(self.path, progress=self._progress,
+                                    is_cancelled=self._cancel.is_set, writer=writer)
+        except Cancelled:
+            if writer is not None:
+                writer.abort()
+            self.signals.cancelled.emit()
+        except Exception as e:
+            if writer is not None:
+                writer.abort()
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(summary, writer.commit() if writer is not None else "")
+
+    def _run_remote(self, cancelled_error):
+        """Process on the server; returns False to fall back to local processing."""
+        from remote import ServerUnavailable
+
+        try:
+            summary = self.remote.summarize(self.path, progress=self._progress, is_cancelled=self._cancel.is_set)
+        except ServerUnavailable as e:
+            self.signals.fell_back.emit(str(e))
+            return False
+        except cancelled_error:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            # Rows stay on the server, so there is no local rows table
+            self.signals.finished.emit(summary, "")
+        return True